@@ -1,11 +1,13 @@
 """
 Base behavior definition for autonomous agents.
 
-This module provides the abstract base class for implementing
+This module provides the abstract base classes for implementing
 agent behaviors.
 """
 
+import time
 from abc import ABC, abstractmethod
+from typing import Optional
 
 class Behavior(ABC):
     """Abstract base class for agent behaviors."""
@@ -20,6 +22,16 @@ class Behavior(ABC):
         """
         pass
 
+    def next_due(self) -> Optional[float]:
+        """
+        Get the next time this behavior expects to act.
+        
+        Returns:
+            Optional[float]: Unix timestamp of the next due time, or None
+                if the behavior has to be polled
+        """
+        return None
+
     @abstractmethod
     async def act(self, agent: 'AutonomousAgent') -> None:
         """
@@ -28,4 +40,40 @@ class Behavior(ABC):
         Args:
             agent (AutonomousAgent): Agent executing the behavior
         """
-        pass
\ No newline at end of file
+        pass
+
+class IntervalBehavior(Behavior):
+    """
+    Base class for behaviors that act at a fixed interval.
+    
+    Subclasses update last_execution when they act; the behavior
+    registry uses next_due() to schedule them without polling.
+    """
+    
+    def __init__(self, interval: float):
+        """
+        Initialize the behavior.
+        
+        Args:
+            interval (float): Minimum time between executions in seconds
+        """
+        self.interval = interval
+        self.last_execution = 0
+
+    async def should_act(self) -> bool:
+        """
+        Check if enough time has passed since the last execution.
+        
+        Returns:
+            bool: True if enough time has passed, False otherwise
+        """
+        return time.time() - self.last_execution >= self.interval
+
+    def next_due(self) -> float:
+        """
+        Get the time the interval next elapses.
+        
+        Returns:
+            float: Unix timestamp of the next due time
+        """
+        return self.last_execution + self.interval
\ No newline at end of file
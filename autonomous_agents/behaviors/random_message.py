@@ -7,12 +7,12 @@ from a predefined word list.
 
 import random
 import time
-from ..behaviors.base import Behavior
+from ..behaviors.base import IntervalBehavior
 from ..core.message import Message, MessageType
 from ..config import WORDS
 from ..utils.logger import logger
 
-class RandomMessageBehavior(Behavior):
+class RandomMessageBehavior(IntervalBehavior):
     """Behavior that generates random messages periodically."""
     
     def __init__(self, interval: float = 2.0):
@@ -22,17 +22,7 @@ class RandomMessageBehavior(Behavior):
         Args:
             interval (float): Minimum time between messages in seconds
         """
-        self.interval = interval
-        self.last_execution = 0
-
-    async def should_act(self) -> bool:
-        """
-        Check if enough time has passed since last message.
-        
-        Returns:
-            bool: True if enough time has passed, False otherwise
-        """
-        return time.time() - self.last_execution >= self.interval
+        super().__init__(interval)
 
     async def act(self, agent: 'AutonomousAgent') -> None:
         """
@@ -44,7 +34,8 @@ class RandomMessageBehavior(Behavior):
         words = random.sample(WORDS, 2)
         message = Message(
             type=MessageType.TEXT,
-            content=" ".join(words)
+            content=" ".join(words),
+            sender=agent.name
         )
         await agent.outbox.put(message)
         self.last_execution = time.time()
@@ -1,19 +1,30 @@
 import time
-import json
+from typing import Optional
 from web3 import Web3
-from ..behaviors.base import Behavior
-from ..config import ERC20_ABI
+from ..behaviors.base import IntervalBehavior
+from ..chain.balance_oracle import BalanceOracle
+from ..chain.contracts import ContractRegistry
+from ..chain.indexer import TransferIndexer
 from ..utils.logger import logger
 
-class TokenBalanceCheckBehavior(Behavior):
-    """Behavior that monitors token balances."""
+class TokenBalanceCheckBehavior(IntervalBehavior):
+    """
+    Behavior that monitors token balances.
+    
+    Balances come from the BalanceOracle shared by all behaviors on the
+    same Web3 instance, which fetches every monitored wallet in one call.
+    When the oracle follows the chain head, checks are served from its
+    per-block cache without any RPC call. Given a TransferIndexer for the
+    token, balances are read from the index instead.
+    """
     
     def __init__(
         self,
         web3: Web3,
         token_address: str,
         wallet_address: str,
-        interval: float = 10.0
+        interval: float = 10.0,
+        indexer: Optional[TransferIndexer] = None
     ):
         """
         Initialize the behavior.
@@ -23,27 +34,22 @@ class TokenBalanceCheckBehavior(Behavior):
             token_address (str): Address of the token contract
             wallet_address (str): Address to monitor
             interval (float): Check interval in seconds
+            indexer (Optional[TransferIndexer]): Index to read balances
+                from once it covers the wallet
         """
+        super().__init__(interval)
         self.web3 = web3
-        self.token_contract = self.web3.eth.contract(
-            address=self.web3.to_checksum_address(token_address),
-            abi=json.loads(ERC20_ABI)
-        )
+        self.oracle = BalanceOracle.for_web3(web3)
+        self.contracts = ContractRegistry.shared()
+        self.token_contract = self.contracts.contract(web3, token_address)
         self.wallet_address = self.web3.to_checksum_address(wallet_address)
-        self.interval = interval
-        self.last_execution = 0
+        self.token_address, _ = self.oracle.subscribe(token_address, wallet_address)
+        self.indexer = indexer
+        if indexer is not None:
+            indexer.watch([self.wallet_address])
         
-        # Get token decimals
-        self.decimals = self.token_contract.functions.decimals().call()
-
-    async def should_act(self) -> bool:
-        """
-        Check if enough time has passed since last check.
-        
-        Returns:
-            bool: True if enough time has passed, False otherwise
-        """
-        return time.time() - self.last_execution >= self.interval
+        # Token decimals are fetched on the first check
+        self.decimals = None
 
     async def act(self, agent: 'AutonomousAgent') -> None:
         """
@@ -53,7 +59,16 @@ class TokenBalanceCheckBehavior(Behavior):
             agent (AutonomousAgent): Agent executing the behavior
         """
         try:
-            balance = self.token_contract.functions.balanceOf(self.wallet_address).call()
+            if self.decimals is None:
+                self.decimals = await self.contracts.decimals(self.web3, self.token_address)
+            if self.indexer is not None and self.indexer.covers(self.token_address, self.wallet_address):
+                balance = self.indexer.balance_of(self.wallet_address)
+            else:
+                balance = await self.oracle.balance_of(
+                    self.token_address,
+                    self.wallet_address,
+                    max_age=self.interval / 2
+                )
             # Convert balance to decimal representation
             decimal_balance = balance / (10 ** self.decimals)
             
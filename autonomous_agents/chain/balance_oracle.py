@@ -0,0 +1,294 @@
+"""
+Shared, block-driven token balance oracle.
+
+This module provides a service that gathers every (token, wallet) pair
+its subscribers care about and fetches all of their balances with a
+single Multicall3 aggregate3 call, instead of one balanceOf round trip
+per wallet. Once an agent watches a balance, the oracle follows the
+chain head, refreshes the cache only when a new block arrives and
+notifies watchers only when a balance actually changed.
+"""
+
+import asyncio
+import time
+import weakref
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+from web3 import Web3
+from web3.exceptions import BadFunctionCallOutput, ContractLogicError
+from ..chain.client import ChainClient
+from ..chain.contracts import ContractRegistry
+from ..config import MULTICALL3_ABI, MULTICALL3_ADDRESS
+from ..core.message import Message, MessageType
+from ..utils.logger import logger
+
+BALANCE_OF_SELECTOR = bytes.fromhex("70a08231")
+
+BalanceKey = Tuple[str, str]
+
+def balance_of_calldata(wallet_address: str) -> bytes:
+    """
+    Encode an ERC20 balanceOf call.
+    
+    Args:
+        wallet_address (str): Address whose balance is queried
+
+    Returns:
+        bytes: ABI-encoded call data
+    """
+    return BALANCE_OF_SELECTOR + bytes(12) + bytes.fromhex(wallet_address[2:])
+
+class BalanceOracle:
+    """
+    Batches balance lookups for all subscribed wallets.
+    
+    Cached balances are stored with the block they were read at. While
+    the head watcher runs, the cache is refreshed once per new block and
+    lookups are served from it; otherwise a lookup that finds no fresh
+    balance refreshes every subscribed pair at once. Concurrent refreshes
+    share the one in flight.
+    """
+    
+    _shared: 'weakref.WeakKeyDictionary[Web3, BalanceOracle]' = weakref.WeakKeyDictionary()
+
+    def __init__(self, web3: Web3, batch_size: int = 500, poll_interval: float = 2.0) -> None:
+        """
+        Initialize the oracle.
+        
+        Args:
+            web3 (Web3): Web3 instance used for the calls
+            batch_size (int): Maximum number of balances per aggregate3 call
+            poll_interval (float): Seconds between chain head checks
+                while balances are watched
+        """
+        self.web3 = web3
+        self.chain = ChainClient.for_web3(web3)
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.contracts = ContractRegistry.shared()
+        self.multicall = self.contracts.contract(web3, MULTICALL3_ADDRESS, MULTICALL3_ABI)
+        self.subscriptions: Set[BalanceKey] = set()
+        self.watchers: Dict[BalanceKey, List[Any]] = {}
+        self.head: Optional[int] = None
+        # (token, wallet) -> (balance, block number, fetch time)
+        self._balances: Dict[BalanceKey, Tuple[int, Optional[int], float]] = {}
+        self._refresh_task: Optional[asyncio.Future] = None
+        self._watch_task: Optional[asyncio.Task] = None
+        self._multicall_available = True
+
+    @classmethod
+    def for_web3(cls, web3: Web3) -> 'BalanceOracle':
+        """
+        Get the oracle shared by everything using the given Web3 instance.
+        
+        Args:
+            web3 (Web3): Web3 instance
+
+        Returns:
+            BalanceOracle: Shared oracle
+        """
+        oracle = cls._shared.get(web3)
+        if oracle is None:
+            oracle = cls._shared[web3] = cls(web3)
+        return oracle
+
+    def subscribe(self, token_address: str, wallet_address: str) -> BalanceKey:
+        """
+        Include a wallet's token balance in every refresh.
+        
+        Args:
+            token_address (str): Address of the token contract
+            wallet_address (str): Address whose balance is tracked
+
+        Returns:
+            BalanceKey: Checksummed (token, wallet) key
+        """
+        key = self._key(token_address, wallet_address)
+        self.subscriptions.add(key)
+        return key
+
+    def unsubscribe(self, token_address: str, wallet_address: str) -> None:
+        """
+        Stop tracking a wallet's token balance.
+        
+        Args:
+            token_address (str): Address of the token contract
+            wallet_address (str): Address whose balance was tracked
+        """
+        key = self._key(token_address, wallet_address)
+        self.subscriptions.discard(key)
+        self.watchers.pop(key, None)
+        self._balances.pop(key, None)
+
+    def watch(self, token_address: str, wallet_address: str, inbox: Any) -> None:
+        """
+        Send a BALANCE_CHECK message to an inbox whenever a balance changes.
+        
+        The first watch started inside a running event loop also starts
+        the head watcher.
+        
+        Args:
+            token_address (str): Address of the token contract
+            wallet_address (str): Address whose balance is watched
+            inbox (Any): Message box receiving the notifications
+        """
+        key = self.subscribe(token_address, wallet_address)
+        self.watchers.setdefault(key, []).append(inbox)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self.start()
+
+    def start(self) -> None:
+        """Start following the chain head if it is not followed yet."""
+        if self._watch_task is None or self._watch_task.done():
+            self._watch_task = asyncio.create_task(self._follow_head())
+
+    async def stop(self) -> None:
+        """Stop following the chain head."""
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            await asyncio.gather(self._watch_task, return_exceptions=True)
+            self._watch_task = None
+
+    @classmethod
+    async def stop_all(cls) -> None:
+        """Stop every shared oracle in the process."""
+        for oracle in list(cls._shared.values()):
+            await oracle.stop()
+
+    async def balance_of(self, token_address: str, wallet_address: str, max_age: float = 5.0) -> int:
+        """
+        Get a wallet's token balance in token units.
+        
+        While the head watcher runs, any cached balance is current as of
+        the last seen block and is returned as-is.
+        
+        Args:
+            token_address (str): Address of the token contract
+            wallet_address (str): Address whose balance is requested
+            max_age (float): Oldest cached balance, in seconds, that may
+                be returned without a refresh when the head is not followed
+
+        Returns:
+            int: Balance in the token's smallest unit
+
+        Raises:
+            LookupError: If the balance could not be fetched
+        """
+        key = self.subscribe(token_address, wallet_address)
+        cached = self._balances.get(key)
+        following = self._watch_task is not None and not self._watch_task.done()
+        if cached is None or (not following and time.time() - cached[2] > max_age):
+            await self.refresh()
+            cached = self._balances.get(key)
+        if cached is None:
+            raise LookupError(f"Balance of {key[1]} for token {key[0]} unavailable")
+        return cached[0]
+
+    async def refresh(self, block_number: Optional[int] = None) -> bool:
+        """
+        Fetch the balances of all subscribed pairs, joining a refresh in flight.
+        
+        Args:
+            block_number (Optional[int]): Block to read at, latest if None
+
+        Returns:
+            bool: False if every balance fetch failed
+        """
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.ensure_future(self._refresh_all(block_number))
+            self._refresh_task.add_done_callback(self._refresh_done)
+        return await asyncio.shield(self._refresh_task)
+
+    def _refresh_done(self, task: asyncio.Future) -> None:
+        """Allow the next lookup to start a new refresh."""
+        self._refresh_task = None
+
+    async def _follow_head(self) -> None:
+        """Refresh the cache once for every new block while balances are watched."""
+        while self.watchers:
+            try:
+                head = await self.chain.call(lambda: self.web3.eth.block_number)
+                # A block whose fetches all failed is tried again on the next poll
+                if (self.head is None or head > self.head) and await self.refresh(head):
+                    self.head = head
+            except Exception as e:
+                logger.error(f"❌ Failed to follow chain head: {str(e)}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def _refresh_all(self, block_number: Optional[int]) -> bool:
+        """Refresh every subscription, batch_size pairs per call, and notify changes."""
+        keys = list(self.subscriptions)
+        batches = [keys[i:i + self.batch_size] for i in range(0, len(keys), self.batch_size)]
+        block_identifier: Union[int, str] = "latest" if block_number is None else block_number
+        results = await asyncio.gather(*(
+            self.chain.call(self._fetch, batch, block_identifier) for batch in batches
+        ))
+        fetched_at = time.time()
+        fetched = not keys
+        for batch, balances in zip(batches, results):
+            for key, balance in zip(batch, balances):
+                if balance is None:
+                    continue
+                fetched = True
+                previous = self._balances.get(key)
+                self._balances[key] = (balance, block_number, fetched_at)
+                if previous is None or previous[0] != balance:
+                    await self._notify(key, balance, previous[0] if previous else None, block_number)
+        return fetched
+
+    async def _notify(self, key: BalanceKey, balance: int, previous: Optional[int], block_number: Optional[int]) -> None:
+        """Tell the watchers of key about its new balance."""
+        for inbox in self.watchers.get(key, ()):
+            await inbox.put(Message(
+                type=MessageType.BALANCE_CHECK,
+                content={
+                    'token_address': key[0],
+                    'wallet_address': key[1],
+                    'balance': balance,
+                    'previous_balance': previous,
+                    'block_number': block_number,
+                },
+                sender="BalanceOracle"
+            ))
+
+    def _fetch(self, keys: List[BalanceKey], block_identifier: Union[int, str]) -> List[Optional[int]]:
+        """Blocking fetch of balances for keys; None where a call failed."""
+        if self._multicall_available:
+            try:
+                calls = [(token, True, balance_of_calldata(wallet)) for token, wallet in keys]
+                results = self.multicall.functions.aggregate3(calls).call(
+                    block_identifier=block_identifier
+                )
+                return [
+                    int.from_bytes(data, "big") if success and len(data) == 32 else None
+                    for success, data in results
+                ]
+            except (BadFunctionCallOutput, ContractLogicError) as e:
+                # No contract at the address, or it reverted: this chain has no Multicall3
+                self._multicall_available = False
+                logger.warning(f"⚠️ Multicall3 unavailable, falling back to single balance calls: {str(e)}")
+            except Exception as e:
+                # Timeouts and rate limits pass; the next refresh tries Multicall3 again
+                logger.error(f"❌ Failed to fetch balances: {str(e)}")
+                return [None] * len(keys)
+
+        balances = []
+        for token, wallet in keys:
+            contract = self.contracts.contract(self.web3, token)
+            try:
+                balances.append(
+                    contract.functions.balanceOf(wallet).call(block_identifier=block_identifier)
+                )
+            except Exception as e:
+                logger.error(f"❌ Failed to fetch balance of {wallet}: {str(e)}")
+                balances.append(None)
+        return balances
+
+    def _key(self, token_address: str, wallet_address: str) -> BalanceKey:
+        """Build the checksummed cache key for a pair."""
+        return (
+            self.web3.to_checksum_address(token_address),
+            self.web3.to_checksum_address(wallet_address)
+        )
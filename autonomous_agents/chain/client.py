@@ -0,0 +1,116 @@
+"""
+Asynchronous access to the blockchain for agents.
+
+This module provides a client that runs blocking Web3 calls on a bounded
+thread pool, so RPC round trips never block the event loop that runs the
+agents. One client is shared per Web3 instance.
+"""
+
+import asyncio
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, TypeVar
+from web3 import Web3
+from web3.exceptions import Web3RPCError
+
+T = TypeVar("T")
+
+# JSON-RPC error code for a method the node does not implement
+_METHOD_NOT_FOUND = -32601
+_UNSUPPORTED_MESSAGES = ("method not found", "does not exist", "not supported", "unsupported", "not available")
+
+def method_unsupported(error: Exception) -> bool:
+    """
+    Check whether an RPC error means the node lacks the called method.
+    
+    Rate limits, timeouts and other transient failures return False, so
+    callers only fall back permanently when the method will never work.
+    
+    Args:
+        error (Exception): Error raised by a Web3 call
+
+    Returns:
+        bool: True if the node does not offer the method
+    """
+    if not isinstance(error, Web3RPCError):
+        return False
+    response = error.rpc_response or {}
+    rpc_error = response.get('error') if isinstance(response, dict) else None
+    if isinstance(rpc_error, dict):
+        if rpc_error.get('code') == _METHOD_NOT_FOUND:
+            return True
+        message = str(rpc_error.get('message', ''))
+    else:
+        message = str(error)
+    return any(reason in message.lower() for reason in _UNSUPPORTED_MESSAGES)
+
+def node_rejected(error: Exception) -> bool:
+    """
+    Check whether an error is the node's JSON-RPC answer to the call.
+    
+    Timeouts and dropped connections return False: the node may have
+    acted on the request before the answer was lost.
+    
+    Args:
+        error (Exception): Error raised by a Web3 call
+
+    Returns:
+        bool: True if the node answered with an error
+    """
+    return isinstance(error, Web3RPCError)
+
+class ChainClient:
+    """Runs blocking Web3 calls on a bounded thread pool."""
+    
+    _shared: 'weakref.WeakKeyDictionary[Web3, ChainClient]' = weakref.WeakKeyDictionary()
+
+    def __init__(self, web3: Web3, max_workers: int = 16) -> None:
+        """
+        Initialize the client.
+        
+        Args:
+            web3 (Web3): Web3 instance the calls are made through
+            max_workers (int): Maximum number of RPC calls in flight
+        """
+        self.web3 = web3
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="chain-rpc"
+        )
+
+    @classmethod
+    def for_web3(cls, web3: Web3) -> 'ChainClient':
+        """
+        Get the client shared by everything using the given Web3 instance.
+        
+        Args:
+            web3 (Web3): Web3 instance
+
+        Returns:
+            ChainClient: Shared client
+        """
+        client = cls._shared.get(web3)
+        if client is None:
+            client = cls._shared[web3] = cls(web3)
+        return client
+
+    async def call(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Run a blocking call on the thread pool.
+        
+        Args:
+            fn (Callable[..., T]): Blocking function, e.g. a contract
+                function's call method or a web3.eth method
+            *args (Any): Positional arguments for fn
+            **kwargs (Any): Keyword arguments for fn
+
+        Returns:
+            T: Result of the call
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(fn, *args, **kwargs))
+
+    def close(self) -> None:
+        """Stop the thread pool once queued calls have finished."""
+        self._executor.shutdown(wait=False)
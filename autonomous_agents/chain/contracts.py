@@ -0,0 +1,224 @@
+"""
+Process-wide contract and token-metadata cache.
+
+This module provides a registry that parses each ABI once, builds each
+contract object once per provider and address, and keeps immutable
+token metadata such as decimals and symbol in a small on-disk cache, so
+agents started after the first run need no metadata RPC calls at all.
+Entries are keyed by chain ID and token address, never by provider URL,
+which may carry an API key and may change between runs.
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple, Union
+from web3 import Web3
+from ..chain.client import ChainClient
+from ..config import ERC20_ABI, TOKEN_METADATA_PATH
+from ..utils.logger import logger
+
+@dataclass(frozen=True)
+class TokenMetadata:
+    """Immutable properties of a token contract."""
+    decimals: int
+    symbol: Optional[str] = None
+
+class ContractRegistry:
+    """
+    Shares ABIs, contract objects and token metadata within a process.
+    
+    Metadata lookups for the same token are coalesced, so many agents
+    starting at once trigger at most one fetch per token. The chain ID
+    that keys the cache is read once per provider.
+    """
+    
+    _shared: Optional['ContractRegistry'] = None
+
+    def __init__(self, cache_path: Optional[str] = TOKEN_METADATA_PATH) -> None:
+        """
+        Initialize the registry.
+        
+        Args:
+            cache_path (Optional[str]): JSON file token metadata is kept
+                in across runs; None keeps it in memory only
+        """
+        self.cache_path = cache_path
+        self._abis: Dict[str, List[Dict[str, Any]]] = {}
+        self._contracts: Dict[Tuple[Union[str, int], str, str], Any] = {}
+        self._metadata: Optional[Dict[str, TokenMetadata]] = None
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._chain_ids: Dict[Union[str, int], asyncio.Future] = {}
+        self._save_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> 'ContractRegistry':
+        """
+        Get the registry shared by the whole process.
+        
+        Returns:
+            ContractRegistry: Shared registry
+        """
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def abi(self, abi_json: str = ERC20_ABI) -> List[Dict[str, Any]]:
+        """
+        Get a parsed ABI.
+        
+        Args:
+            abi_json (str): ABI as JSON text
+
+        Returns:
+            List[Dict[str, Any]]: Parsed ABI, shared between callers
+        """
+        parsed = self._abis.get(abi_json)
+        if parsed is None:
+            parsed = self._abis[abi_json] = json.loads(abi_json)
+        return parsed
+
+    def contract(self, web3: Web3, address: str, abi_json: str = ERC20_ABI) -> Any:
+        """
+        Get the contract object for an address on web3's provider.
+        
+        Args:
+            web3 (Web3): Web3 instance
+            address (str): Contract address
+            abi_json (str): Contract ABI as JSON text
+
+        Returns:
+            Any: Contract object, built on first use
+        """
+        address = web3.to_checksum_address(address)
+        key = (self._provider_key(web3), address, abi_json)
+        contract = self._contracts.get(key)
+        if contract is None:
+            contract = self._contracts[key] = web3.eth.contract(
+                address=address,
+                abi=self.abi(abi_json)
+            )
+        return contract
+
+    async def metadata(self, web3: Web3, token_address: str) -> TokenMetadata:
+        """
+        Get a token's metadata, fetching it only if it is not cached.
+        
+        Args:
+            web3 (Web3): Web3 instance
+            token_address (str): Address of the token contract
+
+        Returns:
+            TokenMetadata: Decimals and symbol of the token
+        """
+        key = f"{await self._chain_id(web3)}:{web3.to_checksum_address(token_address)}"
+        cached = self._cache().get(key)
+        if cached is not None:
+            return cached
+        if key not in self._pending:
+            self._pending[key] = asyncio.ensure_future(self._fetch_metadata(web3, token_address, key))
+            self._pending[key].add_done_callback(lambda done: self._pending.pop(key, None))
+        return await asyncio.shield(self._pending[key])
+
+    async def decimals(self, web3: Web3, token_address: str) -> int:
+        """
+        Get a token's decimals.
+        
+        Args:
+            web3 (Web3): Web3 instance
+            token_address (str): Address of the token contract
+
+        Returns:
+            int: Number of decimals
+        """
+        return (await self.metadata(web3, token_address)).decimals
+
+    async def _fetch_metadata(self, web3: Web3, token_address: str, key: str) -> TokenMetadata:
+        """Fetch decimals and symbol and add them to the cache."""
+        chain = ChainClient.for_web3(web3)
+        contract = self.contract(web3, token_address)
+        decimals = await chain.call(contract.functions.decimals().call)
+        try:
+            symbol = await chain.call(contract.functions.symbol().call)
+        except Exception as e:
+            # Some older tokens have no string symbol; decimals are what matters
+            logger.warning(f"⚠️ Could not read symbol of {token_address}: {str(e)}")
+            symbol = None
+        if isinstance(symbol, bytes):
+            # Tokens such as MKR return their symbol as bytes32
+            symbol = symbol.rstrip(b"\0").decode(errors="replace")
+        elif not isinstance(symbol, str):
+            symbol = None
+        metadata = TokenMetadata(decimals=decimals, symbol=symbol)
+        self._cache()[key] = metadata
+        if self.cache_path:
+            try:
+                await chain.call(self._save, key, metadata)
+            except OSError as e:
+                # The metadata is still good; it is only fetched again next run
+                logger.warning(f"⚠️ Could not write token metadata cache {self.cache_path}: {str(e)}")
+        return metadata
+
+    async def _chain_id(self, web3: Web3) -> int:
+        """Get the chain ID of web3's provider, fetched once per provider."""
+        provider = self._provider_key(web3)
+        if provider not in self._chain_ids:
+            self._chain_ids[provider] = asyncio.ensure_future(
+                ChainClient.for_web3(web3).call(lambda: web3.eth.chain_id)
+            )
+        try:
+            return await asyncio.shield(self._chain_ids[provider])
+        except Exception:
+            self._chain_ids.pop(provider, None)
+            raise
+
+    def _provider_key(self, web3: Web3) -> Union[str, int]:
+        """Identify web3's provider by URL where it has one."""
+        endpoint = getattr(web3.provider, "endpoint_uri", None)
+        return endpoint if isinstance(endpoint, str) else id(web3.provider)
+
+    def _cache(self) -> Dict[str, TokenMetadata]:
+        """Get the metadata cache, loading it from disk on first use."""
+        if self._metadata is None:
+            self._metadata = self._load()
+        return self._metadata
+
+    def _load(self) -> Dict[str, TokenMetadata]:
+        """Read the on-disk metadata cache."""
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path) as f:
+                # Entries keyed by provider URL predate chain ID keys and are dropped
+                return {
+                    key: TokenMetadata(**value) for key, value in json.load(f).items()
+                    if '|' not in key
+                }
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"⚠️ Ignoring unreadable token metadata cache {self.cache_path}: {str(e)}")
+            return {}
+
+    def _save(self, key: str, metadata: TokenMetadata) -> None:
+        """Add an entry to the metadata file, which other processes may share."""
+        # Saves run on worker threads; without the lock concurrent ones drop each other's entries
+        with self._save_lock:
+            entries = self._load()
+            entries[key] = metadata
+            directory = os.path.dirname(self.cache_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with tempfile.NamedTemporaryFile(
+                "w", dir=directory or ".", suffix=".tmp", delete=False
+            ) as f:
+                json.dump({
+                    key: {'decimals': value.decimals, 'symbol': value.symbol}
+                    for key, value in entries.items()
+                }, f)
+            try:
+                os.replace(f.name, self.cache_path)
+            except OSError:
+                os.unlink(f.name)
+                raise
@@ -0,0 +1,213 @@
+"""
+Fee and chain-parameter oracle for sending transactions.
+
+This module provides an oracle that caches the chain ID for the life of
+the process, refreshes EIP-1559 fee data once per block from
+eth_feeHistory (falling back to the legacy gas price where needed) and
+sizes gas limits from the gas recent transactions actually used.
+"""
+
+import asyncio
+import statistics
+import time
+import weakref
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+from web3 import Web3
+from web3.exceptions import Web3RPCError
+from ..chain.client import ChainClient, method_unsupported
+from ..utils.logger import logger
+
+# Fee fields a replacement must raise; nodes require at least +10% on each
+_FEE_FIELDS = ('maxFeePerGas', 'maxPriorityFeePerGas', 'gasPrice')
+_REPLACEMENT_BUMP = 1.125
+
+# Extra gas for writing a storage slot that was zero, e.g. the balance of
+# a first-time recipient, which recent samples may never have paid
+_NEW_SLOT_GAS = 20_000
+
+class FeeOracle:
+    """
+    Supplies chain ID, fee fields and gas limits for transactions.
+    
+    EIP-1559 fees are maxPriorityFeePerGas at the requested percentile
+    of recent blocks' tips and maxFeePerGas of twice the next base fee
+    plus that tip, which stays valid through several full blocks. Gas
+    limits are the largest recent gasUsed for the same token and method
+    with a safety margin, plus room for writing a fresh storage slot so a
+    transfer to an empty account cannot run out of gas; until a receipt
+    has been seen they come from eth_estimateGas.
+    """
+    
+    _shared: 'weakref.WeakKeyDictionary[Web3, FeeOracle]' = weakref.WeakKeyDictionary()
+
+    def __init__(
+        self,
+        web3: Web3,
+        block_time: float = 12.0,
+        history_blocks: int = 5,
+        priority_percentile: float = 50.0,
+        gas_margin: float = 1.2,
+        gas_samples: int = 20
+    ) -> None:
+        """
+        Initialize the oracle.
+        
+        Args:
+            web3 (Web3): Web3 instance used for the calls
+            block_time (float): Seconds fee data stays valid, one block
+            history_blocks (int): Blocks of fee history to consider
+            priority_percentile (float): Percentile of recent tips to pay
+            gas_margin (float): Factor applied to observed gas usage
+            gas_samples (int): Recent gasUsed values kept per method
+        """
+        self.web3 = web3
+        self.chain = ChainClient.for_web3(web3)
+        self.block_time = block_time
+        self.history_blocks = history_blocks
+        self.priority_percentile = priority_percentile
+        self.gas_margin = gas_margin
+        self.gas_samples = gas_samples
+        self._chain_id: Optional[int] = None
+        self._fees: Optional[Dict[str, int]] = None
+        self._fees_at = 0.0
+        self._refresh_task: Optional[asyncio.Future] = None
+        self._eip1559 = True
+        self._gas_used: Dict[Tuple[str, str], Deque[int]] = {}
+
+    @classmethod
+    def for_web3(cls, web3: Web3) -> 'FeeOracle':
+        """
+        Get the oracle shared by everything using the given Web3 instance.
+        
+        Args:
+            web3 (Web3): Web3 instance
+
+        Returns:
+            FeeOracle: Shared oracle
+        """
+        oracle = cls._shared.get(web3)
+        if oracle is None:
+            oracle = cls._shared[web3] = cls(web3)
+        return oracle
+
+    async def chain_id(self) -> int:
+        """
+        Get the chain ID, fetched once per process.
+        
+        Returns:
+            int: Chain ID
+        """
+        if self._chain_id is None:
+            self._chain_id = await self.chain.call(lambda: self.web3.eth.chain_id)
+        return self._chain_id
+
+    async def fee_params(self) -> Dict[str, int]:
+        """
+        Get the fee fields for a new transaction.
+        
+        Returns:
+            Dict[str, int]: maxFeePerGas and maxPriorityFeePerGas, or
+                gasPrice on chains without EIP-1559
+        """
+        if self._fees is None or time.time() - self._fees_at > self.block_time:
+            if self._refresh_task is None:
+                self._refresh_task = asyncio.ensure_future(self._refresh())
+                self._refresh_task.add_done_callback(self._refresh_done)
+            await asyncio.shield(self._refresh_task)
+        return dict(self._fees)
+
+    async def replacement_fees(self, previous: Dict[str, int]) -> Dict[str, int]:
+        """
+        Get fee fields for replacing a pending transaction with the same nonce.
+        
+        Args:
+            previous (Dict[str, int]): Transaction being replaced
+
+        Returns:
+            Dict[str, int]: Its fee fields, each raised to the current
+                fee or by an eighth, whichever is higher
+        """
+        current = await self.fee_params()
+        return {
+            field: max(current.get(field, 0), int(previous[field] * _REPLACEMENT_BUMP) + 1)
+            for field in _FEE_FIELDS if field in previous
+        }
+
+    async def gas_limit(self, token_address: str, method: str, function: Any, sender: str) -> int:
+        """
+        Get the gas limit for calling a token method.
+        
+        Args:
+            token_address (str): Address of the token contract
+            method (str): Name of the called method, e.g. "transfer"
+            function (Any): Bound contract function, used for
+                eth_estimateGas while no gas usage has been recorded
+            sender (str): Address the transaction is sent from
+
+        Returns:
+            int: Gas limit
+        """
+        samples = self._gas_used.get((token_address.lower(), method))
+        if samples:
+            return int(max(samples) * self.gas_margin) + _NEW_SLOT_GAS
+        used = await self.chain.call(function.estimate_gas, {'from': sender})
+        return int(used * self.gas_margin)
+
+    def record_gas_used(self, token_address: str, method: str, gas_used: int) -> None:
+        """
+        Remember how much gas a confirmed call used.
+        
+        Args:
+            token_address (str): Address of the token contract
+            method (str): Name of the called method
+            gas_used (int): gasUsed from the transaction's receipt
+        """
+        key = (token_address.lower(), method)
+        samples = self._gas_used.get(key)
+        if samples is None:
+            samples = self._gas_used[key] = deque(maxlen=self.gas_samples)
+        samples.append(gas_used)
+
+    def _refresh_done(self, task: asyncio.Future) -> None:
+        """Allow the next lookup to start a new refresh."""
+        self._refresh_task = None
+
+    async def _refresh(self) -> None:
+        """Fetch fee data for the next block."""
+        fees = None
+        if self._eip1559:
+            try:
+                fees = await self._eip1559_fees()
+            except Web3RPCError as e:
+                if method_unsupported(e):
+                    self._eip1559 = False
+                    logger.warning(f"⚠️ Fee history unavailable, using legacy gas price: {str(e)}")
+                else:
+                    logger.warning(f"⚠️ Failed to read fee history, using legacy gas price: {str(e)}")
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to read fee history, using legacy gas price: {str(e)}")
+        if fees is None:
+            gas_price = await self.chain.call(lambda: self.web3.eth.gas_price)
+            fees = {'gasPrice': int(gas_price * 1.1)}
+        self._fees = fees
+        self._fees_at = time.time()
+
+    async def _eip1559_fees(self) -> Optional[Dict[str, int]]:
+        """Derive EIP-1559 fees from recent fee history, None if the chain lacks a base fee."""
+        history = await self.chain.call(
+            self.web3.eth.fee_history,
+            self.history_blocks,
+            'latest',
+            [self.priority_percentile]
+        )
+        base_fees = history.get('baseFeePerGas') or []
+        if not base_fees or not base_fees[-1]:
+            self._eip1559 = False
+            return None
+        tips = [reward[0] for reward in history.get('reward') or [] if reward]
+        priority_fee = int(statistics.median(tips)) if tips else 0
+        return {
+            'maxPriorityFeePerGas': priority_fee,
+            'maxFeePerGas': 2 * base_fees[-1] + priority_fee,
+        }
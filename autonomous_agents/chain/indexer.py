@@ -0,0 +1,250 @@
+"""
+Incremental ERC20 Transfer-event indexer.
+
+This module provides an indexer that follows the Transfer logs of one
+token with eth_getLogs over block ranges and keeps the balances of the
+watched addresses in memory. Its position and balances are saved to a
+JSON file, so a restarted indexer resumes where it stopped instead of
+rescanning the chain.
+"""
+
+import asyncio
+import json
+import os
+from typing import Any, Dict, Iterable, Optional, Set
+from web3 import Web3
+from ..chain.client import ChainClient
+from ..chain.contracts import ContractRegistry
+from ..utils.logger import logger
+
+# keccak256("Transfer(address,address,uint256)")
+TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+
+# Blocks kept behind the head; deeper reorgs than this are not expected
+DEFAULT_CONFIRMATIONS = 5
+
+def _to_bytes(value: Any) -> bytes:
+    """Convert a log field given as bytes or hex string to bytes."""
+    if isinstance(value, str):
+        return bytes.fromhex(value[2:] if value.startswith("0x") else value)
+    return bytes(value)
+
+class TransferIndexer:
+    """
+    Keeps token balances of watched addresses up to date from Transfer logs.
+    
+    A newly watched address is seeded with balanceOf at the block the
+    sync indexed up to, after which only logs are applied. That block is
+    only a few confirmations old, so seeding works against nodes that
+    keep recent state and do not need to be archive nodes. The indexer
+    trails the chain head by those confirmations so that reorgs no
+    deeper than them never reach the balances; logs flagged as removed
+    are skipped.
+    """
+    
+    def __init__(
+        self,
+        web3: Web3,
+        token_address: str,
+        state_path: Optional[str] = None,
+        block_range: int = 2000,
+        confirmations: int = DEFAULT_CONFIRMATIONS,
+        poll_interval: float = 2.0
+    ) -> None:
+        """
+        Initialize the indexer.
+        
+        Args:
+            web3 (Web3): Web3 instance used for the calls
+            token_address (str): Address of the indexed token contract
+            state_path (Optional[str]): JSON file the position and balances
+                are saved to; None keeps them in memory only
+            block_range (int): Largest block range per eth_getLogs call,
+                halved automatically when the provider rejects a range
+            confirmations (int): Blocks to stay behind the chain head;
+                0 indexes the head itself and is not reorg safe
+            poll_interval (float): Seconds between syncs when running
+        """
+        self.web3 = web3
+        self.chain = ChainClient.for_web3(web3)
+        self.token_address = web3.to_checksum_address(token_address)
+        self.token_contract = ContractRegistry.shared().contract(web3, self.token_address)
+        self.state_path = state_path
+        self.block_range = block_range
+        self.confirmations = confirmations
+        self.poll_interval = poll_interval
+        self.last_block: Optional[int] = None
+        self.balances: Dict[str, int] = {}
+        self.watched: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._sync_lock = asyncio.Lock()
+        self._load()
+
+    def watch(self, addresses: Iterable[str]) -> None:
+        """
+        Track the balances of addresses; they are seeded on the next sync.
+        
+        Args:
+            addresses (Iterable[str]): Addresses to track
+        """
+        for address in addresses:
+            self.watched.add(self.web3.to_checksum_address(address))
+
+    def covers(self, token_address: str, address: str) -> bool:
+        """
+        Check whether the index has a balance for a token and address.
+        
+        Args:
+            token_address (str): Address of the token contract
+            address (str): Address whose balance is needed
+
+        Returns:
+            bool: True if balance_of() can answer without an RPC call
+        """
+        return (
+            self.web3.to_checksum_address(token_address) == self.token_address
+            and self.web3.to_checksum_address(address) in self.balances
+        )
+
+    def balance_of(self, address: str) -> int:
+        """
+        Get an address's indexed balance.
+        
+        Args:
+            address (str): Watched address
+
+        Returns:
+            int: Balance in the token's smallest unit as of last_block
+
+        Raises:
+            LookupError: If the address has not been indexed yet
+        """
+        address = self.web3.to_checksum_address(address)
+        if address not in self.balances:
+            raise LookupError(f"Balance of {address} is not indexed")
+        return self.balances[address]
+
+    def start(self) -> None:
+        """Start syncing in the background if not running yet."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._follow())
+
+    async def stop(self) -> None:
+        """Stop background syncing."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def sync(self) -> int:
+        """
+        Index every confirmed block after last_block.
+        
+        Returns:
+            int: Number of Transfer logs applied
+        """
+        async with self._sync_lock:
+            head = await self.chain.call(lambda: self.web3.eth.block_number)
+            target = head - self.confirmations
+            if self.last_block is None:
+                self.last_block = target
+
+            applied = 0
+            while self.last_block < target:
+                start = self.last_block + 1
+                end = min(target, start + self.block_range - 1)
+                try:
+                    logs = await self.chain.call(self.web3.eth.get_logs, {
+                        'address': self.token_address,
+                        'fromBlock': start,
+                        'toBlock': end,
+                        'topics': [TRANSFER_TOPIC],
+                    })
+                except Exception as e:
+                    if end == start:
+                        raise
+                    self.block_range = max(1, (end - start + 1) // 2)
+                    logger.warning(f"⚠️ Narrowing log range to {self.block_range} blocks: {str(e)}")
+                    continue
+                applied += self.apply_logs(logs)
+                self.last_block = end
+            # Seed only once caught up, so no log is applied on top of a
+            # balance that already includes it
+            await self._seed()
+            if self.state_path:
+                await self.chain.call(self._save)
+            return applied
+
+    def apply_logs(self, logs: Iterable[Any]) -> int:
+        """
+        Apply Transfer logs to the balances of watched addresses.
+        
+        Args:
+            logs (Iterable[Any]): Logs as returned by eth_getLogs, with
+                topics and data given as bytes or hex strings
+
+        Returns:
+            int: Number of logs applied
+        """
+        applied = 0
+        for log in logs:
+            if log.get('removed'):
+                continue
+            topics = log['topics']
+            if len(topics) != 3 or _to_bytes(topics[0]) != _to_bytes(TRANSFER_TOPIC):
+                continue
+            sender = self.web3.to_checksum_address("0x" + _to_bytes(topics[1])[-20:].hex())
+            receiver = self.web3.to_checksum_address("0x" + _to_bytes(topics[2])[-20:].hex())
+            value = int.from_bytes(_to_bytes(log['data']), "big")
+            if sender in self.balances:
+                self.balances[sender] -= value
+            if receiver in self.balances:
+                self.balances[receiver] += value
+            applied += 1
+        return applied
+
+    async def _seed(self) -> None:
+        """Read balances of newly watched addresses at last_block, the block just indexed."""
+        for address in self.watched - self.balances.keys():
+            self.balances[address] = await self.chain.call(
+                self.token_contract.functions.balanceOf(address).call,
+                block_identifier=self.last_block
+            )
+
+    async def _follow(self) -> None:
+        """Sync repeatedly until stopped."""
+        while True:
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.error(f"❌ Transfer indexing failed: {str(e)}")
+            await asyncio.sleep(self.poll_interval)
+
+    def _load(self) -> None:
+        """Restore position and balances from the state file, if it matches the token."""
+        if not self.state_path or not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Ignoring unreadable index state {self.state_path}: {str(e)}")
+            return
+        if state.get('token_address') != self.token_address:
+            return
+        self.last_block = state['last_block']
+        self.balances = {address: int(balance) for address, balance in state['balances'].items()}
+
+    def _save(self) -> None:
+        """Atomically write position and balances to the state file."""
+        if not self.state_path:
+            return
+        temporary = f"{self.state_path}.tmp"
+        with open(temporary, "w") as f:
+            json.dump({
+                'token_address': self.token_address,
+                'last_block': self.last_block,
+                # Balances can exceed what JSON readers handle as numbers
+                'balances': {address: str(balance) for address, balance in self.balances.items()},
+            }, f)
+        os.replace(temporary, self.state_path)
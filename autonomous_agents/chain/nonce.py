@@ -0,0 +1,297 @@
+"""
+Local nonce management for wallets sending many transactions.
+
+This module provides a manager that hands out transaction nonces per
+source address without asking the node each time, so one wallet can
+have many transactions pending at once. The chain's pending transaction
+count is only read when an address is first used and after a send fails
+with a nonce error. State can be kept in Redis so that several processor
+instances can send from the same wallet; a counter left ahead of the
+chain by a crashed instance is reset once no instance is using it.
+"""
+
+import asyncio
+import heapq
+from typing import Callable, Dict, List, Optional, Set
+from redis.asyncio import Redis
+from web3 import Web3
+from ..chain.client import ChainClient
+from ..utils.logger import logger
+
+# Node errors meaning the local view of a wallet's nonces is wrong
+_NONCE_ERRORS = ("nonce too low", "nonce too high", "replacement transaction underpriced")
+
+# Node errors meaning it already holds the exact transaction sent
+_KNOWN_ERRORS = ("already known", "known transaction")
+
+# Refresh the lease and take a released nonce or the next new one, in one step
+_RESERVE_NONCE = """
+redis.call('set', KEYS[3], 1, 'PX', ARGV[1])
+local gap = redis.call('zpopmin', KEYS[2])
+if gap[1] then
+    return tonumber(gap[2])
+end
+return redis.call('incr', KEYS[1]) - 1
+"""
+
+# Reset the counter to the pending count if it is behind the chain, or
+# ahead of it with no instance holding the lease; returns 2 for a stale counter
+_SYNC_NONCE = """
+local stored = tonumber(redis.call('get', KEYS[1]))
+local pending = tonumber(ARGV[1])
+local result = 0
+if stored == nil or stored < pending then
+    result = 1
+elseif stored > pending and redis.call('exists', KEYS[3]) == 0 then
+    result = 2
+end
+if result > 0 then
+    redis.call('set', KEYS[1], pending)
+    redis.call('del', KEYS[2])
+end
+return result
+"""
+
+def already_known(error: Exception) -> bool:
+    """
+    Check whether a send failed only because the node already has the transaction.
+    
+    Such a send has succeeded: the transaction is pending under its own
+    hash, so its nonce must not be handed out again.
+    
+    Args:
+        error (Exception): Error raised by send_raw_transaction
+
+    Returns:
+        bool: True if the node already holds the transaction
+    """
+    message = str(error).lower()
+    return any(reason in message for reason in _KNOWN_ERRORS)
+
+class NonceManager:
+    """
+    Reserves nonces per source address.
+    
+    A nonce whose transaction never reached the node is released and
+    handed out again before any new one, which fills the gap so later
+    transactions are not stuck behind it. check_unconfirmed() tells
+    whether a transaction that was accepted but never confirmed was
+    mined, is still pending, was dropped, or waits behind a gap of
+    nonces the node never got, so the sender can replace it or fill the
+    gap with release_gap().
+    """
+    
+    def __init__(
+        self,
+        web3: Web3,
+        redis: Optional[Redis] = None,
+        key_prefix: str = "nonce",
+        lease_ms: int = 60_000
+    ) -> None:
+        """
+        Initialize the manager.
+        
+        Args:
+            web3 (Web3): Web3 instance used to read pending counts
+            redis (Optional[Redis]): Client to keep the state in, shared by
+                every manager using it; None keeps it in this process
+            key_prefix (str): Prefix of the Redis keys
+            lease_ms (int): Milliseconds after its last reservation a
+                shared counter counts as in use by another instance
+        """
+        self.web3 = web3
+        self.chain = ChainClient.for_web3(web3)
+        self.redis = redis
+        self.key_prefix = key_prefix
+        self.lease_ms = lease_ms
+        self._next: Dict[str, int] = {}
+        self._released: Dict[str, List[int]] = {}
+        self._synced: Set[str] = set()
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def reserve(self, address: str) -> int:
+        """
+        Reserve the next nonce for an address.
+        
+        Args:
+            address (str): Source address
+
+        Returns:
+            int: Nonce to send the next transaction with
+        """
+        address = self.web3.to_checksum_address(address)
+        async with self._lock(address):
+            if self.redis is not None:
+                return await self._reserve_shared(address)
+            if address not in self._next:
+                self._next[address] = await self._pending_count(address)
+            released = self._released.get(address)
+            if released:
+                return heapq.heappop(released)
+            nonce = self._next[address]
+            self._next[address] = nonce + 1
+            return nonce
+
+    async def release(self, address: str, nonce: int) -> None:
+        """
+        Return a reserved nonce whose transaction was never sent.
+        
+        Args:
+            address (str): Source address
+            nonce (int): Nonce to hand out again
+        """
+        address = self.web3.to_checksum_address(address)
+        if self.redis is not None:
+            await self.redis.zadd(self._gaps_key(address), {str(nonce): nonce})
+        else:
+            heapq.heappush(self._released.setdefault(address, []), nonce)
+
+    async def resync(self, address: str) -> None:
+        """
+        Restart an address's nonces from the chain's pending count.
+        
+        Args:
+            address (str): Source address
+        """
+        address = self.web3.to_checksum_address(address)
+        async with self._lock(address):
+            pending = await self._pending_count(address)
+            if self.redis is not None:
+                await self._reset_shared(address, pending)
+            else:
+                self._next[address] = pending
+                self._released.pop(address, None)
+        logger.info(f"🔢 Nonces for {address[:6]}...{address[-4:]} resynced at {pending}")
+
+    def forget(self, select: Callable[[str], bool]) -> None:
+        """
+        Drop this process's nonce state for some addresses.
+        
+        Their next reservation reads the chain's pending count again, as
+        needed after another process may have sent from them. State kept
+        in Redis is shared and left alone.
+        
+        Args:
+            select (Callable[[str], bool]): Picks the addresses to forget
+        """
+        for address in [address for address in self._next if select(address)]:
+            del self._next[address]
+            self._released.pop(address, None)
+
+    async def send_failed(self, address: str, nonce: int, error: Exception) -> None:
+        """
+        Recover after sending with a reserved nonce failed.
+        
+        Args:
+            address (str): Source address
+            nonce (int): Nonce the failed transaction used
+            error (Exception): Error raised by the send
+        """
+        message = str(error).lower()
+        if any(reason in message for reason in _NONCE_ERRORS):
+            await self.resync(address)
+        else:
+            await self.release(address, nonce)
+
+    async def check_unconfirmed(self, address: str, nonce: int) -> str:
+        """
+        Find out what became of a transaction that stayed unconfirmed.
+        
+        Args:
+            address (str): Source address
+            nonce (int): Nonce the transaction was sent with
+
+        Returns:
+            str: "mined" if a transaction with this nonce was mined,
+                "pending" if the node still holds one, "dropped" if the
+                node lost it and later nonces are stuck behind it, or
+                "gap" if it waits behind lower nonces the node never got
+        """
+        address = self.web3.to_checksum_address(address)
+        latest = await self.chain.call(self.web3.eth.get_transaction_count, address, 'latest')
+        if nonce < latest:
+            return "mined"
+        pending = await self._pending_count(address)
+        if nonce < pending:
+            return "pending"
+        return "dropped" if nonce == pending else "gap"
+
+    async def release_gap(self, address: str, nonce: int) -> int:
+        """
+        Hand out the nonces missing below a stuck transaction again.
+        
+        Replacing the stuck transaction would not help, since the node
+        keeps it queued until every lower nonce is used.
+        
+        Args:
+            address (str): Source address
+            nonce (int): Nonce of the transaction waiting behind the gap
+
+        Returns:
+            int: Number of nonces released
+        """
+        address = self.web3.to_checksum_address(address)
+        missing = range(await self._pending_count(address), nonce)
+        if not missing:
+            return 0
+        if self.redis is not None:
+            await self.redis.zadd(self._gaps_key(address), {str(gap): gap for gap in missing})
+        else:
+            released = self._released.setdefault(address, [])
+            for gap in set(missing).difference(released):
+                heapq.heappush(released, gap)
+        logger.warning(f"🔢 Nonces {missing.start}-{missing.stop - 1} of {address[:6]}...{address[-4:]} are handed out again")
+        return len(missing)
+
+    async def _reserve_shared(self, address: str) -> int:
+        """Reserve a nonce from the state kept in Redis."""
+        if address not in self._synced:
+            await self._sync_shared(address)
+        # One script, so no other instance sees the counter moved without the lease
+        return int(await self.redis.eval(
+            _RESERVE_NONCE, 3,
+            self._key(address), self._gaps_key(address), self._lease_key(address),
+            self.lease_ms
+        ))
+
+    async def _sync_shared(self, address: str) -> None:
+        """Check the shared counter against the chain before this process first uses it."""
+        pending = await self._pending_count(address)
+        # Checked and reset in one script, so a reservation cannot slip in between
+        result = await self.redis.eval(
+            _SYNC_NONCE, 3,
+            self._key(address), self._gaps_key(address), self._lease_key(address),
+            pending
+        )
+        if int(result) == 2:
+            # Nonces reserved by an instance that stopped before sending them
+            logger.warning(f"🔢 Nonce counter for {address[:6]}...{address[-4:]} was ahead of the chain, reset to {pending}")
+        self._synced.add(address)
+
+    async def _reset_shared(self, address: str, pending: int) -> None:
+        """Restart the shared counter at pending and forget released nonces."""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.set(self._key(address), pending)
+            pipe.delete(self._gaps_key(address))
+            await pipe.execute()
+        self._synced.add(address)
+
+    async def _pending_count(self, address: str) -> int:
+        """Read the chain's transaction count for address, including pending ones."""
+        return await self.chain.call(self.web3.eth.get_transaction_count, address, 'pending')
+
+    def _lock(self, address: str) -> asyncio.Lock:
+        """Get the lock serializing changes for address."""
+        return self._locks.setdefault(address, asyncio.Lock())
+
+    def _key(self, address: str) -> str:
+        """Redis key holding the next new nonce for address."""
+        return f"{self.key_prefix}:{address}"
+
+    def _gaps_key(self, address: str) -> str:
+        """Redis sorted set holding released nonces for address."""
+        return f"{self.key_prefix}_gaps:{address}"
+
+    def _lease_key(self, address: str) -> str:
+        """Redis key present while some instance is reserving nonces for address."""
+        return f"{self.key_prefix}_lease:{address}"
@@ -0,0 +1,118 @@
+"""
+Pooled, keep-alive Web3 providers.
+
+This module provides a pool that hands out one Web3 instance per RPC
+endpoint URL, each backed by a persistent HTTP session with a bounded
+connection pool, so requests reuse TCP/TLS connections instead of
+setting up a new one per transfer.
+"""
+
+import threading
+import time
+from typing import Any, Dict, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from web3 import Web3
+
+class _KeepAliveAdapter(HTTPAdapter):
+    """HTTP adapter that drops connections left idle for too long."""
+
+    def __init__(self, idle_timeout: float, **kwargs: Any) -> None:
+        self.idle_timeout = idle_timeout
+        self.last_used = time.monotonic()
+        super().__init__(**kwargs)
+
+    def send(self, request: requests.PreparedRequest, **kwargs: Any) -> requests.Response:
+        # Servers and load balancers close idle keep-alive connections;
+        # reconnecting up front avoids a failed request on a dead socket
+        now = time.monotonic()
+        if now - self.last_used > self.idle_timeout:
+            self.poolmanager.clear()
+        self.last_used = now
+        return super().send(request, **kwargs)
+
+class ProviderPool:
+    """
+    Shares one keep-alive Web3 instance per endpoint URL.
+    
+    Each endpoint gets its own requests session whose connection pool
+    holds up to pool_maxsize connections, enough for every thread of a
+    ChainClient to have a request in flight.
+    """
+    
+    _shared: Optional['ProviderPool'] = None
+
+    def __init__(
+        self,
+        pool_maxsize: int = 32,
+        idle_timeout: float = 60.0,
+        request_timeout: float = 30.0
+    ) -> None:
+        """
+        Initialize the pool.
+        
+        Args:
+            pool_maxsize (int): Maximum open connections per endpoint
+            idle_timeout (float): Seconds after which an unused connection
+                is dropped instead of reused
+            request_timeout (float): Timeout of a single RPC request
+        """
+        self.pool_maxsize = pool_maxsize
+        self.idle_timeout = idle_timeout
+        self.request_timeout = request_timeout
+        self._web3s: Dict[str, Web3] = {}
+        self._sessions: Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> 'ProviderPool':
+        """
+        Get the pool shared by the whole process.
+        
+        Returns:
+            ProviderPool: Shared pool
+        """
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def get(self, endpoint_url: str) -> Web3:
+        """
+        Get the Web3 instance for an endpoint, creating it on first use.
+        
+        Args:
+            endpoint_url (str): HTTP(S) URL of the RPC endpoint
+
+        Returns:
+            Web3: Web3 instance shared by all users of the endpoint
+        """
+        web3 = self._web3s.get(endpoint_url)
+        if web3 is not None:
+            return web3
+        with self._lock:
+            web3 = self._web3s.get(endpoint_url)
+            if web3 is None:
+                session = requests.Session()
+                adapter = _KeepAliveAdapter(
+                    self.idle_timeout,
+                    pool_connections=1,
+                    pool_maxsize=self.pool_maxsize
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                web3 = Web3(Web3.HTTPProvider(
+                    endpoint_url,
+                    request_kwargs={'timeout': self.request_timeout},
+                    session=session
+                ))
+                self._sessions[endpoint_url] = session
+                self._web3s[endpoint_url] = web3
+        return web3
+
+    def close(self) -> None:
+        """Close every session; the pool can be used again afterwards."""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+            self._web3s.clear()
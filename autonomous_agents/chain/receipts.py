@@ -0,0 +1,213 @@
+"""
+Batched confirmation of sent transactions.
+
+This module provides a watcher that tracks every pending transaction
+hash and, once per new block, fetches all of that block's receipts in
+one call, so a single watcher confirms any number of transactions with
+a few RPC calls per block instead of polling each hash separately.
+"""
+
+import asyncio
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from web3 import Web3
+from web3.exceptions import TransactionNotFound, Web3RPCError
+from ..chain.client import ChainClient, method_unsupported
+from ..utils.logger import logger
+
+class ReceiptWatcher:
+    """
+    Resolves waiting transactions from per-block receipt batches.
+    
+    Blocks are read with eth_getBlockReceipts. Against nodes that do not
+    offer it, the watcher falls back to one receipt lookup per pending
+    hash per poll. Block headers, needed for timestamps, are cached. A
+    transaction whose receipt was found but whose header could not be
+    fetched stays pending and has its header retried on the next poll.
+    """
+    
+    _shared: 'weakref.WeakKeyDictionary[Web3, ReceiptWatcher]' = weakref.WeakKeyDictionary()
+
+    def __init__(
+        self,
+        web3: Web3,
+        poll_interval: float = 1.0,
+        timeout: float = 120.0,
+        header_cache_size: int = 128
+    ) -> None:
+        """
+        Initialize the watcher.
+        
+        Args:
+            web3 (Web3): Web3 instance used for the calls
+            poll_interval (float): Seconds between chain head checks
+            timeout (float): Seconds a transaction may stay unconfirmed
+            header_cache_size (int): Number of block headers kept
+        """
+        self.web3 = web3
+        self.chain = ChainClient.for_web3(web3)
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.header_cache_size = header_cache_size
+        self.last_block: Optional[int] = None
+        self._pending: Dict[bytes, Tuple[asyncio.Future, float]] = {}
+        self._mined: Dict[bytes, Any] = {}
+        self._headers: 'OrderedDict[int, Any]' = OrderedDict()
+        self._block_receipts_supported = True
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def for_web3(cls, web3: Web3) -> 'ReceiptWatcher':
+        """
+        Get the watcher shared by everything using the given Web3 instance.
+        
+        Args:
+            web3 (Web3): Web3 instance
+
+        Returns:
+            ReceiptWatcher: Shared watcher
+        """
+        watcher = cls._shared.get(web3)
+        if watcher is None:
+            watcher = cls._shared[web3] = cls(web3)
+        return watcher
+
+    async def wait(self, tx_hash: bytes) -> Tuple[Any, Any]:
+        """
+        Wait until a transaction is included in a block.
+        
+        Args:
+            tx_hash (bytes): Hash of a sent transaction
+
+        Returns:
+            Tuple[Any, Any]: The transaction's receipt and its block header
+
+        Raises:
+            TimeoutError: If no receipt appeared within the timeout
+        """
+        loop = asyncio.get_running_loop()
+        key = bytes(tx_hash)
+        if key not in self._pending:
+            self._pending[key] = (loop.create_future(), loop.time() + self.timeout)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._watch())
+        return await asyncio.shield(self._pending[key][0])
+
+    async def lookup(self, tx_hash: bytes) -> Optional[Tuple[Any, Any]]:
+        """
+        Look up the receipt of a transaction that may already be mined.
+        
+        wait() only sees blocks from when it was called, so this is how
+        a transaction from an earlier block is found.
+        
+        Args:
+            tx_hash (bytes): Hash of a sent transaction
+
+        Returns:
+            Optional[Tuple[Any, Any]]: The receipt and its block header,
+                or None if the transaction is not mined
+        """
+        try:
+            receipt = await self.chain.call(self.web3.eth.get_transaction_receipt, tx_hash)
+        except TransactionNotFound:
+            return None
+        return receipt, await self._header(receipt['blockNumber'])
+
+    async def _watch(self) -> None:
+        """Confirm pending transactions block by block until none are left."""
+        while self._pending:
+            if self._mined:
+                await self._resolve(list(self._mined.values()))
+            try:
+                head = await self.chain.call(lambda: self.web3.eth.block_number)
+                if self.last_block is None:
+                    # A transaction sent just before tracking started may already be in the head block
+                    self.last_block = head - 1
+                if head > self.last_block:
+                    await self._confirm_blocks(self.last_block + 1, head)
+                    self.last_block = head
+            except Exception as e:
+                logger.error(f"❌ Failed to fetch receipts: {str(e)}")
+            self._expire()
+            if self._pending:
+                await asyncio.sleep(self.poll_interval)
+        self.last_block = None
+
+    async def _confirm_blocks(self, first: int, last: int) -> None:
+        """Resolve the pending transactions included in blocks first..last."""
+        if self._block_receipts_supported:
+            for number in range(first, last + 1):
+                try:
+                    receipts = await self.chain.call(self.web3.eth.get_block_receipts, number)
+                except Web3RPCError as e:
+                    if not method_unsupported(e):
+                        # Retried from this block on the next poll
+                        raise
+                    self._block_receipts_supported = False
+                    logger.warning(f"⚠️ eth_getBlockReceipts unavailable, polling receipts per transaction: {str(e)}")
+                    break
+                await self._resolve(receipts)
+                self.last_block = number
+            else:
+                return
+        await self._resolve(await self._pending_receipts())
+
+    async def _pending_receipts(self) -> List[Any]:
+        """Look up the receipt of every pending transaction."""
+        hashes = [tx_hash for tx_hash in self._pending if tx_hash not in self._mined]
+        results = await asyncio.gather(*(
+            self.chain.call(self.web3.eth.get_transaction_receipt, tx_hash) for tx_hash in hashes
+        ), return_exceptions=True)
+        receipts = []
+        for result in results:
+            if isinstance(result, TransactionNotFound):
+                continue
+            if isinstance(result, Exception):
+                raise result
+            receipts.append(result)
+        return receipts
+
+    async def _resolve(self, receipts: Iterable[Any]) -> None:
+        """Complete the futures of pending transactions found in receipts."""
+        for receipt in receipts:
+            key = bytes(receipt['transactionHash'])
+            entry = self._pending.get(key)
+            if entry is None:
+                continue
+            try:
+                header = await self._header(receipt['blockNumber'])
+            except Exception as e:
+                # The transaction is mined, so only a timeout may fail it
+                logger.warning(f"⚠️ Failed to fetch block {receipt['blockNumber']}, retrying: {str(e)}")
+                self._mined[key] = receipt
+                continue
+            del self._pending[key]
+            self._mined.pop(key, None)
+            future = entry[0]
+            if not future.done():
+                future.set_result((receipt, header))
+
+    async def _header(self, number: int) -> Any:
+        """Get a block header, from the cache when possible."""
+        header = self._headers.get(number)
+        if header is None:
+            header = await self.chain.call(self.web3.eth.get_block, number)
+            self._headers[number] = header
+            if len(self._headers) > self.header_cache_size:
+                self._headers.popitem(last=False)
+        else:
+            self._headers.move_to_end(number)
+        return header
+
+    def _expire(self) -> None:
+        """Fail transactions that stayed unconfirmed past the timeout."""
+        now = asyncio.get_running_loop().time()
+        for tx_hash, (future, deadline) in list(self._pending.items()):
+            if now >= deadline:
+                del self._pending[tx_hash]
+                self._mined.pop(tx_hash, None)
+                if not future.done():
+                    future.set_exception(TimeoutError(
+                        f"No receipt for 0x{tx_hash.hex()} after {self.timeout}s"
+                    ))
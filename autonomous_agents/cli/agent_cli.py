@@ -1,15 +1,17 @@
-from autonomous_agents.main import AgentSystem
+from autonomous_agents.main import AgentSystem, default_topology
 import click
 import asyncio
 
 
 @click.command()
 @click.option('--debug', is_flag=True, help='Enable debug logging')
-def main(debug):
+@click.option('--agents', default=2, show_default=True, help='Number of agents in the ring topology')
+@click.option('--workers', default=1, show_default=True, help='Number of worker processes to shard agents across')
+def main(debug, agents, workers):
     """Run the autonomous agents system."""
     if debug:
         from ..utils.logger import logger
         logger.setLevel("DEBUG")
     
-    system = AgentSystem()
+    system = AgentSystem(default_topology(agents), workers=workers)
     asyncio.run(system.main())
\ No newline at end of file
@@ -5,11 +5,36 @@ import asyncio
 
 @click.command()
 @click.option('--debug', is_flag=True, help='Enable debug logging')
-def main(debug):
+@click.option('--workers', default=1, show_default=True, help='Maximum number of transfers in flight')
+@click.option('--shared-nonces', is_flag=True, help='Keep wallet nonces in Redis so several processors can share wallets')
+@click.option('--coalesce-window', default=0.0, show_default=True, help='Seconds to gather queued transfers to the same target into one transaction')
+@click.option('--coalesce-max', default=50, show_default=True, help='Most queued transfers gathered per coalescing window')
+@click.option('--read-batch', default=100, show_default=True, help='Most queued transfers taken from Redis in one read')
+@click.option('--index', is_flag=True, help='Check balances of the configured wallets against a Transfer-event index')
+def main(debug, workers, shared_nonces, coalesce_window, coalesce_max, read_batch, index):
     """Run the transfer processor."""
     if debug:
         from ..utils.logger import logger
         logger.setLevel("DEBUG")
     
-    processor = TransferProcessor()
+    indexer = None
+    if index:
+        from ..chain.indexer import TransferIndexer
+        from ..chain.providers import ProviderPool
+        from .. import config
+        indexer = TransferIndexer(
+            ProviderPool.shared().get(config.WEB3_PROVIDER_URL),
+            config.TOKEN_ADDRESS,
+            state_path=config.TRANSFER_INDEX_PATH
+        )
+        indexer.watch([config.WALLET1_ADDRESS, config.WALLET2_ADDRESS])
+    
+    processor = TransferProcessor(
+        indexer,
+        workers=workers,
+        shared_nonces=shared_nonces,
+        coalesce_window=coalesce_window,
+        coalesce_max=coalesce_max,
+        read_batch=read_batch
+    )
     asyncio.run(processor.run())
\ No newline at end of file
@@ -31,7 +31,29 @@ WORDS = ["hello", "sun", "world", "space", "moon", "crypto", "sky", "ocean", "un
 ERC20_ABI = '''[
     {"constant":true,"inputs":[{"name":"_owner","type":"address"}],"name":"balanceOf","outputs":[{"name":"balance","type":"uint256"}],"type":"function"},
     {"constant":false,"inputs":[{"name":"_to","type":"address"},{"name":"_value","type":"uint256"}],"name":"transfer","outputs":[{"name":"success","type":"bool"}],"type":"function"},
-    {"constant":true,"inputs":[],"name":"decimals","outputs":[{"name":"","type":"uint8"}],"type":"function"}
+    {"constant":true,"inputs":[],"name":"decimals","outputs":[{"name":"","type":"uint8"}],"type":"function"},
+    {"constant":true,"inputs":[],"name":"symbol","outputs":[{"name":"","type":"string"}],"type":"function"}
 ]'''
 
+# Multicall3 is deployed at the same address on mainnet, Sepolia and most other chains
+MULTICALL3_ADDRESS = os.getenv('MULTICALL3_ADDRESS', '0xcA11bde05977b3631167028862bE2a173976CA11')
+MULTICALL3_ABI = '''[
+    {"inputs":[{"components":[{"name":"target","type":"address"},{"name":"allowFailure","type":"bool"},{"name":"callData","type":"bytes"}],"name":"calls","type":"tuple[]"}],"name":"aggregate3","outputs":[{"components":[{"name":"success","type":"bool"},{"name":"returnData","type":"bytes"}],"name":"returnData","type":"tuple[]"}],"stateMutability":"payable","type":"function"}
+]'''
+
+# File immutable token metadata (decimals, symbol) is cached in across runs
+TOKEN_METADATA_PATH = os.getenv(
+    'TOKEN_METADATA_PATH',
+    os.path.join(os.path.expanduser('~'), '.cache', 'autonomous_agents', 'token_metadata.json')
+)
+
+# File the Transfer-event indexer saves its position and balances to
+TRANSFER_INDEX_PATH = os.getenv('TRANSFER_INDEX_PATH', 'transfer_index.json')
+
+# Transfer queue backend: "list" (LPUSH/BRPOP) or "stream" (consumer group)
+TRANSFER_QUEUE_BACKEND = os.getenv('TRANSFER_QUEUE_BACKEND', 'list')
+
+# Number of transfer queue partitions; jobs are partitioned by source wallet
+TRANSFER_PARTITIONS = int(os.getenv('TRANSFER_PARTITIONS', '1'))
+
 REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379')
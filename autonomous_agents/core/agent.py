@@ -5,10 +5,11 @@ This module provides the main AutonomousAgent class that coordinates
 behaviors and message handling.
 """
 
-import asyncio
+import time
+from typing import Optional
 from ..utils.logger import logger
 from ..core.message import Message, MessageBox
-from ..core.registry import HandlerRegistry, BehaviorRegistry
+from ..core.registry import HandlerRegistry, BehaviorRegistry, DispatchMode
 from ..handlers.base import MessageHandler
 from ..behaviors.base import Behavior
 
@@ -18,17 +19,31 @@ class AutonomousAgent:
     and execute behaviors.
     """
     
-    def __init__(self, name: str):
+    def __init__(
+        self,
+        name: str,
+        poll_interval: float = 0.1,
+        max_batch: int = 100,
+        dispatch_mode: DispatchMode = DispatchMode.SEQUENTIAL
+    ):
         """
         Initialize a new autonomous agent.
         
         Args:
             name (str): Name of the agent
+            poll_interval (float): Wake-up interval for behaviors that
+                do not report a due time
+            max_batch (int): Maximum messages processed before behaviors
+                get another chance to run
+            dispatch_mode (DispatchMode): Whether matching handlers run
+                one after another or concurrently
         """
         self.name = name
+        self.poll_interval = poll_interval
+        self.max_batch = max_batch
         self.inbox = MessageBox()
         self.outbox = MessageBox()
-        self.handler_registry = HandlerRegistry()
+        self.handler_registry = HandlerRegistry(dispatch_mode)
         self.behavior_registry = BehaviorRegistry()
         self.running = False
         logger.info(f"🤖 Agent {self.name} initialized")
@@ -70,13 +85,38 @@ class AutonomousAgent:
         logger.info(f"▶️ Agent {self.name} started")
         
         while self.running:
-            message = await self.inbox.get()
-            if message:
-                await self.process_message(message)
             await self.run_behaviors()
-            await asyncio.sleep(0.1)
+            if not await self.inbox.wait(self._time_until_next_behavior()):
+                continue
+            await self.drain_inbox()
+        await self.handler_registry.join()
+
+    async def drain_inbox(self) -> int:
+        """
+        Take up to max_batch queued messages from the inbox and process
+        them.
+        
+        Returns:
+            int: Number of messages processed
+        """
+        messages = await self.inbox.get_many(self.max_batch)
+        if messages:
+            await self.handler_registry.process_batch(messages, self)
+            # Inboxes that track a read offset only advance it past processed messages
+            commit = getattr(self.inbox, "commit", None)
+            if commit is not None:
+                await commit()
+        return len(messages)
+
+    def _time_until_next_behavior(self) -> Optional[float]:
+        """Seconds until the next behavior is due, None if there are none."""
+        due = self.behavior_registry.next_due(self.poll_interval)
+        if due is None:
+            return None
+        return max(0.0, due - time.time())
 
     def stop(self) -> None:
         """Stop the agent's processing loop."""
         self.running = False
+        self.inbox.interrupt()
         logger.info(f"⏹️ Agent {self.name} stopped")
\ No newline at end of file
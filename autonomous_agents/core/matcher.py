@@ -0,0 +1,123 @@
+"""
+Compiled content matching for handler routing.
+
+This module compiles the declarative match predicates of a set of
+message handlers into a single matcher, so each message is lowercased
+and scanned once regardless of how many handlers declare keywords.
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Pattern, Set, Tuple
+from ..handlers.base import MessageHandler
+
+def declares_predicates(handler: MessageHandler) -> bool:
+    """
+    Check whether a handler routes on declarative match predicates.
+    
+    Args:
+        handler (MessageHandler): Handler to inspect
+
+    Returns:
+        bool: True if the handler declares keywords, prefixes or patterns
+    """
+    return bool(handler.match_keywords or handler.match_prefixes or handler.match_patterns)
+
+def _compile_alternation(words: Iterable[str], template: str) -> Optional[Pattern]:
+    """Compile words into one alternation that prefers the longest word."""
+    ordered = sorted(set(words), key=len, reverse=True)
+    if not ordered:
+        return None
+    return re.compile(template.format("|".join(re.escape(word) for word in ordered)))
+
+def _prefix_closure(index: Dict[str, Set[MessageHandler]]) -> Dict[str, FrozenSet[MessageHandler]]:
+    """
+    Map each word to the handlers of every indexed word it starts with.
+    
+    The compiled alternation reports only the longest word found at a
+    position; any shorter word found there is a prefix of it.
+    """
+    return {
+        word: frozenset(
+            handler
+            for other, handlers in index.items()
+            if word.startswith(other)
+            for handler in handlers
+        )
+        for word in index
+    }
+
+class ContentMatcher:
+    """
+    Multi-pattern matcher over message content.
+    
+    All keywords are compiled into one regular expression that finds
+    every keyword occurrence in a single pass, prefixes into one anchored
+    expression, and results are memoized per content string in an LRU
+    cache.
+    """
+    
+    def __init__(self, handlers: Iterable[MessageHandler], cache_size: int = 1024) -> None:
+        """
+        Compile the predicates of the given handlers.
+        
+        Args:
+            handlers (Iterable[MessageHandler]): Handlers to index; those
+                without declarative predicates are ignored
+            cache_size (int): Number of content strings to memoize
+        """
+        keywords: Dict[str, Set[MessageHandler]] = {}
+        prefixes: Dict[str, Set[MessageHandler]] = {}
+        self._patterns: List[Tuple[Pattern, MessageHandler]] = []
+        indexed = []
+
+        for handler in handlers:
+            if not declares_predicates(handler):
+                continue
+            indexed.append(handler)
+            for keyword in handler.match_keywords:
+                keywords.setdefault(keyword.lower(), set()).add(handler)
+            for prefix in handler.match_prefixes:
+                prefixes.setdefault(prefix.lower(), set()).add(handler)
+            for pattern in handler.match_patterns:
+                self._patterns.append((re.compile(pattern), handler))
+
+        self.handlers: FrozenSet[MessageHandler] = frozenset(indexed)
+        # A lookahead group reports keywords at every position, including overlapping ones
+        self._keyword_re = _compile_alternation(keywords, "(?=({}))")
+        self._prefix_re = _compile_alternation(prefixes, "(?:{})")
+        self._keyword_handlers = _prefix_closure(keywords)
+        self._prefix_handlers = _prefix_closure(prefixes)
+        self._cached_scan = lru_cache(maxsize=cache_size)(self._scan)
+
+    def match(self, content: object) -> FrozenSet[MessageHandler]:
+        """
+        Get the indexed handlers whose predicates match the content.
+        
+        Args:
+            content (object): Message content; only strings can match
+
+        Returns:
+            FrozenSet[MessageHandler]: Matching handlers
+        """
+        if not self.handlers or not isinstance(content, str):
+            return frozenset()
+        return self._cached_scan(content)
+
+    def _scan(self, content: str) -> FrozenSet[MessageHandler]:
+        """Scan content once for all keywords, prefixes and patterns."""
+        text = content.lower()
+        matched: Set[MessageHandler] = set()
+
+        if self._keyword_re is not None:
+            for keyword in set(self._keyword_re.findall(text)):
+                matched.update(self._keyword_handlers[keyword])
+        if self._prefix_re is not None:
+            prefix = self._prefix_re.match(text)
+            if prefix:
+                matched.update(self._prefix_handlers[prefix.group(0)])
+        for pattern, handler in self._patterns:
+            if handler not in matched and pattern.search(content):
+                matched.add(handler)
+
+        return frozenset(matched)
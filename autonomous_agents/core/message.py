@@ -6,10 +6,14 @@ used for agent communication.
 """
 
 import asyncio
+import json
+import struct
+import sys
 import time
-from dataclasses import dataclass, field
+from collections import deque
+from dataclasses import dataclass
 from enum import Enum
-from typing import Any, Optional, List
+from typing import Any, Deque, Iterable, List, Optional, Union
 
 class MessageType(Enum):
     """Enumeration of supported message types in the system."""
@@ -17,31 +21,214 @@ class MessageType(Enum):
     TRANSACTION = "transaction"
     BALANCE_CHECK = "balance_check"
 
-@dataclass
+# Wire codes for message types; decoding indexes this tuple so every
+# decoded message shares the enum singleton
+_MESSAGE_TYPES = tuple(MessageType)
+_MESSAGE_TYPE_CODES = {message_type: code for code, message_type in enumerate(_MESSAGE_TYPES)}
+
+# Content encodings used by Message.to_bytes()
+_CONTENT_NONE = 0
+_CONTENT_STR = 1
+_CONTENT_BYTES = 2
+_CONTENT_JSON = 3
+
+# type code, content encoding, timestamp_ns, sender length,
+# correlation id length, content length
+_HEADER = struct.Struct("!BBqHHI")
+_ABSENT = 0xFFFF
+
+@dataclass(slots=True, init=False)
 class Message:
     """
     Data class representing a message in the system.
     
+    Messages use __slots__, so they carry no per-instance __dict__. The
+    creation time is stored as integer nanoseconds, but the constructor
+    still takes a float Unix timestamp in seconds as its third argument
+    or as timestamp=, like it did before timestamp_ns was added.
+    
     Attributes:
         type (MessageType): Type of the message
         content (Any): Content of the message
-        timestamp (float): Unix timestamp when the message was created
+        timestamp_ns (int): Unix time in nanoseconds when the message
+            was created
+        sender (Optional[str]): Name of the sending agent, if known
+        correlation_id (Optional[str]): Identifier linking related
+            messages, such as a request and its reply
     """
     type: MessageType
     content: Any
-    timestamp: float = field(default_factory=time.time)
+    timestamp_ns: int
+    sender: Optional[str] = None
+    correlation_id: Optional[str] = None
+
+    def __init__(
+        self,
+        type: MessageType,
+        content: Any,
+        timestamp: Optional[float] = None,
+        sender: Optional[str] = None,
+        correlation_id: Optional[str] = None,
+        *,
+        timestamp_ns: Optional[int] = None
+    ) -> None:
+        """
+        Initialize a message.
+        
+        Args:
+            type (MessageType): Type of the message
+            content (Any): Content of the message
+            timestamp (Optional[float]): Unix timestamp in seconds when
+                the message was created
+            sender (Optional[str]): Name of the sending agent, if known
+            correlation_id (Optional[str]): Identifier linking related
+                messages
+            timestamp_ns (Optional[int]): Creation time in nanoseconds,
+                taking precedence over timestamp; the current time is
+                used if neither is given
+        """
+        if timestamp_ns is None:
+            timestamp_ns = time.time_ns() if timestamp is None else round(timestamp * 1e9)
+        self.type = type
+        self.content = content
+        self.timestamp_ns = timestamp_ns
+        self.sender = sender
+        self.correlation_id = correlation_id
+
+    @property
+    def timestamp(self) -> float:
+        """Unix timestamp in seconds when the message was created."""
+        return self.timestamp_ns / 1e9
+
+    @timestamp.setter
+    def timestamp(self, value: float) -> None:
+        """Set the creation time from a Unix timestamp in seconds."""
+        self.timestamp_ns = round(value * 1e9)
+
+    def to_bytes(self) -> bytes:
+        """
+        Serialize the message into a compact binary frame.
+        
+        String and bytes content is stored as-is; any other content must
+        be JSON serializable.
+        
+        Returns:
+            bytes: Encoded message
+        """
+        content = self.content
+        if content is None:
+            encoding, body = _CONTENT_NONE, b""
+        elif isinstance(content, str):
+            encoding, body = _CONTENT_STR, content.encode("utf-8")
+        elif isinstance(content, (bytes, bytearray, memoryview)):
+            encoding, body = _CONTENT_BYTES, bytes(content)
+        else:
+            encoding, body = _CONTENT_JSON, json.dumps(content).encode("utf-8")
+
+        sender = b"" if self.sender is None else self.sender.encode("utf-8")
+        correlation = b"" if self.correlation_id is None else self.correlation_id.encode("utf-8")
+        header = _HEADER.pack(
+            _MESSAGE_TYPE_CODES[self.type],
+            encoding,
+            self.timestamp_ns,
+            _ABSENT if self.sender is None else len(sender),
+            _ABSENT if self.correlation_id is None else len(correlation),
+            len(body)
+        )
+        return b"".join((header, sender, correlation, body))
+
+    @classmethod
+    def from_bytes(cls, data: Union[bytes, bytearray, memoryview]) -> 'Message':
+        """
+        Deserialize a message produced by to_bytes().
+        
+        Sender names are interned, so replaying many messages from the
+        same agents keeps a single copy of each name.
+        
+        Args:
+            data (Union[bytes, bytearray, memoryview]): Encoded message;
+                a memoryview is decoded without copying the frame
+
+        Returns:
+            Message: Decoded message
+        """
+        view = memoryview(data)
+        type_code, encoding, timestamp_ns, sender_len, correlation_len, body_len = _HEADER.unpack_from(view)
+        offset = _HEADER.size
+
+        sender = None
+        if sender_len != _ABSENT:
+            sender = sys.intern(str(view[offset:offset + sender_len], "utf-8"))
+            offset += sender_len
+        correlation_id = None
+        if correlation_len != _ABSENT:
+            correlation_id = str(view[offset:offset + correlation_len], "utf-8")
+            offset += correlation_len
+
+        body = view[offset:offset + body_len]
+        if encoding == _CONTENT_STR:
+            content = str(body, "utf-8")
+        elif encoding == _CONTENT_BYTES:
+            content = bytes(body)
+        elif encoding == _CONTENT_JSON:
+            content = json.loads(str(body, "utf-8"))
+        else:
+            content = None
+
+        return cls(
+            _MESSAGE_TYPES[type_code],
+            content,
+            sender=sender,
+            correlation_id=correlation_id,
+            timestamp_ns=timestamp_ns
+        )
+
+class OverflowPolicy(Enum):
+    """Enumeration of actions taken when a bounded message box is full."""
+    BLOCK = "block"
+    FAIL = "fail"
 
 class MessageBox:
     """
-    Thread-safe message queue implementation for agent communication.
+    Bounded message queue implementation for agent communication.
     
-    This class provides a simple message queue with async support
-    for safe message passing between agents.
+    Messages are stored in a deque, so both ends operate in O(1). Only
+    the event loop touches the queue, so no lock is needed: none of the
+    operations await between checking and mutating the queue.
     """
-    def __init__(self) -> None:
-        """Initialize an empty message box with a lock."""
-        self.messages: List[Message] = []
-        self._lock = asyncio.Lock()
+    def __init__(
+        self,
+        capacity: Optional[int] = None,
+        overflow: OverflowPolicy = OverflowPolicy.BLOCK
+    ) -> None:
+        """
+        Initialize an empty message box.
+        
+        Args:
+            capacity (Optional[int]): Maximum number of queued messages,
+                or None for an unbounded box
+            overflow (OverflowPolicy): Whether put waits for free space
+                or raises asyncio.QueueFull when the box is full
+        """
+        if capacity is not None and capacity <= 0:
+            raise ValueError("capacity must be a positive integer or None")
+        self.messages: Deque[Message] = deque()
+        self.capacity = capacity
+        self.overflow = overflow
+        self._available = asyncio.Event()
+        self._space = asyncio.Event()
+
+    def __len__(self) -> int:
+        """Number of queued messages."""
+        return len(self.messages)
+
+    def empty(self) -> bool:
+        """Return True if no messages are queued."""
+        return not self.messages
+
+    def full(self) -> bool:
+        """Return True if the box has reached its capacity."""
+        return self.capacity is not None and len(self.messages) >= self.capacity
 
     async def put(self, message: Message) -> None:
         """
@@ -49,9 +236,39 @@ class MessageBox:
         
         Args:
             message (Message): Message to add to the queue
+
+        Raises:
+            asyncio.QueueFull: If the box is full and its overflow
+                policy is FAIL
+        """
+        await self._reserve(1)
+        self.messages.append(message)
+        self._available.set()
+
+    async def put_many(self, messages: Iterable[Message]) -> None:
+        """
+        Add several messages to the message box in order.
+        
+        With the FAIL policy either all messages are added or none.
+        
+        Args:
+            messages (Iterable[Message]): Messages to add to the queue
+
+        Raises:
+            asyncio.QueueFull: If the messages do not fit and the box's
+                overflow policy is FAIL
         """
-        async with self._lock:
-            self.messages.append(message)
+        messages = list(messages)
+        if self.overflow is OverflowPolicy.FAIL:
+            await self._reserve(len(messages))
+            self.messages.extend(messages)
+        else:
+            for message in messages:
+                await self._reserve(1)
+                self.messages.append(message)
+                self._available.set()
+        if messages:
+            self._available.set()
 
     async def get(self) -> Optional[Message]:
         """
@@ -60,8 +277,66 @@ class MessageBox:
         Returns:
             Optional[Message]: Next message in the queue, or None if empty
         """
-        async with self._lock:
-            if self.messages:
-                message = self.messages.pop(0)
-                return message
-            return None
\ No newline at end of file
+        message = self.messages.popleft() if self.messages else None
+        self._after_remove()
+        return message
+
+    async def get_many(self, max_count: int) -> List[Message]:
+        """
+        Retrieve and remove up to max_count messages without waiting.
+        
+        Args:
+            max_count (int): Maximum number of messages to return
+
+        Returns:
+            List[Message]: Messages in queue order, possibly empty
+        """
+        count = min(max_count, len(self.messages))
+        popleft = self.messages.popleft
+        batch = [popleft() for _ in range(count)]
+        self._after_remove()
+        return batch
+
+    async def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until a message is available or the box is interrupted.
+        
+        Args:
+            timeout (Optional[float]): Maximum time to wait in seconds,
+                or None to wait indefinitely
+
+        Returns:
+            bool: True if woken by a message or interrupt, False on timeout
+        """
+        if self.messages:
+            return True
+        if timeout is not None and timeout <= 0:
+            return False
+        try:
+            await asyncio.wait_for(self._available.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def interrupt(self) -> None:
+        """Wake any coroutine blocked in wait() without adding a message."""
+        self._available.set()
+
+    async def _reserve(self, count: int) -> None:
+        """Wait for, or fail on, room for count more messages."""
+        if self.capacity is None:
+            return
+        if count > self.capacity:
+            raise asyncio.QueueFull(f"{count} messages exceed capacity {self.capacity}")
+        while len(self.messages) + count > self.capacity:
+            if self.overflow is OverflowPolicy.FAIL:
+                raise asyncio.QueueFull(f"Message box full ({self.capacity} messages)")
+            self._space.clear()
+            await self._space.wait()
+
+    def _after_remove(self) -> None:
+        """Update wake-up events after messages were removed."""
+        if not self.messages:
+            self._available.clear()
+        if not self.full():
+            self._space.set()
@@ -0,0 +1,260 @@
+"""
+Redis Streams message box for agents on different hosts.
+
+This module provides a MessageBox implementation that appends messages
+to a Redis stream and reads them back with XREAD, so agents that do not
+share a process, or a host, can exchange messages through the Redis
+instance already used for transfers.
+"""
+
+import asyncio
+from collections import deque
+from typing import Deque, Iterable, List, Optional, Tuple
+from redis.asyncio import Redis
+from ..config import REDIS_URL
+from ..core.message import Message
+from ..utils.logger import logger
+
+_FIELD = b"m"
+
+def inbox_stream(agent_name: str) -> str:
+    """
+    Get the name of the stream that serves as an agent's inbox.
+    
+    Args:
+        agent_name (str): Name of the agent
+
+    Returns:
+        str: Stream key
+    """
+    return f"agent_inbox:{agent_name}"
+
+class RedisStreamMessageBox:
+    """
+    Message box backed by a Redis stream.
+    
+    Writes are buffered briefly and sent as one pipelined batch of XADD
+    commands. Reads fetch up to batch_size entries per XREAD, blocking
+    in wait() until entries arrive. commit() stores the ID of the last
+    entry handed out per consumer in a hash next to the stream, so a
+    restarted consumer resumes where it left off. The agent commits
+    after dispatching each batch, so messages are delivered at least
+    once; under concurrent dispatch a batch counts as dispatched once its
+    handlers are started.
+    """
+    
+    def __init__(
+        self,
+        stream: str,
+        consumer: Optional[str] = None,
+        redis: Optional[Redis] = None,
+        batch_size: int = 100,
+        flush_interval: float = 0.005,
+        block_ms: int = 1000,
+        maxlen: Optional[int] = 100_000,
+        start_id: str = "0-0"
+    ) -> None:
+        """
+        Initialize the message box.
+        
+        Args:
+            stream (str): Stream key
+            consumer (Optional[str]): Name under which the read offset is
+                stored; None disables offset tracking
+            redis (Optional[Redis]): Client to use, which must not decode
+                responses; a client for REDIS_URL is created if omitted
+            batch_size (int): Maximum entries per XADD batch or XREAD
+            flush_interval (float): Seconds a buffered put may wait for
+                more messages before it is written
+            block_ms (int): Longest single blocking XREAD; bounds how long
+                interrupt() takes to wake wait()
+            maxlen (Optional[int]): Approximate cap on the stream length
+            start_id (str): Stream ID to read after when no offset is stored
+        """
+        self.stream = stream
+        self.consumer = consumer
+        self.redis = redis
+        self._owns_client = redis is None
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.block_ms = block_ms
+        self.maxlen = maxlen
+        self.offsets_key = f"{stream}:offsets"
+        self._last_id: Optional[str] = None
+        self._start_id = start_id
+        self._received: Deque[Tuple[str, Message]] = deque()
+        self._delivered_id: Optional[str] = None
+        self._committed_id: Optional[str] = None
+        self._pending: List[Message] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self._interrupted = False
+
+    async def put(self, message: Message) -> None:
+        """
+        Queue a message for the stream.
+        
+        The message is written with the next batch, at most
+        flush_interval seconds later.
+        
+        Args:
+            message (Message): Message to add
+        """
+        self._pending.append(message)
+        if len(self._pending) >= self.batch_size:
+            await self.flush()
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def put_many(self, messages: Iterable[Message]) -> None:
+        """
+        Write several messages to the stream in one pipelined batch.
+        
+        Args:
+            messages (Iterable[Message]): Messages to add
+        """
+        self._pending.extend(messages)
+        await self.flush()
+
+    async def flush(self) -> None:
+        """
+        Write all buffered messages to the stream.
+        
+        Flushes run one at a time, so batches land in the order they were
+        buffered. If the write fails, the batch is put back in front of
+        any newer messages and the error is raised.
+        """
+        # Only a flush still waiting for its interval is cancelled, never one writing
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, []
+            redis = self._client()
+            pipe = redis.pipeline(transaction=False)
+            for message in pending:
+                pipe.xadd(
+                    self.stream,
+                    {_FIELD: message.to_bytes()},
+                    maxlen=self.maxlen,
+                    approximate=True
+                )
+            try:
+                await pipe.execute()
+            except BaseException:
+                self._pending[:0] = pending
+                raise
+
+    async def get(self) -> Optional[Message]:
+        """
+        Retrieve the next message without waiting.
+        
+        Returns:
+            Optional[Message]: Next message, or None if none is available
+        """
+        messages = await self.get_many(1)
+        return messages[0] if messages else None
+
+    async def get_many(self, max_count: int) -> List[Message]:
+        """
+        Retrieve up to max_count messages without waiting.
+        
+        Args:
+            max_count (int): Maximum number of messages to return
+
+        Returns:
+            List[Message]: Messages in stream order, possibly empty
+        """
+        if not self._received:
+            await self._read(block_ms=None)
+        messages = []
+        while self._received and len(messages) < max_count:
+            entry_id, message = self._received.popleft()
+            self._delivered_id = entry_id
+            messages.append(message)
+        return messages
+
+    async def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until a message is available or the box is interrupted.
+        
+        Args:
+            timeout (Optional[float]): Maximum time to wait in seconds,
+                or None to wait indefinitely
+
+        Returns:
+            bool: True if woken by a message or interrupt, False on timeout
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while not self._received:
+            if self._interrupted:
+                self._interrupted = False
+                return True
+            block_ms = self.block_ms
+            if deadline is not None:
+                block_ms = min(block_ms, int((deadline - loop.time()) * 1000))
+                if block_ms <= 0:
+                    return False
+            await self._read(block_ms=block_ms)
+        return True
+
+    def interrupt(self) -> None:
+        """Make the current or next wait() return within block_ms."""
+        self._interrupted = True
+
+    async def commit(self) -> None:
+        """Store the ID of the last message handed out as this consumer's offset."""
+        if self.consumer is None or self._delivered_id in (None, self._committed_id):
+            return
+        await self._client().hset(self.offsets_key, self.consumer, self._delivered_id)
+        self._committed_id = self._delivered_id
+
+    async def close(self) -> None:
+        """Flush pending writes, commit the read offset and close an owned client."""
+        await self.flush()
+        await self.commit()
+        if self._owns_client and self.redis is not None:
+            await self.redis.close()
+            self.redis = None
+
+    async def _flush_later(self) -> None:
+        """Flush buffered messages after flush_interval."""
+        await asyncio.sleep(self.flush_interval)
+        self._flush_task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            # The batch stays buffered for the next put, flush or close
+            logger.error(f"❌ Failed to write messages to {self.stream}: {str(e)}")
+
+    async def _read(self, block_ms: Optional[int]) -> None:
+        """Fetch the next batch of entries after the last one read."""
+        redis = self._client()
+        if self._last_id is None:
+            stored = None
+            if self.consumer is not None:
+                stored = await redis.hget(self.offsets_key, self.consumer)
+            self._last_id = _to_str(stored) if stored else self._start_id
+        response = await redis.xread(
+            {self.stream: self._last_id},
+            count=self.batch_size,
+            block=block_ms
+        )
+        for _, entries in response or ():
+            for entry_id, fields in entries:
+                entry_id = _to_str(entry_id)
+                self._last_id = entry_id
+                self._received.append((entry_id, Message.from_bytes(fields[_FIELD])))
+
+    def _client(self) -> Redis:
+        """Get the Redis client, connecting on first use."""
+        if self.redis is None:
+            self.redis = Redis.from_url(REDIS_URL)
+        return self.redis
+
+def _to_str(value) -> str:
+    """Decode a Redis reply that may be bytes."""
+    return value.decode() if isinstance(value, bytes) else value
@@ -5,21 +5,67 @@ This module provides registry classes for managing message handlers
 and agent behaviors in the system.
 """
 
-from typing import Dict, List
+import asyncio
+import heapq
+import itertools
+import time
+from enum import Enum
+from typing import Dict, List, Optional, Set, Tuple
 from ..core.message import Message, MessageType
+from ..core.matcher import ContentMatcher
+from ..utils.logger import logger
 from ..behaviors.base import Behavior
 from ..handlers.base import MessageHandler
 
+class DispatchMode(Enum):
+    """Enumeration of the ways matching handlers are invoked."""
+    SEQUENTIAL = "sequential"
+    CONCURRENT = "concurrent"
+
 class HandlerRegistry:
-    """Registry for message handlers in the system."""
+    """
+    Registry for message handlers in the system.
+    
+    Handlers that declare match predicates are selected through one
+    compiled ContentMatcher per message type; the others are asked via
+    can_handle(). In SEQUENTIAL mode each matching handler is awaited in
+    turn. In CONCURRENT mode every matching handler runs in its own task,
+    limited by the handler's max_concurrency and timeout, so a slow or
+    failing handler does not hold up the agent or the other handlers.
+    
+    A task is only started once its handler has a free slot and fewer
+    than max_in_flight tasks are running, so a saturated handler stalls
+    the agent's inbox drain and a bounded inbox pushes back on senders.
+    """
     
-    def __init__(self) -> None:
-        """Initialize empty handler registry."""
+    def __init__(
+        self,
+        dispatch_mode: DispatchMode = DispatchMode.SEQUENTIAL,
+        preserve_sender_order: bool = True,
+        max_in_flight: int = 1000
+    ) -> None:
+        """
+        Initialize empty handler registry.
+        
+        Args:
+            dispatch_mode (DispatchMode): How matching handlers are invoked
+            preserve_sender_order (bool): Under concurrent dispatch, have
+                each handler process a sender's messages in arrival order
+            max_in_flight (int): Most handler tasks running at once under
+                concurrent dispatch
+        """
         self.handlers: Dict[MessageType, List[MessageHandler]] = {
             MessageType.TEXT: [],
             MessageType.TRANSACTION: [],
             MessageType.BALANCE_CHECK: [],
         }
+        self.dispatch_mode = dispatch_mode
+        self.preserve_sender_order = preserve_sender_order
+        self._semaphores: Dict[MessageHandler, asyncio.Semaphore] = {}
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+        self._tasks: Set[asyncio.Task] = set()
+        self._sender_tails: Dict[Tuple[int, str], asyncio.Task] = {}
+        self._matchers: Dict[MessageType, ContentMatcher] = {}
 
     def register_handler(self, handler: MessageHandler) -> None:
         """
@@ -30,25 +76,153 @@ class HandlerRegistry:
         """
         for message_type in handler.supported_message_types():
             self.handlers[message_type].append(handler)
+            self._matchers.pop(message_type, None)
+        if handler.max_concurrency is not None:
+            self._semaphores[handler] = asyncio.Semaphore(handler.max_concurrency)
 
     async def process_message(self, message: Message, agent: 'AutonomousAgent') -> None:
         """
         Process a message using registered handlers.
         
+        Under concurrent dispatch this returns once the handlers have been
+        scheduled; use join() to wait for them to finish.
+        
         Args:
             message (Message): Message to process
             agent (AutonomousAgent): Agent processing the message
         """
-        for handler in self.handlers[message.type]:
-            if await handler.can_handle(message):
-                await handler.handle(message, agent)
+        await self.process_batch([message], agent)
+
+    async def process_batch(self, messages: List[Message], agent: 'AutonomousAgent') -> None:
+        """
+        Process a batch of messages using registered handlers.
+        
+        Messages are grouped per matching handler, keeping their order,
+        and each handler receives its group through handle_batch().
+        
+        Args:
+            messages (List[Message]): Messages to process
+            agent (AutonomousAgent): Agent processing the messages
+        """
+        batches: Dict[MessageHandler, List[Message]] = {}
+        for message in messages:
+            matcher = self._matcher(message.type)
+            matched = matcher.match(message.content)
+            for handler in self.handlers[message.type]:
+                if handler in matcher.handlers:
+                    selected = handler in matched
+                else:
+                    selected = await handler.can_handle(message)
+                if selected:
+                    batches.setdefault(handler, []).append(message)
+
+        for handler, batch in batches.items():
+            if self.dispatch_mode is not DispatchMode.CONCURRENT:
+                await handler.handle_batch(batch, agent)
+            elif self.preserve_sender_order:
+                by_sender: Dict[Optional[str], List[Message]] = {}
+                for message in batch:
+                    by_sender.setdefault(message.sender, []).append(message)
+                for sender, sender_batch in by_sender.items():
+                    await self._spawn(handler, sender_batch, agent, sender)
+            else:
+                await self._spawn(handler, batch, agent, None)
+
+    def _matcher(self, message_type: MessageType) -> ContentMatcher:
+        """Get the compiled matcher for a message type, building it if needed."""
+        matcher = self._matchers.get(message_type)
+        if matcher is None:
+            matcher = ContentMatcher(self.handlers[message_type])
+            self._matchers[message_type] = matcher
+        return matcher
+
+    async def join(self) -> None:
+        """Wait for all handler tasks started by concurrent dispatch."""
+        # asyncio.wait always yields, so the discard callbacks of finished
+        # tasks get to run and the set drains
+        while self._tasks:
+            await asyncio.wait(set(self._tasks))
+
+    async def _spawn(
+        self,
+        handler: MessageHandler,
+        messages: List[Message],
+        agent: 'AutonomousAgent',
+        sender: Optional[str]
+    ) -> None:
+        """Start a task running handler on messages, chained behind the sender's previous one."""
+        # Wait for the slots here rather than in the task, so dispatch itself is held back
+        semaphore = self._semaphores.get(handler)
+        if semaphore is not None:
+            await semaphore.acquire()
+        await self._in_flight.acquire()
+
+        key = None if sender is None else (id(handler), sender)
+        previous = None if key is None else self._sender_tails.get(key)
+
+        task = asyncio.create_task(self._run_handler(handler, messages, agent, previous))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        # Freed from a callback so a task cancelled before it starts still gives them back
+        task.add_done_callback(lambda done: self._release_slots(semaphore))
+        if key is not None:
+            self._sender_tails[key] = task
+            task.add_done_callback(lambda done: self._release_tail(key, done))
+
+    def _release_slots(self, semaphore: Optional[asyncio.Semaphore]) -> None:
+        """Give back the slots a finished handler task was holding."""
+        self._in_flight.release()
+        if semaphore is not None:
+            semaphore.release()
+
+    def _release_tail(self, key: Tuple[int, str], task: asyncio.Task) -> None:
+        """Forget a finished task if it is still the last one for its sender."""
+        if self._sender_tails.get(key) is task:
+            del self._sender_tails[key]
+
+    async def _run_handler(
+        self,
+        handler: MessageHandler,
+        messages: List[Message],
+        agent: 'AutonomousAgent',
+        previous: Optional[asyncio.Task]
+    ) -> None:
+        """Run one handler within its deadline, logging failures."""
+        name = type(handler).__name__
+        # The deadline grows with the batch, so batching never makes a handler time out
+        timeout = None if handler.timeout is None else handler.timeout * len(messages)
+        try:
+            if previous is not None:
+                await asyncio.wait([previous])
+            await asyncio.wait_for(handler.handle_batch(messages, agent), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"⏱️ {name} timed out after {timeout}s on {len(messages)} messages in {agent.name}")
+        except Exception as e:
+            logger.error(f"❌ {name} failed in {agent.name}: {str(e)}")
 
 class BehaviorRegistry:
-    """Registry for agent behaviors in the system."""
+    """
+    Registry for agent behaviors in the system.
+    
+    Behaviors that report a due time via next_due() are kept in a
+    min-heap ordered by that time, so each run only touches behaviors
+    that are actually due. Behaviors without a due time are polled on
+    every run.
+    """
     
-    def __init__(self) -> None:
-        """Initialize empty behavior registry."""
+    def __init__(self, retry_delay: float = 0.1) -> None:
+        """
+        Initialize empty behavior registry.
+        
+        Args:
+            retry_delay (float): Delay before re-checking a due behavior
+                that did not advance its due time
+        """
         self.behaviors: List[Behavior] = []
+        self.retry_delay = retry_delay
+        self._schedule: List[Tuple[float, int, Behavior]] = []
+        self._polled: List[Behavior] = []
+        self._sequence = itertools.count()
 
     def register_behavior(self, behavior: Behavior) -> None:
         """
@@ -58,14 +232,63 @@ class BehaviorRegistry:
             behavior (Behavior): Behavior instance to register
         """
         self.behaviors.append(behavior)
+        due = behavior.next_due()
+        if due is None:
+            self._polled.append(behavior)
+        else:
+            heapq.heappush(self._schedule, (due, next(self._sequence), behavior))
 
     async def run_behaviors(self, agent: 'AutonomousAgent') -> None:
         """
-        Execute all registered behaviors.
+        Execute all behaviors that are due.
         
         Args:
             agent (AutonomousAgent): Agent running the behaviors
         """
-        for behavior in self.behaviors:
+        for behavior in self._polled:
             if await behavior.should_act():
-                await behavior.act(agent)
\ No newline at end of file
+                await behavior.act(agent)
+
+        now = time.time()
+        due_behaviors = []
+        while self._schedule and self._schedule[0][0] <= now:
+            due_behaviors.append(heapq.heappop(self._schedule)[2])
+
+        for index, behavior in enumerate(due_behaviors):
+            try:
+                if await behavior.should_act():
+                    await behavior.act(agent)
+            except BaseException:
+                for pending in due_behaviors[index:]:
+                    self._reschedule(pending, now)
+                raise
+            self._reschedule(behavior, now)
+
+    def next_due(self, poll_interval: float) -> Optional[float]:
+        """
+        Get the earliest time any registered behavior is due.
+        
+        Args:
+            poll_interval (float): Delay used for behaviors that do not
+                report a due time and therefore have to be polled
+
+        Returns:
+            Optional[float]: Unix timestamp of the next due behavior, or
+                None if no behaviors are registered
+        """
+        due_times = []
+        if self._schedule:
+            due_times.append(self._schedule[0][0])
+        if self._polled:
+            due_times.append(time.time() + poll_interval)
+        return min(due_times) if due_times else None
+
+    def _reschedule(self, behavior: Behavior, now: float) -> None:
+        """Push a behavior back onto the schedule after it was due."""
+        due = behavior.next_due()
+        if due is None:
+            self._polled.append(behavior)
+            return
+        if due <= now:
+            due = now + self.retry_delay
+        heapq.heappush(self._schedule, (due, next(self._sequence), behavior))
@@ -0,0 +1,457 @@
+"""
+Agent runtime for running a topology of agents.
+
+This module builds agents from AgentSpec entries and routes messages
+between them by name. Agents either share the current event loop or
+are sharded across worker processes, one event loop per process. Messages
+between workers travel over multiprocessing queues or, with the "shm"
+transport, over shared-memory rings.
+"""
+
+import asyncio
+import multiprocessing
+import queue
+import signal
+import struct
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+from ..chain.balance_oracle import BalanceOracle
+from ..core.agent import AutonomousAgent
+from ..core.message import Message
+from ..core.registry import DispatchMode
+from ..core.redis_box import RedisStreamMessageBox, inbox_stream
+from ..core.shm_box import SharedMemoryMessageBox
+from ..utils.logger import logger
+from ..utils.transfer_status import TransferStatusFeed
+
+@dataclass
+class AgentSpec:
+    """
+    Description of one agent in a topology.
+    
+    Specs are sent to worker processes, so configure must be picklable,
+    e.g. a module-level function or a functools.partial of one.
+    
+    Attributes:
+        name (str): Unique agent name, also used as its routing address
+        configure (Callable[[AutonomousAgent], None]): Registers the
+            agent's behaviors and handlers
+        peers (List[str]): Agents that receive what this agent puts
+            into its outbox
+        dispatch_mode (DispatchMode): Handler dispatch mode of the agent
+        remote_peers (List[str]): Agents outside this topology, possibly
+            on other hosts, reached through their Redis inbox streams
+        redis_inbox (bool): Read the agent's inbox from its Redis stream
+            so agents outside this topology can reach it
+    """
+    name: str
+    configure: Callable[[AutonomousAgent], None]
+    peers: List[str] = field(default_factory=list)
+    dispatch_mode: DispatchMode = DispatchMode.SEQUENTIAL
+    remote_peers: List[str] = field(default_factory=list)
+    redis_inbox: bool = False
+
+def validate_topology(specs: Sequence[AgentSpec]) -> None:
+    """
+    Check that agent names are unique, every peer exists and no remote
+    peer is part of the topology.
+    
+    Args:
+        specs (Sequence[AgentSpec]): Topology to check
+
+    Raises:
+        ValueError: If the topology is inconsistent
+    """
+    names = [spec.name for spec in specs]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate agent names in topology: {names}")
+    for spec in specs:
+        unknown = [peer for peer in spec.peers if peer not in names]
+        unknown += [peer for peer in spec.remote_peers if peer in names]
+        if unknown:
+            raise ValueError(f"Agent {spec.name} has unknown or misplaced peers: {unknown}")
+
+_TARGET_LENGTH = struct.Struct("<H")
+
+def _decode_routed(frame: memoryview) -> Tuple[str, Message]:
+    """Decode a ring frame written by RingLink into its target and message."""
+    (length,) = _TARGET_LENGTH.unpack_from(frame)
+    start = _TARGET_LENGTH.size
+    target = str(frame[start:start + length], "utf-8")
+    return target, Message.from_bytes(frame[start + length:])
+
+class QueueLink:
+    """Link to another worker through its multiprocessing queue."""
+    
+    def __init__(self, inbound: 'multiprocessing.Queue') -> None:
+        """
+        Initialize the link.
+        
+        Args:
+            inbound (multiprocessing.Queue): Inbound queue of the worker
+        """
+        self.inbound = inbound
+
+    async def send(self, target: str, message: Message) -> None:
+        """
+        Send a message to an agent on the linked worker.
+        
+        Args:
+            target (str): Name of the receiving agent
+            message (Message): Message to send
+        """
+        self.inbound.put((target, message.to_bytes()))
+
+class RingLink:
+    """Link to another worker through a shared-memory ring."""
+    
+    def __init__(self, ring: SharedMemoryMessageBox) -> None:
+        """
+        Initialize the link.
+        
+        Args:
+            ring (SharedMemoryMessageBox): Ring this worker produces into
+        """
+        self.ring = ring
+
+    async def send(self, target: str, message: Message) -> None:
+        """
+        Send a message to an agent on the linked worker.
+        
+        Args:
+            target (str): Name of the receiving agent
+            message (Message): Message to send
+        """
+        name = target.encode("utf-8")
+        await self.ring.put_frame(_TARGET_LENGTH.pack(len(name)), name, message.to_bytes())
+
+class Router:
+    """
+    Delivers messages to agents by name.
+    
+    Agents registered with the router get messages put straight into
+    their inbox; agents placed on another worker receive them through
+    the link to that worker, and any other agent through its Redis
+    inbox stream.
+    """
+    
+    def __init__(
+        self,
+        placement: Optional[Dict[str, int]] = None,
+        links: Optional[Dict[int, Union[QueueLink, RingLink]]] = None
+    ) -> None:
+        """
+        Initialize the router.
+        
+        Args:
+            placement (Optional[Dict[str, int]]): Worker index of every
+                agent in the topology
+            links (Optional[Dict[int, Union[QueueLink, RingLink]]]): Link
+                to each other worker, keyed by worker index
+        """
+        self.agents: Dict[str, AutonomousAgent] = {}
+        self.placement = placement or {}
+        self.links = links or {}
+        self.remote: Dict[str, RedisStreamMessageBox] = {}
+
+    def add_agent(self, agent: AutonomousAgent) -> None:
+        """
+        Make an agent reachable through this router.
+        
+        Args:
+            agent (AutonomousAgent): Agent living in this process
+        """
+        self.agents[agent.name] = agent
+
+    async def deliver(self, target: str, message: Message) -> None:
+        """
+        Deliver a message to the named agent.
+        
+        Args:
+            target (str): Name of the receiving agent
+            message (Message): Message to deliver
+        """
+        agent = self.agents.get(target)
+        if agent is not None:
+            await agent.inbox.put(message)
+            return
+        worker = self.placement.get(target)
+        if worker is not None:
+            await self.links[worker].send(target, message)
+            return
+        remote = self.remote.get(target)
+        if remote is None:
+            remote = self.remote[target] = RedisStreamMessageBox(inbox_stream(target))
+        await remote.put(message)
+
+    async def close(self) -> None:
+        """Flush messages buffered for remote agents and close their streams."""
+        for remote in self.remote.values():
+            await remote.close()
+        self.remote.clear()
+
+    async def deliver_local(self, routed: List[Tuple[str, Message]]) -> None:
+        """
+        Deliver messages received from other workers to local agents.
+        
+        Args:
+            routed (List[Tuple[str, Message]]): Target names and messages
+        """
+        for target, message in routed:
+            agent = self.agents.get(target)
+            if agent is None:
+                logger.warning(f"⚠️ Agent {target} is not hosted here, message dropped")
+                continue
+            await agent.inbox.put(message)
+
+class PeerOutbox:
+    """Outbox that forwards each message to an agent's peers via a router."""
+    
+    def __init__(self, sender: str, peers: List[str], router: Router) -> None:
+        """
+        Initialize the outbox.
+        
+        Args:
+            sender (str): Name of the owning agent, stamped on messages
+                that carry no sender
+            peers (List[str]): Names of the receiving agents
+            router (Router): Router used for delivery
+        """
+        self.sender = sender
+        self.peers = peers
+        self.router = router
+
+    async def put(self, message: Message) -> None:
+        """
+        Send a message to every peer.
+        
+        Args:
+            message (Message): Message to send
+        """
+        for peer in self.peers:
+            # A copy per peer, so neither the caller nor other peers see changes
+            await self.router.deliver(peer, Message(
+                message.type,
+                message.content,
+                sender=message.sender if message.sender is not None else self.sender,
+                correlation_id=message.correlation_id,
+                timestamp_ns=message.timestamp_ns
+            ))
+
+    async def put_many(self, messages: List[Message]) -> None:
+        """
+        Send several messages to every peer, in order.
+        
+        Args:
+            messages (List[Message]): Messages to send
+        """
+        for message in messages:
+            await self.put(message)
+
+def build_agents(specs: Sequence[AgentSpec], router: Router) -> List[AutonomousAgent]:
+    """
+    Create, configure and wire the agents described by specs.
+    
+    Args:
+        specs (Sequence[AgentSpec]): Agents to build
+        router (Router): Router the agents send through and are added to
+
+    Returns:
+        List[AutonomousAgent]: Configured agents, not yet running
+    """
+    agents = []
+    for spec in specs:
+        agent = AutonomousAgent(spec.name, dispatch_mode=spec.dispatch_mode)
+        if spec.redis_inbox:
+            agent.inbox = RedisStreamMessageBox(inbox_stream(spec.name), consumer=spec.name)
+        agent.outbox = PeerOutbox(spec.name, spec.peers + spec.remote_peers, router)
+        spec.configure(agent)
+        router.add_agent(agent)
+        agents.append(agent)
+    return agents
+
+def _pump_inbound(
+    inbound: 'multiprocessing.Queue',
+    loop: asyncio.AbstractEventLoop,
+    received: asyncio.Queue
+) -> None:
+    """Move messages from a worker's queue onto its event loop, in batches."""
+    while True:
+        batch = [inbound.get()]
+        while True:
+            try:
+                batch.append(inbound.get_nowait())
+            except queue.Empty:
+                break
+        routed = [
+            (target, Message.from_bytes(frame)) for target, frame in filter(None, batch)
+        ]
+        if routed:
+            loop.call_soon_threadsafe(received.put_nowait, routed)
+        if None in batch:
+            loop.call_soon_threadsafe(received.put_nowait, None)
+            return
+
+async def _pump_ring(ring: SharedMemoryMessageBox, router: Router, batch_size: int = 256) -> None:
+    """Deliver messages from an inbound shared-memory ring until cancelled."""
+    while True:
+        await ring.wait()
+        routed = []
+        while len(routed) < batch_size:
+            item = ring.get_frame(_decode_routed)
+            if item is None:
+                break
+            routed.append(item)
+        await router.deliver_local(routed)
+
+async def _run_worker(
+    worker_id: int,
+    specs: List[AgentSpec],
+    placement: Dict[str, int],
+    queues: Sequence['multiprocessing.Queue'],
+    rings: Dict[Tuple[int, int], SharedMemoryMessageBox]
+) -> None:
+    """Run one worker's agents until the parent sends the stop sentinel."""
+    links: Dict[int, Union[QueueLink, RingLink]] = {}
+    for other in range(len(queues)):
+        ring = rings.get((worker_id, other))
+        links[other] = RingLink(ring) if ring is not None else QueueLink(queues[other])
+    router = Router(placement, links)
+    agents = build_agents(specs, router)
+
+    received: asyncio.Queue = asyncio.Queue()
+    threading.Thread(
+        target=_pump_inbound,
+        args=(queues[worker_id], asyncio.get_running_loop(), received),
+        name=f"agent-worker-{worker_id}-inbound",
+        daemon=True
+    ).start()
+    ring_pumps = [
+        asyncio.create_task(_pump_ring(ring, router))
+        for (_, consumer), ring in rings.items() if consumer == worker_id
+    ]
+
+    tasks = [asyncio.create_task(agent.run()) for agent in agents]
+    logger.info(f"🧵 Worker {worker_id} running {len(agents)} agents")
+
+    try:
+        while True:
+            routed = await received.get()
+            if routed is None:
+                break
+            await router.deliver_local(routed)
+    finally:
+        for pump in ring_pumps:
+            pump.cancel()
+        for agent in agents:
+            agent.stop()
+        try:
+            await asyncio.wait_for(asyncio.gather(*tasks, return_exceptions=True), timeout=5.0)
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ Worker {worker_id} agents did not stop within timeout")
+        # Started by the agents' configure functions; their tasks must end with the loop
+        await BalanceOracle.stop_all()
+        await TransferStatusFeed.shared().stop()
+        await router.close()
+        for ring in rings.values():
+            ring.close()
+
+def _worker_main(
+    worker_id: int,
+    specs: List[AgentSpec],
+    placement: Dict[str, int],
+    queues: Sequence['multiprocessing.Queue'],
+    rings: Dict[Tuple[int, int], SharedMemoryMessageBox],
+    log_level: int
+) -> None:
+    """Entry point of a worker process."""
+    # The parent coordinates shutdown; a terminal Ctrl-C must not kill workers directly
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logger.setLevel(log_level)
+    asyncio.run(_run_worker(worker_id, specs, placement, queues, rings))
+
+class ShardedRuntime:
+    """
+    Runs a topology of agents across a pool of worker processes.
+    
+    Agents are assigned to workers round-robin in topology order. Each
+    worker runs its agents on its own event loop and owns an inbound
+    queue used for control and, with the default "queue" transport, for
+    messages from other workers. The "shm" transport instead gives every
+    ordered pair of workers a shared-memory ring.
+    """
+    
+    def __init__(
+        self,
+        specs: Sequence[AgentSpec],
+        workers: int,
+        transport: str = "queue",
+        ring_capacity: int = 1 << 20
+    ) -> None:
+        """
+        Initialize the runtime.
+        
+        Args:
+            specs (Sequence[AgentSpec]): Agents to run
+            workers (int): Number of worker processes, capped at the
+                number of agents
+            transport (str): "queue" or "shm" for messages between workers
+            ring_capacity (int): Size in bytes of each shared-memory ring
+        """
+        if transport not in ("queue", "shm"):
+            raise ValueError(f"Unknown transport: {transport}")
+        validate_topology(specs)
+        self.specs = list(specs)
+        self.workers = max(1, min(workers, len(self.specs)))
+        self.transport = transport
+        self.ring_capacity = ring_capacity
+        self.placement = {
+            spec.name: index % self.workers for index, spec in enumerate(self.specs)
+        }
+        self.processes: List[multiprocessing.Process] = []
+        self._queues: List['multiprocessing.Queue'] = []
+        self._rings: Dict[Tuple[int, int], SharedMemoryMessageBox] = {}
+
+    def start(self) -> None:
+        """Start the worker processes."""
+        context = multiprocessing.get_context("spawn")
+        self._queues = [context.Queue() for _ in range(self.workers)]
+        if self.transport == "shm":
+            self._rings = {
+                (producer, consumer): SharedMemoryMessageBox(self.ring_capacity)
+                for producer in range(self.workers)
+                for consumer in range(self.workers)
+                if producer != consumer
+            }
+        for worker_id in range(self.workers):
+            shard = [spec for spec in self.specs if self.placement[spec.name] == worker_id]
+            rings = {pair: ring for pair, ring in self._rings.items() if worker_id in pair}
+            process = context.Process(
+                target=_worker_main,
+                args=(worker_id, shard, self.placement, self._queues, rings, logger.level),
+                name=f"agent-worker-{worker_id}"
+            )
+            process.start()
+            self.processes.append(process)
+        logger.info(f"🚀 Started {len(self.specs)} agents on {self.workers} worker processes")
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """
+        Ask every worker to stop and wait for it to exit.
+        
+        Args:
+            timeout (float): Seconds to wait before terminating a worker
+        """
+        for inbound in self._queues:
+            inbound.put(None)
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(
+            loop.run_in_executor(None, process.join, timeout) for process in self.processes
+        ))
+        for process in self.processes:
+            if process.is_alive():
+                logger.warning(f"⚠️ {process.name} did not stop within timeout, terminating")
+                process.terminate()
+        for ring in self._rings.values():
+            ring.close()
@@ -0,0 +1,352 @@
+"""
+Shared-memory message box for agents in different processes.
+
+This module provides a single-producer, single-consumer ring buffer in
+multiprocessing.shared_memory that carries length-prefixed Message
+frames. Readers decode frames straight out of shared memory, and waiting
+sides are woken through pipe doorbells registered with the event loop
+instead of polling. A side raises its waiting flag and checks the ring
+under a lock the other side also takes before it reads the flag, so a
+wakeup is never lost between the check and the wait.
+"""
+
+import asyncio
+import multiprocessing
+import struct
+from multiprocessing import shared_memory
+from typing import Callable, Iterable, List, Optional, TypeVar
+from ..core.message import Message, OverflowPolicy
+
+T = TypeVar("T")
+
+# head (bytes consumed), tail (bytes produced), consumer waiting, producer waiting
+_CONTROL = struct.Struct("<QQBB")
+_HEADER_SIZE = 64
+_HEAD_OFFSET = 0
+_TAIL_OFFSET = 8
+_CONSUMER_WAITING = 16
+_PRODUCER_WAITING = 17
+
+_LENGTH = struct.Struct("<I")
+_WRAP = 0xFFFFFFFF
+
+class _Doorbell:
+    """Pipe used by one process to wake an event loop in another."""
+    
+    def __init__(self) -> None:
+        self._reader, self._writer = multiprocessing.Pipe(duplex=False)
+
+    def ring(self) -> None:
+        """Wake the waiting side."""
+        self._writer.send_bytes(b"\x01")
+
+    def drain(self) -> None:
+        """Discard pending rings."""
+        while self._reader.poll():
+            self._reader.recv_bytes()
+
+    async def wait(self, timeout: Optional[float]) -> bool:
+        """Wait until the doorbell rings; False on timeout."""
+        loop = asyncio.get_running_loop()
+        rung = loop.create_future()
+        fd = self._reader.fileno()
+        loop.add_reader(fd, lambda: rung.done() or rung.set_result(None))
+        try:
+            await asyncio.wait_for(rung, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            loop.remove_reader(fd)
+            self.drain()
+
+class SharedMemoryMessageBox:
+    """
+    Message box backed by a shared-memory ring buffer.
+    
+    One process puts and one process gets; the box is passed to the
+    other process as a multiprocessing.Process argument, which attaches
+    to the same segment. Frames never straddle the end of the ring: a
+    frame that does not fit is preceded by a wrap marker, so every frame
+    can be decoded from a contiguous memoryview. An empty ring always
+    takes a frame that fits its capacity, even if the padding before it
+    and the frame itself add up to more; more than capacity bytes queued
+    then tells the consumer the frame starts at the beginning of the ring.
+    """
+    
+    def __init__(
+        self,
+        capacity: int = 1 << 20,
+        overflow: OverflowPolicy = OverflowPolicy.BLOCK,
+        wake_interval: float = 1.0
+    ) -> None:
+        """
+        Create a new shared-memory segment for the box.
+        
+        Args:
+            capacity (int): Size of the ring in bytes
+            overflow (OverflowPolicy): Whether put waits for free space
+                or raises asyncio.QueueFull when the ring is full
+            wake_interval (float): Upper bound on a single doorbell wait,
+                after which the ring is re-checked; only a safety net,
+                since wakeups are not lost
+        """
+        if capacity <= _LENGTH.size:
+            raise ValueError("capacity is too small to hold a frame")
+        self.capacity = capacity
+        self.overflow = overflow
+        self.wake_interval = wake_interval
+        self._owner = True
+        self._shm = shared_memory.SharedMemory(create=True, size=_HEADER_SIZE + capacity)
+        _CONTROL.pack_into(self._shm.buf, 0, 0, 0, 0, 0)
+        self._data_bell = _Doorbell()
+        self._space_bell = _Doorbell()
+        self._flag_lock = multiprocessing.Lock()
+        self._interrupted = False
+
+    def __getstate__(self) -> dict:
+        """Pickle as a reference to the segment and doorbells."""
+        return {
+            "name": self._shm.name,
+            "capacity": self.capacity,
+            "overflow": self.overflow,
+            "wake_interval": self.wake_interval,
+            "data_bell": self._data_bell,
+            "space_bell": self._space_bell,
+            "flag_lock": self._flag_lock,
+        }
+
+    def __setstate__(self, state: dict) -> None:
+        """Attach to the segment created by another process."""
+        self.capacity = state["capacity"]
+        self.overflow = state["overflow"]
+        self.wake_interval = state["wake_interval"]
+        self._owner = False
+        self._shm = _attach(state["name"])
+        self._data_bell = state["data_bell"]
+        self._space_bell = state["space_bell"]
+        self._flag_lock = state["flag_lock"]
+        self._interrupted = False
+
+    @property
+    def name(self) -> str:
+        """Name of the shared-memory segment."""
+        return self._shm.name
+
+    def close(self) -> None:
+        """Detach from the segment, removing it if this process created it."""
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+    def __len__(self) -> int:
+        """Number of bytes queued, including frame headers."""
+        return self._tail() - self._head()
+
+    def empty(self) -> bool:
+        """Return True if no frames are queued."""
+        return self._tail() == self._head()
+
+    def full(self) -> bool:
+        """Return True if not even an empty frame fits."""
+        return self.capacity - len(self) < _LENGTH.size
+
+    async def put(self, message: Message) -> None:
+        """
+        Add a message to the ring.
+        
+        Args:
+            message (Message): Message to add
+
+        Raises:
+            asyncio.QueueFull: If the ring is full and its overflow
+                policy is FAIL
+        """
+        await self.put_frame(message.to_bytes())
+
+    async def put_many(self, messages: Iterable[Message]) -> None:
+        """
+        Add several messages to the ring in order.
+        
+        Args:
+            messages (Iterable[Message]): Messages to add
+        """
+        for message in messages:
+            await self.put(message)
+
+    async def get(self) -> Optional[Message]:
+        """
+        Retrieve and remove the next message from the ring.
+        
+        Returns:
+            Optional[Message]: Next message, or None if the ring is empty
+        """
+        return self.get_frame(Message.from_bytes)
+
+    async def get_many(self, max_count: int) -> List[Message]:
+        """
+        Retrieve and remove up to max_count messages without waiting.
+        
+        Args:
+            max_count (int): Maximum number of messages to return
+
+        Returns:
+            List[Message]: Messages in queue order, possibly empty
+        """
+        messages = []
+        while len(messages) < max_count:
+            message = self.get_frame(Message.from_bytes)
+            if message is None:
+                break
+            messages.append(message)
+        return messages
+
+    async def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until a frame is available or the box is interrupted.
+        
+        Args:
+            timeout (Optional[float]): Maximum time to wait in seconds,
+                or None to wait indefinitely
+
+        Returns:
+            bool: True if woken by a frame or interrupt, False on timeout
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while not self._interrupted:
+            with self._flag_lock:
+                ready = not self.empty()
+                self._shm.buf[_CONSUMER_WAITING] = not ready
+            if ready:
+                return True
+            remaining = self.wake_interval
+            if deadline is not None:
+                remaining = min(remaining, deadline - loop.time())
+                if remaining <= 0:
+                    self._shm.buf[_CONSUMER_WAITING] = 0
+                    return False
+            await self._data_bell.wait(remaining)
+        self._interrupted = False
+        return True
+
+    def interrupt(self) -> None:
+        """Wake a coroutine of this process blocked in wait()."""
+        self._interrupted = True
+        self._data_bell.ring()
+
+    async def put_frame(self, *parts: bytes) -> None:
+        """
+        Write the concatenation of parts as one frame.
+        
+        Args:
+            *parts (bytes): Pieces of the frame payload
+
+        Raises:
+            ValueError: If the frame can never fit in the ring
+            asyncio.QueueFull: If the ring is full and its overflow
+                policy is FAIL
+        """
+        length = sum(len(part) for part in parts)
+        needed = _LENGTH.size + length
+        if needed > self.capacity:
+            raise ValueError(f"Frame of {length} bytes exceeds ring capacity {self.capacity}")
+
+        buf = self._shm.buf
+        while True:
+            tail = self._tail()
+            offset = tail % self.capacity
+            padding = self.capacity - offset if self.capacity - offset < needed else 0
+            if self._fits(tail, padding + needed):
+                break
+            if self.overflow is OverflowPolicy.FAIL:
+                raise asyncio.QueueFull(f"Shared-memory ring full ({self.capacity} bytes)")
+            with self._flag_lock:
+                full = not self._fits(tail, padding + needed)
+                buf[_PRODUCER_WAITING] = full
+            if full:
+                await self._space_bell.wait(self.wake_interval)
+
+        if padding:
+            # In an empty ring the frame may cover where the marker would go;
+            # the consumer then sees more than a full ring queued instead
+            if padding >= _LENGTH.size and padding + needed <= self.capacity:
+                _LENGTH.pack_into(buf, _HEADER_SIZE + offset, _WRAP)
+            offset = 0
+        position = _HEADER_SIZE + offset
+        _LENGTH.pack_into(buf, position, length)
+        position += _LENGTH.size
+        for part in parts:
+            buf[position:position + len(part)] = part
+            position += len(part)
+
+        # Publishing the new tail makes the frame visible to the consumer
+        struct.pack_into("<Q", buf, _TAIL_OFFSET, tail + padding + needed)
+        if self._take_flag(_CONSUMER_WAITING):
+            self._data_bell.ring()
+
+    def get_frame(self, decode: Callable[[memoryview], T]) -> Optional[T]:
+        """
+        Decode and remove the next frame.
+        
+        Args:
+            decode (Callable[[memoryview], T]): Called with a view of the
+                frame payload in shared memory; the view is only valid
+                during the call
+
+        Returns:
+            Optional[T]: Decoded frame, or None if the ring is empty
+        """
+        buf = self._shm.buf
+        head = self._head()
+        tail = self._tail()
+        if head == tail:
+            return None
+
+        offset = head % self.capacity
+        room = self.capacity - offset
+        if (
+            tail - head > self.capacity or room < _LENGTH.size
+            or _LENGTH.unpack_from(buf, _HEADER_SIZE + offset)[0] == _WRAP
+        ):
+            head += room
+            offset = 0
+        (length,) = _LENGTH.unpack_from(buf, _HEADER_SIZE + offset)
+        start = _HEADER_SIZE + offset + _LENGTH.size
+        with buf[start:start + length] as frame:
+            result = decode(frame)
+
+        struct.pack_into("<Q", buf, _HEAD_OFFSET, head + _LENGTH.size + length)
+        if self._take_flag(_PRODUCER_WAITING):
+            self._space_bell.ring()
+        return result
+
+    def _fits(self, tail: int, size: int) -> bool:
+        """Check whether size bytes, padding included, can be written at tail."""
+        head = self._head()
+        # An empty ring has every byte free, even when padding to its end
+        # and the frame together come to more than the capacity
+        return head == tail or self.capacity - (tail - head) >= size
+
+    def _take_flag(self, flag: int) -> bool:
+        """Clear a waiting flag, returning whether the other side was waiting."""
+        with self._flag_lock:
+            waiting = self._shm.buf[flag]
+            self._shm.buf[flag] = 0
+        return bool(waiting)
+
+    def _head(self) -> int:
+        return struct.unpack_from("<Q", self._shm.buf, _HEAD_OFFSET)[0]
+
+    def _tail(self) -> int:
+        return struct.unpack_from("<Q", self._shm.buf, _TAIL_OFFSET)[0]
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Attach to an existing segment without taking over its cleanup."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 always registers the segment with the resource
+        # tracker; processes started by multiprocessing share the
+        # creator's tracker, so the registration is a no-op there
+        return shared_memory.SharedMemory(name=name)
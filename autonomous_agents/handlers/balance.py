@@ -0,0 +1,68 @@
+"""
+Balance change handler implementation.
+
+This module provides a handler for the BALANCE_CHECK notifications the
+BalanceOracle sends when a watched token balance changes.
+"""
+
+from typing import List
+from web3 import Web3
+from ..chain.contracts import ContractRegistry
+from ..handlers.base import MessageHandler
+from ..core.message import Message, MessageType
+from ..utils.logger import logger
+
+class BalanceChangeHandler(MessageHandler):
+    """Handler logging token balance changes."""
+
+    def __init__(self, web3: Web3, token_address: str):
+        """
+        Initialize the handler.
+        
+        Args:
+            web3 (Web3): Web3 instance
+            token_address (str): Address of the token contract
+        """
+        self.web3 = web3
+        self.token_address = token_address
+        self.contracts = ContractRegistry.shared()
+        # Token decimals are fetched on the first notification
+        self.decimals = None
+
+    def supported_message_types(self) -> List[MessageType]:
+        """
+        Get supported message types.
+        
+        Returns:
+            List[MessageType]: List containing BALANCE_CHECK message type
+        """
+        return [MessageType.BALANCE_CHECK]
+
+    async def can_handle(self, message: Message) -> bool:
+        """
+        Check if message is a balance change notification.
+        
+        Args:
+            message (Message): Message to check
+
+        Returns:
+            bool: True if message carries a balance, False otherwise
+        """
+        return isinstance(message.content, dict) and 'balance' in message.content
+
+    async def handle(self, message: Message, agent: 'AutonomousAgent') -> None:
+        """
+        Log the new balance.
+        
+        Args:
+            message (Message): Balance change notification
+            agent (AutonomousAgent): Agent processing the message
+        """
+        if self.decimals is None:
+            self.decimals = await self.contracts.decimals(self.web3, self.token_address)
+        wallet = message.content['wallet_address']
+        balance = message.content['balance'] / (10 ** self.decimals)
+        logger.info(
+            f"💰 Token balance for {wallet[:6]}...{wallet[-4:]} is now {balance} tokens "
+            f"(block {message.content['block_number']}, seen by {agent.name})"
+        )
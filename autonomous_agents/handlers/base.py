@@ -6,12 +6,36 @@ message handlers.
 """
 
 from abc import ABC, abstractmethod
-from typing import List
+from typing import List, Optional, Tuple
 from ..core.message import Message, MessageType
 
 class MessageHandler(ABC):
-    """Abstract base class for message handlers."""
+    """
+    Abstract base class for message handlers.
     
+    Attributes:
+        max_concurrency (Optional[int]): Maximum concurrent handle() calls
+            under concurrent dispatch, or None for no limit
+        timeout (Optional[float]): Seconds a message may take under
+            concurrent dispatch, or None; a handle_batch() call gets this
+            times the number of messages in the batch before it is cancelled
+        match_keywords (Tuple[str, ...]): Case-insensitive substrings of
+            text content that select this handler
+        match_prefixes (Tuple[str, ...]): Case-insensitive prefixes of
+            text content that select this handler
+        match_patterns (Tuple[str, ...]): Regular expressions searched in
+            text content that select this handler
+    
+    Handlers that declare any match predicate are routed by the
+    registry's compiled matcher instead of can_handle().
+    """
+    
+    max_concurrency: Optional[int] = None
+    timeout: Optional[float] = None
+    match_keywords: Tuple[str, ...] = ()
+    match_prefixes: Tuple[str, ...] = ()
+    match_patterns: Tuple[str, ...] = ()
+
     @abstractmethod
     def supported_message_types(self) -> List[MessageType]:
         """
@@ -44,4 +68,19 @@ class MessageHandler(ABC):
             message (Message): Message to process
             agent (AutonomousAgent): Agent processing the message
         """
-        pass
\ No newline at end of file
+        pass
+
+    async def handle_batch(self, messages: List[Message], agent: 'AutonomousAgent') -> None:
+        """
+        Process several messages at once.
+        
+        The default implementation calls handle() for each message in
+        order. Handlers that can amortize work across messages, such as
+        network round trips, should override it.
+        
+        Args:
+            messages (List[Message]): Messages to process, in arrival order
+            agent (AutonomousAgent): Agent processing the messages
+        """
+        for message in messages:
+            await self.handle(message, agent)
@@ -1,14 +1,20 @@
 import json
-import asyncio
 from typing import List
 from web3 import Web3
 from redis.asyncio import Redis
+from ..chain.contracts import ContractRegistry
 from ..handlers.base import MessageHandler
 from ..core.message import Message, MessageType
 from ..utils.logger import logger
-from ..config import ERC20_ABI, REDIS_URL
+from ..utils.transfer_queue import PartitionedTransferQueue
+from ..config import REDIS_URL
 
 class CryptoTransferHandler(MessageHandler):
+    # Bound the Redis round trips so an unreachable Redis can't pile up tasks
+    max_concurrency = 4
+    timeout = 10.0
+    match_keywords = ("crypto",)
+
     def __init__(
         self,
         web3: Web3,
@@ -25,45 +31,20 @@ class CryptoTransferHandler(MessageHandler):
         self.private_key = private_key
         self.agent_name = agent_name  # Store agent name
         self.redis = None
-
-        # Initialize token contract
-        self.token_contract = self.web3.eth.contract(
-            address=self.web3.to_checksum_address(token_address),
-            abi=json.loads(ERC20_ABI)
-        )
-        # Get token decimals
-        self.decimals = self.token_contract.functions.decimals().call()
+        self.queue = None
+        self.contracts = ContractRegistry.shared()
+        # Token decimals are fetched on first use
+        self.decimals = None
 
     async def initialize(self):
-        """Initialize Redis connection."""
+        """Initialize Redis connection, transfer queue and token decimals."""
         if not self.redis:
             self.redis = Redis.from_url(REDIS_URL, decode_responses=True)
+        if not self.queue:
+            self.queue = PartitionedTransferQueue(self.redis)
+        if self.decimals is None:
+            self.decimals = await self.contracts.decimals(self.web3, self.token_address)
             
-    async def check_status_updates(self):
-        """Check for status updates from the processor."""
-        status_channel = f"transfer_status_{self.agent_name}"
-        result = await self.redis.get(status_channel)
-        
-        if result:
-            status_data = json.loads(result)
-            # Clear the status after reading
-            await self.redis.delete(status_channel)
-            
-            if status_data['status'] == 'success':
-                # Convert amount to decimal representation if present
-                if 'amount' in status_data:
-                    amount = int(status_data['amount']) / (10 ** self.decimals)
-                    logger.info(f"✅ Transfer of {amount} tokens completed for {self.agent_name}!")
-                else:
-                    logger.info(f"✅ Transfer completed for {self.agent_name}!")
-                logger.info(f"   Transaction Hash: {status_data['tx_hash']}")
-                logger.info(f"   Block Number: {status_data['block_number']}")
-                logger.info(f"   Sender: {status_data['sender']}")
-                logger.info(f"   Gas Used: {status_data['gas_used']}")
-            elif status_data['status'] == 'error':
-                logger.error(f"❌ Transfer failed for {self.agent_name}: {status_data['error']}")
-
-
     def supported_message_types(self) -> List[MessageType]:
         return [MessageType.TEXT]
 
@@ -75,15 +56,16 @@ class CryptoTransferHandler(MessageHandler):
 
     async def handle(self, message: Message, agent: 'AutonomousAgent') -> None:
         """Queue crypto transfer for background processing."""
+        await self.handle_batch([message], agent)
+
+    async def handle_batch(self, messages: List[Message], agent: 'AutonomousAgent') -> None:
+        """Queue one crypto transfer per message with a single Redis round trip."""
         await self.initialize()
         
-        # Check for any pending status updates
-        await self.check_status_updates()
-        
          # Calculate amount in token units (1 token = 10^decimals units)
         amount = 1 * (10 ** self.decimals)
 
-        transfer_data = {
+        transfer_data = json.dumps({
             'token_address': self.token_address,
             'source_address': self.source_address,
             'target_address': self.target_address,
@@ -91,11 +73,14 @@ class CryptoTransferHandler(MessageHandler):
             'amount': amount,  
             'web3_provider': self.web3.provider.endpoint_uri,
             'agent_name': self.agent_name
-        }
+        })
         
-        await self.redis.lpush('crypto_transfers', json.dumps(transfer_data))
+        await self.queue.push([transfer_data] * len(messages))
         
-        logger.info(f"💸 Token transfer of 1 token queued by {self.agent_name}")
+        if len(messages) == 1:
+            logger.info(f"💸 Token transfer of 1 token queued by {self.agent_name}")
+        else:
+            logger.info(f"💸 {len(messages)} token transfers of 1 token queued by {self.agent_name}")
         logger.info(f"   From: {self.source_address[:6]}...{self.source_address[-4:]}")
         logger.info(f"   To: {self.target_address[:6]}...{self.target_address[-4:]}")
         logger.info(f"   Token: {self.token_address[:6]}...{self.token_address[-4:]}")
\ No newline at end of file
@@ -13,6 +13,8 @@ from ..utils.logger import logger
 class HelloMessageHandler(MessageHandler):
     """Handler for processing hello messages."""
     
+    match_keywords = ("hello",)
+
     def supported_message_types(self) -> List[MessageType]:
         """
         Get supported message types.
@@ -45,4 +47,21 @@ class HelloMessageHandler(MessageHandler):
             message (Message): Message to process
             agent (AutonomousAgent): Agent processing the message
         """
-        logger.info(f"👋 Hello message received by {agent.name}: '{message.content}'")
\ No newline at end of file
+        logger.info(f"👋 Hello message received by {agent.name}: '{message.content}'")
+
+    async def handle_batch(self, messages: List[Message], agent: 'AutonomousAgent') -> None:
+        """
+        Process several hello messages with a single log record.
+        
+        Subclasses that override handle() get it called for every
+        message instead, whatever the batch size.
+        
+        Args:
+            messages (List[Message]): Messages to process
+            agent (AutonomousAgent): Agent processing the messages
+        """
+        if len(messages) == 1 or type(self).handle is not HelloMessageHandler.handle:
+            await super().handle_batch(messages, agent)
+            return
+        contents = ", ".join(f"'{message.content}'" for message in messages)
+        logger.info(f"👋 {len(messages)} hello messages received by {agent.name}: {contents}")
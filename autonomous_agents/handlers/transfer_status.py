@@ -0,0 +1,77 @@
+"""
+Transfer status handler implementation.
+
+This module provides a handler for the TRANSACTION messages the
+TransferStatusFeed delivers when the transfer processor reports on a
+queued transfer.
+"""
+
+from typing import List
+from web3 import Web3
+from ..chain.contracts import ContractRegistry
+from ..handlers.base import MessageHandler
+from ..core.message import Message, MessageType
+from ..utils.logger import logger
+
+class TransferStatusHandler(MessageHandler):
+    """Handler logging the outcome of queued transfers."""
+
+    def __init__(self, web3: Web3, token_address: str):
+        """
+        Initialize the handler.
+
+        Args:
+            web3 (Web3): Web3 instance
+            token_address (str): Address of the token contract
+        """
+        self.web3 = web3
+        self.token_address = token_address
+        self.contracts = ContractRegistry.shared()
+        # Token decimals are fetched on the first status
+        self.decimals = None
+
+    def supported_message_types(self) -> List[MessageType]:
+        """
+        Get supported message types.
+
+        Returns:
+            List[MessageType]: List containing TRANSACTION message type
+        """
+        return [MessageType.TRANSACTION]
+
+    async def can_handle(self, message: Message) -> bool:
+        """
+        Check if message is a transfer status.
+
+        Args:
+            message (Message): Message to check
+
+        Returns:
+            bool: True if message carries a status, False otherwise
+        """
+        return isinstance(message.content, dict) and 'status' in message.content
+
+    async def handle(self, message: Message, agent: 'AutonomousAgent') -> None:
+        """
+        Log the transfer's outcome.
+
+        Args:
+            message (Message): Transfer status
+            agent (AutonomousAgent): Agent processing the message
+        """
+        status_data = message.content
+        if status_data['status'] == 'success':
+            # Convert amount to decimal representation if present
+            if 'amount' in status_data:
+                if self.decimals is None:
+                    self.decimals = await self.contracts.decimals(self.web3, self.token_address)
+                amount = int(status_data['amount']) / (10 ** self.decimals)
+                logger.info(f"✅ Transfer of {amount} tokens completed for {agent.name}!")
+            else:
+                logger.info(f"✅ Transfer completed for {agent.name}!")
+            logger.info(f"   Transaction Hash: {status_data['tx_hash']}")
+            logger.info(f"   Block Number: {status_data['block_number']}")
+            logger.info(f"   Sender: {status_data['sender']}")
+            logger.info(f"   Gas Used: {status_data['gas_used']}")
+        elif status_data['status'] == 'error':
+            logger.error(f"❌ Transfer failed for {agent.name}: {status_data['error']}")
@@ -5,62 +5,116 @@ configured behaviors and handlers.
 """
 import asyncio
 import signal
+from functools import partial
+from typing import Dict, List, Optional
 from web3 import Web3
+from .chain.balance_oracle import BalanceOracle
+from .chain.providers import ProviderPool
 from .core.agent import AutonomousAgent
+from .core.registry import DispatchMode
+from .core.runtime import AgentSpec, Router, ShardedRuntime, build_agents, validate_topology
 from .behaviors.random_message import RandomMessageBehavior
 from .behaviors.token_balance import TokenBalanceCheckBehavior
+from .handlers.balance import BalanceChangeHandler
 from .handlers.hello import HelloMessageHandler
 from .handlers.crypto import CryptoTransferHandler
+from .handlers.transfer_status import TransferStatusHandler
 from .utils.logger import logger
+from .utils.transfer_status import TransferStatusFeed
 from . import config
 
+def shared_web3() -> Web3:
+    """Web3 instance shared by all agents in the current process."""
+    return ProviderPool.shared().get(config.WEB3_PROVIDER_URL)
+
+def configure_wallet_agent(agent: AutonomousAgent, wallet_address: str, private_key: str) -> None:
+    """
+    Register the standard behaviors and handlers for a wallet agent.
+    
+    Args:
+        agent (AutonomousAgent): Agent to configure
+        wallet_address (str): Wallet the agent monitors and sends from
+        private_key (str): Private key of the wallet
+    """
+    web3 = shared_web3()
+    agent.register_behavior(RandomMessageBehavior())
+    agent.register_behavior(TokenBalanceCheckBehavior(
+        web3, config.TOKEN_ADDRESS, wallet_address
+    ))
+    agent.register_handler(HelloMessageHandler())
+    agent.register_handler(BalanceChangeHandler(web3, config.TOKEN_ADDRESS))
+    BalanceOracle.for_web3(web3).watch(config.TOKEN_ADDRESS, wallet_address, agent.inbox)
+    agent.register_handler(CryptoTransferHandler(
+        web3,
+        config.TOKEN_ADDRESS,
+        wallet_address,
+        config.TARGET_ADDRESS,
+        private_key,
+        agent.name
+    ))
+    agent.register_handler(TransferStatusHandler(web3, config.TOKEN_ADDRESS))
+    TransferStatusFeed.shared().watch(agent.name, agent.inbox)
+
+def default_topology(agent_count: int = 2) -> List[AgentSpec]:
+    """
+    Build a ring of wallet agents, each sending to the next one.
+    
+    Agents alternate between the two configured wallets, so the default
+    of two agents matches the original Agent1/Agent2 setup.
+    
+    Args:
+        agent_count (int): Number of agents
+
+    Returns:
+        List[AgentSpec]: Topology specification
+    """
+    wallets = [
+        (config.WALLET1_ADDRESS, config.PRIVATE_KEY1),
+        (config.WALLET2_ADDRESS, config.PRIVATE_KEY2),
+    ]
+    names = [f"Agent{index + 1}" for index in range(agent_count)]
+    specs = []
+    for index, name in enumerate(names):
+        wallet_address, private_key = wallets[index % len(wallets)]
+        specs.append(AgentSpec(
+            name=name,
+            configure=partial(
+                configure_wallet_agent,
+                wallet_address=wallet_address,
+                private_key=private_key
+            ),
+            peers=[names[(index + 1) % agent_count]] if agent_count > 1 else [],
+            dispatch_mode=DispatchMode.CONCURRENT
+        ))
+    return specs
+
 class AgentSystem:
-    def __init__(self):
-        self.web3 = Web3(Web3.HTTPProvider(config.WEB3_PROVIDER_URL))
-        self.agent1 = None
-        self.agent2 = None
+    def __init__(self, topology: Optional[List[AgentSpec]] = None, workers: int = 1):
+        """
+        Initialize the agent system.
+        
+        Args:
+            topology (Optional[List[AgentSpec]]): Agents to run, defaults
+                to default_topology()
+            workers (int): Number of worker processes; 1 runs every agent
+                on the current event loop
+        """
+        self.topology = topology if topology is not None else default_topology()
+        validate_topology(self.topology)
+        self.workers = workers
+        self.agents: Dict[str, AutonomousAgent] = {}
+        self.runtime: Optional[ShardedRuntime] = None
+        self.router = Router()
         self.shutdown_event = asyncio.Event()
         self.tasks = []
 
     async def setup_agents(self):
         """Initialize and configure the agents."""
-        # Create agents
-        self.agent1 = AutonomousAgent("Agent1")
-        self.agent2 = AutonomousAgent("Agent2")
-        
-        # Connect agents
-        self.agent1.outbox = self.agent2.inbox
-        self.agent2.outbox = self.agent1.inbox
-        
-        # Configure agent1
-        self.agent1.register_behavior(RandomMessageBehavior())
-        self.agent1.register_behavior(TokenBalanceCheckBehavior(
-            self.web3, config.TOKEN_ADDRESS, config.WALLET1_ADDRESS
-        ))
-        self.agent1.register_handler(HelloMessageHandler())
-        self.agent1.register_handler(CryptoTransferHandler(
-            self.web3,
-            config.TOKEN_ADDRESS,
-            config.WALLET1_ADDRESS,
-            config.TARGET_ADDRESS,
-            config.PRIVATE_KEY1,
-            "Agent1"  # Add agent name here
-        ))
-        
-        # Configure agent2
-        self.agent2.register_behavior(RandomMessageBehavior())
-        self.agent2.register_behavior(TokenBalanceCheckBehavior(
-            self.web3, config.TOKEN_ADDRESS, config.WALLET2_ADDRESS
-        ))
-        self.agent2.register_handler(HelloMessageHandler())
-        self.agent2.register_handler(CryptoTransferHandler(
-            self.web3,
-            config.TOKEN_ADDRESS,
-            config.WALLET2_ADDRESS,
-            config.TARGET_ADDRESS,
-            config.PRIVATE_KEY2,
-            "Agent2"  # Add agent name here
-        ))
+        if self.workers > 1:
+            self.runtime = ShardedRuntime(self.topology, self.workers)
+            return
+        for agent in build_agents(self.topology, self.router):
+            self.agents[agent.name] = agent
 
     async def shutdown(self):
         """Gracefully shutdown the agent system."""
@@ -70,10 +124,13 @@ class AgentSystem:
         self.shutdown_event.set()
         
         # Stop the agents
-        if self.agent1:
-            self.agent1.stop()
-        if self.agent2:
-            self.agent2.stop()
+        for agent in self.agents.values():
+            agent.stop()
+        if self.agents:
+            await BalanceOracle.for_web3(shared_web3()).stop()
+            await TransferStatusFeed.shared().stop()
+        if self.runtime:
+            await self.runtime.stop()
         
         # Wait for all tasks to complete with timeout
         if self.tasks:
@@ -84,6 +141,8 @@ class AgentSystem:
                 )
             except asyncio.TimeoutError:
                 logger.warning("⚠️ Some tasks did not complete within timeout")
+        await self.router.close()
+        ProviderPool.shared().close()
         
         logger.info("✨ System shutdown complete")
 
@@ -112,9 +171,11 @@ class AgentSystem:
             
             # Create and store agent tasks
             self.tasks = [
-                asyncio.create_task(self.run_agent(self.agent1)),
-                asyncio.create_task(self.run_agent(self.agent2))
+                asyncio.create_task(self.run_agent(agent))
+                for agent in self.agents.values()
             ]
+            if self.runtime:
+                self.runtime.start()
             
             # Wait for shutdown event
             await self.shutdown_event.wait()
@@ -125,4 +186,4 @@ class AgentSystem:
 
 if __name__ == "__main__":
     system = AgentSystem()
-    asyncio.run(system.main())
\ No newline at end of file
+    asyncio.run(system.main())
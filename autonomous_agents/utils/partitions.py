@@ -0,0 +1,187 @@
+"""
+Partition ownership for transfer processors.
+
+This module provides a coordinator through which processors sharing a
+partitioned transfer queue agree on who works on which partition.
+Processors register in a Redis sorted set with heartbeats, partitions
+are spread evenly over the live members, and each owned partition is
+guarded by a lease key, so no two processors ever work on the same
+partition and therefore on the same wallet.
+"""
+
+import os
+import socket
+import time
+from typing import Callable, List, Optional, Set
+from redis.asyncio import Redis
+from ..utils.logger import logger
+
+# Extend a lease only if this member still holds it
+_RENEW_LEASE = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# Delete a lease only if this member still holds it
+_RELEASE_LEASE = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+def assign_partitions(members: List[str], partitions: int, member: str) -> Set[int]:
+    """
+    Get the partitions a member should own.
+    
+    Args:
+        members (List[str]): Live members
+        partitions (int): Number of partitions
+        member (str): Member to assign partitions to
+
+    Returns:
+        Set[int]: Partitions assigned to member
+    """
+    members = sorted(members)
+    if member not in members:
+        return set()
+    return {
+        partition for partition in range(partitions)
+        if members[partition % len(members)] == member
+    }
+
+class PartitionCoordinator:
+    """
+    Tracks which partitions this processor owns.
+    
+    heartbeat() must be called more often than lease_ms. Once the last
+    successful heartbeat is lease_ms old, the leases may have passed to
+    other processors, so no partition counts as owned until the next
+    heartbeat succeeds. A partition that
+    moves to another member is only released once busy() reports that
+    no job taken from it is still in flight, so its new owner cannot
+    send out of order with the old one.
+    """
+    
+    def __init__(
+        self,
+        redis: Redis,
+        partitions: int,
+        member: Optional[str] = None,
+        busy: Optional[Callable[[int], bool]] = None,
+        lease_ms: int = 15_000,
+        heartbeat_interval: float = 5.0,
+        key_prefix: str = 'transfer_partitions'
+    ) -> None:
+        """
+        Initialize the coordinator.
+        
+        Args:
+            redis (Redis): Client with decoded responses
+            partitions (int): Number of partitions
+            member (Optional[str]): Name of this processor, unique per
+                process by default
+            busy (Optional[Callable[[int], bool]]): Reports whether jobs
+                from a partition are still in flight
+            lease_ms (int): Milliseconds a lease or membership lasts
+                without a heartbeat
+            heartbeat_interval (float): Seconds between heartbeats
+            key_prefix (str): Prefix of the Redis keys
+        """
+        self.redis = redis
+        self.partitions = partitions
+        self.member = member or f"{socket.gethostname()}-{os.getpid()}"
+        self.busy = busy or (lambda partition: False)
+        self.lease_ms = lease_ms
+        self.heartbeat_interval = heartbeat_interval
+        self.members_key = f"{key_prefix}:members"
+        self.key_prefix = key_prefix
+        self.owned: Set[int] = set()
+        self._draining: Set[int] = set()
+        self._renewed_at: Optional[float] = None
+
+    def owns(self, partition: int) -> bool:
+        """
+        Check whether jobs may be taken from a partition.
+        
+        Args:
+            partition (int): Partition index
+
+        Returns:
+            bool: True if this processor owns the partition
+        """
+        if self._renewed_at is not None and time.monotonic() - self._renewed_at >= self.lease_ms / 1000:
+            self._expire()
+        return partition in self.owned
+
+    async def heartbeat(self) -> None:
+        """Refresh membership, rebalance and renew or acquire leases."""
+        # Leases count from before the round trips, so ownership never outlives them
+        started = time.monotonic()
+        now_ms = int(time.time() * 1000)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zadd(self.members_key, {self.member: now_ms})
+            pipe.zremrangebyscore(self.members_key, '-inf', now_ms - self.lease_ms)
+            pipe.zrange(self.members_key, 0, -1)
+            members = (await pipe.execute())[2]
+        assigned = assign_partitions(members, self.partitions, self.member)
+
+        for partition in sorted(self.owned - assigned):
+            # Stop taking jobs now; keep the lease until in-flight jobs are done
+            self.owned.discard(partition)
+            self._draining.add(partition)
+
+        for partition in sorted(self._draining):
+            if partition in assigned:
+                self._draining.discard(partition)
+                self.owned.add(partition)
+            elif not self.busy(partition):
+                await self.redis.eval(_RELEASE_LEASE, 1, self._lease_key(partition), self.member)
+                self._draining.discard(partition)
+                continue
+            if not await self._renew(partition):
+                self._draining.discard(partition)
+                self.owned.discard(partition)
+
+        for partition in sorted(self.owned & assigned):
+            if not await self._renew(partition):
+                self.owned.discard(partition)
+                logger.warning(f"⚠️ {self.member} lost the lease on transfer partition {partition}")
+
+        for partition in sorted(assigned - self.owned):
+            # The lease may still be ours after missed heartbeats cleared owned
+            acquired = await self._renew(partition) or await self.redis.set(
+                self._lease_key(partition), self.member, nx=True, px=self.lease_ms
+            )
+            if acquired:
+                self.owned.add(partition)
+                logger.info(f"📦 {self.member} took transfer partition {partition}")
+        self._renewed_at = started
+
+    async def leave(self) -> None:
+        """Give up every lease and membership."""
+        for partition in self.owned | self._draining:
+            await self.redis.eval(_RELEASE_LEASE, 1, self._lease_key(partition), self.member)
+        self.owned.clear()
+        self._draining.clear()
+        await self.redis.zrem(self.members_key, self.member)
+
+    def _expire(self) -> None:
+        """Stop serving every partition after the leases may have lapsed."""
+        if self.owned or self._draining:
+            logger.warning(f"⚠️ {self.member} missed its heartbeats; no longer serving transfer partitions")
+        self.owned.clear()
+        self._draining.clear()
+        self._renewed_at = None
+
+    async def _renew(self, partition: int) -> bool:
+        """Extend the lease on a partition; False if it is held by someone else."""
+        return bool(await self.redis.eval(
+            _RENEW_LEASE, 1, self._lease_key(partition), self.member, self.lease_ms
+        ))
+
+    def _lease_key(self, partition: int) -> str:
+        """Redis key of a partition's lease."""
+        return f"{self.key_prefix}:lease:{partition}"
@@ -1,131 +1,668 @@
 import json
 import asyncio
 import signal
+import weakref
+from typing import Any, Dict, List, Optional, Tuple
 from web3 import Web3
+from web3.exceptions import ContractLogicError, TransactionNotFound
 from eth_account import Account
 from redis.asyncio import Redis
-from ..config import REDIS_URL, ERC20_ABI
+from ..chain.client import ChainClient, node_rejected
+from ..chain.contracts import ContractRegistry
+from ..chain.fees import FeeOracle
+from ..chain.indexer import TransferIndexer
+from ..chain.nonce import NonceManager, already_known
+from ..chain.providers import ProviderPool
+from ..chain.receipts import ReceiptWatcher
+from ..config import REDIS_URL
 from ..utils.logger import logger
+from ..utils.partitions import PartitionCoordinator
+from ..utils.transfer_queue import PartitionedTransferQueue, TransferQueue, partition_for
+from ..utils.transfer_status import STATUS_FIELD, STATUS_STREAM_MAXLEN, status_stream
+
+# Seconds a signed transaction is kept for the queue entries it covers
+SENT_RECORD_TTL = 86_400
+
+def sent_record_key(queue_id: str) -> str:
+    """Redis key of the transaction sent for a queue entry."""
+    return f"transfer_sent:{queue_id}"
+
+class TransferRejected(Exception):
+    """A transfer that would fail the same way however often it is retried."""
+
+def coalesce_transfers(jobs: List[dict]) -> List[dict]:
+    """
+    Merge jobs that move the same token between the same two addresses.
+    
+    A merged job carries the summed amount and lists the jobs it stands
+    for under 'merged'; it takes the place of the first of them. Jobs
+    without a partner, and redelivered jobs, which may already have been
+    sent on their own, are returned unchanged.
+    
+    Args:
+        jobs (List[dict]): Queued transfer jobs, in queue order
+
+    Returns:
+        List[dict]: Jobs to execute
+    """
+    groups: Dict[Tuple[str, str, str, str, Optional[str]], List[dict]] = {}
+    for job in jobs:
+        key = (
+            job['token_address'].lower(),
+            job['source_address'].lower(),
+            job['target_address'].lower(),
+            job['web3_provider'],
+            job['queue_id'] if job.get('redelivered') else None
+        )
+        groups.setdefault(key, []).append(job)
+    return [
+        group[0] if len(group) == 1 else {
+            **group[0],
+            'amount': sum(job['amount'] for job in group),
+            'merged': group
+        }
+        for group in groups.values()
+    ]
 
 class TransferProcessor:
-    def __init__(self):
+    """
+    Executes queued token transfers.
+    
+    Up to `workers` transfers are in flight at once. Transfers from the
+    same source wallet are signed and sent one after another in queue
+    order with nonces reserved locally by a NonceManager, so a wallet
+    can have many transactions pending. Confirmations come from the
+    shared ReceiptWatcher, which checks all pending transactions once
+    per block. Web3 calls run on the chain client's thread pool,
+    over keep-alive connections from the shared ProviderPool.
+    
+    When the queue is partitioned by source wallet, processors share the
+    partitions through a PartitionCoordinator and each owned partition
+    is consumed by its own loop, so no wallet is ever served by two
+    processors at once.
+    
+    Jobs already waiting in the queue are taken in bulk, as many as there
+    are free workers, and statuses finished together are written to Redis
+    in one pipeline to each agent's status stream, so a burst does not cost a round trip per job.
+    
+    Jobs read from a stream are sent at most once: the signed transaction
+    is stored for their queue entries before it is broadcast, and a
+    redelivered job rebroadcasts that transaction instead of signing a
+    new one.
+    
+    Only final outcomes, such as an insufficient balance, a transfer that
+    would revert or a reverted receipt, are published and acknowledged.
+    Any other error, like an RPC timeout or a dropped connection, leaves
+    the job unacknowledged, so a stream queue retries it and eventually
+    dead-letters it; a list queue cannot retry, so the error is published.
+    
+    With a coalescing window, jobs arriving within the window that move
+    the same token between the same addresses are sent as one transfer
+    of the summed amount; every job still gets its own status.
+    """
+
+    def __init__(
+        self,
+        indexer: Optional[TransferIndexer] = None,
+        workers: int = 1,
+        shared_nonces: bool = False,
+        coalesce_window: float = 0.0,
+        coalesce_max: int = 50,
+        read_batch: int = 100,
+        status_batch_window: float = 0.01
+    ):
+        """
+        Initialize the processor.
+        
+        Args:
+            indexer (Optional[TransferIndexer]): Index serving pre-flight
+                balance checks for the wallets it covers
+            workers (int): Maximum number of transfers in flight
+            shared_nonces (bool): Keep nonces in Redis so several
+                processors can send from the same wallets
+            coalesce_window (float): Seconds to wait for more jobs to
+                merge with a popped one; 0 disables coalescing
+            coalesce_max (int): Most jobs collected for one merge round
+            read_batch (int): Most jobs taken from the queue per read,
+                bounded by the free workers
+            status_batch_window (float): Seconds a status waits for
+                others to be written with it in one pipeline
+        """
         self.redis = None
         self.running = True
+        self.indexer = indexer
+        self.contracts = ContractRegistry.shared()
+        self.workers = workers
+        self.shared_nonces = shared_nonces
+        self.coalesce_window = coalesce_window
+        self.coalesce_max = coalesce_max
+        self.read_batch = read_batch
+        self.status_batch_window = status_batch_window
+        self._statuses: List[Tuple[str, dict]] = []
+        self._status_flush: Optional[asyncio.Future] = None
+        self.queue = None
+        self.coordinator = None
+        self._in_flight: Dict[int, int] = {}
+        self.providers = ProviderPool.shared()
+        self._nonces: Dict[str, NonceManager] = {}
+        # Weak, so a wallet's lock goes away once no transfer holds or waits on it
+        self._lanes: 'weakref.WeakValueDictionary[str, asyncio.Lock]' = weakref.WeakValueDictionary()
+        self._slots = asyncio.Semaphore(workers)
+        self._tasks = set()
 
     async def initialize(self):
-        """Initialize Redis connection."""
+        """Initialize Redis connection and transfer queue."""
         if not self.redis:
             self.redis = Redis.from_url(REDIS_URL, decode_responses=True)
+        if not self.queue:
+            self.queue = PartitionedTransferQueue(self.redis)
+        if self.queue.partitions[0].redelivers and len(self.queue.partitions) == 1 and not self.shared_nonces:
+            # Other processors on the same stream may take jobs for the same wallets
+            logger.warning(
+                "⚠️ Stream transfer queue without partitions or --shared-nonces: "
+                "processors sharing it will reserve conflicting nonces"
+            )
+        if not self.coordinator and len(self.queue.partitions) > 1:
+            self.coordinator = PartitionCoordinator(
+                self.redis,
+                len(self.queue.partitions),
+                busy=lambda partition: self._in_flight.get(partition, 0) > 0
+            )
 
     async def publish_status(self, agent_name: str, status_data: dict):
-        """Publish transfer status update to agent-specific channel."""
-        status_channel = f"transfer_status_{agent_name}"
-        await self.redis.set(status_channel, json.dumps(status_data))
+        """Append a transfer status to the agent's status stream."""
+        await self._write_statuses([(agent_name, status_data)])
+
+    async def _publish(self, transfer_data: dict, status_data: dict) -> None:
+        """Publish a status to the agent of every job a transfer stands for."""
+        try:
+            await self._write_statuses([
+                (job['agent_name'], status_data)
+                for job in transfer_data.get('merged', [transfer_data])
+            ])
+        except Exception as e:
+            # The transfer is done either way; failing here would leave it unacknowledged
+            logger.error(f"❌ Failed to publish transfer status: {str(e)}")
+
+    async def _write_statuses(self, statuses: List[Tuple[str, dict]]) -> None:
+        """Buffer statuses and wait until the batch holding them is written."""
+        self._statuses += statuses
+        if self._status_flush is None:
+            self._status_flush = asyncio.ensure_future(self._flush_statuses())
+        # Shielded so a cancelled caller doesn't drop the others' statuses
+        await asyncio.shield(self._status_flush)
+
+    async def _flush_statuses(self) -> None:
+        """Write every buffered status in one pipeline."""
+        await asyncio.sleep(self.status_batch_window)
+        statuses, self._statuses = self._statuses, []
+        self._status_flush = None
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for agent_name, status_data in statuses:
+                pipe.xadd(
+                    status_stream(agent_name),
+                    {STATUS_FIELD: json.dumps(status_data)},
+                    maxlen=STATUS_STREAM_MAXLEN,
+                    approximate=True
+                )
+            await pipe.execute()
 
     async def process_transfer(self, transfer_data: dict):
-        """Process a single transfer."""
+        """
+        Process a single transfer.
+        
+        Args:
+            transfer_data (dict): Queued transfer job
+
+        Raises:
+            Exception: If the transfer failed for a reason worth retrying;
+                final outcomes are published instead
+        """
+        source = transfer_data['source_address'].lower()
+        lane = self._lanes.get(source)
+        if lane is None:
+            lane = self._lanes[source] = asyncio.Lock()
+        async with lane:
+            sent = await self.send_transfer(transfer_data)
+        if sent:
+            await self.confirm_transfer(sent)
+
+    async def send_transfer(self, transfer_data: dict) -> Optional[Dict[str, Any]]:
+        """
+        Check the balance, then sign and send a transfer.
+        
+        Args:
+            transfer_data (dict): Queued transfer job
+
+        Returns:
+            Optional[Dict[str, Any]]: Details of the sent transaction, or
+                None if it can never be sent; the failure status is published
+
+        Raises:
+            Exception: If sending failed for a reason worth retrying
+        """
+        agent_name = transfer_data['agent_name']
+        source_address = transfer_data['source_address']
         try:
-            web3 = Web3(Web3.HTTPProvider(transfer_data['web3_provider']))
-            token_contract = web3.eth.contract(
-                address=web3.to_checksum_address(transfer_data['token_address']),
-                abi=json.loads(ERC20_ABI)
-            )
-            source_address = web3.to_checksum_address(transfer_data['source_address'])
+            web3 = self.providers.get(transfer_data['web3_provider'])
+            chain = ChainClient.for_web3(web3)
+            if transfer_data.get('redelivered'):
+                resent = await self._resend(transfer_data, web3)
+                if resent:
+                    return resent
+            token_contract = self.contracts.contract(web3, transfer_data['token_address'])
+            source_address = web3.to_checksum_address(source_address)
             target_address = web3.to_checksum_address(transfer_data['target_address'])
             private_key = transfer_data['private_key']
-            agent_name = transfer_data['agent_name']
             
             logger.info(f"📝 Processing transfer request from {agent_name}")
             logger.info(f"   From: {source_address[:6]}...{source_address[-4:]}")
             logger.info(f"   To: {target_address[:6]}...{target_address[-4:]}")
             
             # Check balance
-            balance = token_contract.functions.balanceOf(source_address).call()
-            if balance >= transfer_data['amount']:
-                nonce = web3.eth.get_transaction_count(source_address)
-                transfer_function = token_contract.functions.transfer(
-                    target_address,
-                    transfer_data['amount']
-                )
-                
+            balance = None
+            if self.indexer and self.indexer.covers(transfer_data['token_address'], source_address):
+                balance = self.indexer.balance_of(source_address)
+            if balance is None or balance < transfer_data['amount']:
+                # The index trails the head, so only the chain can say a balance is short
+                balance = await chain.call(token_contract.functions.balanceOf(source_address).call)
+            if balance < transfer_data['amount']:
+                await self._publish(transfer_data, {
+                    'status': 'error',
+                    'source_address': source_address,
+                    'error': f'Insufficient balance: {balance}'
+                })
+                logger.warning(f"⚠️ Insufficient balance for {agent_name}: {balance}")
+                return None
+
+            fees = FeeOracle.for_web3(web3)
+            transfer_function = token_contract.functions.transfer(
+                target_address,
+                transfer_data['amount']
+            )
+            chain_id = await fees.chain_id()
+            fee_params = await fees.fee_params()
+            gas = await fees.gas_limit(
+                transfer_data['token_address'], 'transfer', transfer_function, source_address
+            )
+            
+            nonces = self._nonce_manager(transfer_data['web3_provider'], web3)
+            nonce = await nonces.reserve(source_address)
+            try:
                 txn = transfer_function.build_transaction({
                     'from': source_address,
                     'nonce': nonce,
-                    'gas': 1000000,
-                    'gasPrice': int(web3.eth.gas_price * 1.1),
-                    'chainId': web3.eth.chain_id
+                    'gas': gas,
+                    'chainId': chain_id,
+                    **fee_params
                 })
                 
                 signed_txn = Account.sign_transaction(txn, private_key)
-                tx_hash = web3.eth.send_raw_transaction(signed_txn.raw_transaction)
+                await self._record_sent(transfer_data, signed_txn)
+            except Exception as e:
+                # Nothing reached the node
+                await nonces.send_failed(source_address, nonce, e)
+                raise
+            try:
+                tx_hash = await chain.call(web3.eth.send_raw_transaction, signed_txn.raw_transaction)
+            except Exception as e:
+                reached = await self._reached_node(web3, signed_txn, e)
+                if not reached:
+                    # The nonce is only free again if the node surely never took it
+                    if reached is False:
+                        await nonces.send_failed(source_address, nonce, e)
+                    raise
+                tx_hash = signed_txn.hash
+            
+            logger.info(f"📤 Transaction sent by {agent_name}")
+            if 'merged' in transfer_data:
+                logger.info(f"   Covers {len(transfer_data['merged'])} queued transfers")
+            logger.info(f"   TX Hash: {tx_hash.hex()}")
+            return {
+                'web3': web3,
+                'tx_hash': tx_hash,
+                'txn': txn,
+                'token_address': transfer_data['token_address'],
+                'job': transfer_data,
+                'agent_name': agent_name,
+                'source_address': source_address,
+            }
+        
+        except (TransferRejected, ContractLogicError) as e:
+            await self._publish_error(transfer_data, source_address, e)
+            return None
+
+    async def confirm_transfer(self, sent: Dict[str, Any]) -> None:
+        """
+        Wait for a sent transfer's receipt and publish the outcome.
+        
+        Args:
+            sent (Dict[str, Any]): Details returned by send_transfer()
+
+        Raises:
+            Exception: If the outcome could not be found out, such as
+                when the transaction stays unconfirmed
+        """
+        web3 = sent['web3']
+        agent_name, source_address = sent['agent_name'], sent['source_address']
+        watcher = ReceiptWatcher.for_web3(web3)
+        try:
+            # A rebroadcast transaction may have been mined before wait() starts watching
+            found = await watcher.lookup(sent['tx_hash']) if sent.get('resent') else None
+            if found is None:
+                try:
+                    found = await watcher.wait(sent['tx_hash'])
+                except TimeoutError:
+                    sent, found = await self._recover_unconfirmed(sent)
+            receipt, block = found
+            tx_hash = sent['tx_hash']
+            FeeOracle.for_web3(web3).record_gas_used(sent['token_address'], 'transfer', receipt['gasUsed'])
+            
+            if receipt['status'] == 1:
+                await self._publish(sent['job'], {
+                    'status': 'success',
+                    'source_address': source_address,
+                    'sender': receipt['from'],
+                    'tx_hash': tx_hash.hex(),
+                    'block_number': receipt['blockNumber'],
+                    'gas_used': receipt['gasUsed'],
+                    'timestamp': block['timestamp']
+                })
                 
-                logger.info(f"📤 Transaction sent by {agent_name}")
+                logger.info(f"✅ Transfer completed for {agent_name}")
+                logger.info(f"   Block: {receipt['blockNumber']}")
+                logger.info(f"   From: {receipt['from']}")
                 logger.info(f"   TX Hash: {tx_hash.hex()}")
-                
-                receipt = web3.eth.wait_for_transaction_receipt(tx_hash)
-                block = web3.eth.get_block(receipt['blockNumber'])
-                
-                if receipt['status'] == 1:
-                    await self.publish_status(agent_name, {
-                        'status': 'success',
-                        'source_address': source_address,
-                        'sender': receipt['from'],
-                        'tx_hash': tx_hash.hex(),
-                        'block_number': receipt['blockNumber'],
-                        'gas_used': receipt['gasUsed'],
-                        'timestamp': block['timestamp']
-                    })
-                    
-                    logger.info(f"✅ Transfer completed for {agent_name}")
-                    logger.info(f"   Block: {receipt['blockNumber']}")
-                    logger.info(f"   From: {receipt['from']}")
-                    logger.info(f"   TX Hash: {tx_hash.hex()}")
-                    logger.info(f"   Gas Used: {receipt['gasUsed']}")
-                else:
-                    await self.publish_status(agent_name, {
-                        'status': 'error',
-                        'source_address': source_address,
-                        'error': 'Transaction failed'
-                    })
-                    logger.error(f"❌ Transfer failed for {agent_name}!")
+                logger.info(f"   Gas Used: {receipt['gasUsed']}")
             else:
-                await self.publish_status(agent_name, {
+                await self._publish(sent['job'], {
                     'status': 'error',
                     'source_address': source_address,
-                    'error': f'Insufficient balance: {balance}'
+                    'error': 'Transaction failed'
                 })
-                logger.warning(f"⚠️ Insufficient balance for {agent_name}: {balance}")
+                logger.error(f"❌ Transfer failed for {agent_name}!")
+        
+        except TransferRejected as e:
+            await self._publish_error(sent['job'], source_address, e)
+
+    async def _recover_unconfirmed(self, sent: Dict[str, Any]) -> Tuple[Dict[str, Any], Tuple[Any, Any]]:
+        """
+        Deal with a transfer that was not confirmed within the receipt timeout.
         
+        A transaction the node still holds, or has dropped, is replaced by
+        the same transaction with bumped fees, so the wallet's later nonces
+        are not stuck behind it. If the replacement cannot be sent either,
+        a dropped transaction's nonce is handed back to fill the gap. A
+        transaction waiting behind nonces the node never got is left
+        alone; those nonces are handed out again instead.
+        
+        Args:
+            sent (Dict[str, Any]): Details returned by send_transfer()
+
+        Returns:
+            Tuple[Dict[str, Any], Tuple[Any, Any]]: Details of the
+                confirmed transaction, and its receipt and block header
+
+        Raises:
+            TimeoutError: If the transaction cannot be replaced, waits
+                behind a gap, or the replacement is not confirmed in time
+            TransferRejected: If another transaction took the nonce
+        """
+        web3, tx_hash, txn = sent['web3'], sent['tx_hash'], sent.get('txn')
+        watcher = ReceiptWatcher.for_web3(web3)
+        found = await watcher.lookup(tx_hash)
+        if found is not None:
+            return sent, found
+        if txn is None:
+            raise TimeoutError(f"No receipt for 0x{bytes(tx_hash).hex()}")
+
+        source_address = sent['source_address']
+        nonces = self._nonce_manager(sent['job']['web3_provider'], web3)
+        state = await nonces.check_unconfirmed(source_address, txn['nonce'])
+        if state == "mined":
+            raise TransferRejected(f"Nonce {txn['nonce']} was used by another transaction")
+        if state == "gap":
+            missing = await nonces.release_gap(source_address, txn['nonce'])
+            raise TimeoutError(f"0x{bytes(tx_hash).hex()} waits behind {missing} missing nonces")
+
+        logger.warning(f"⚠️ Transaction 0x{bytes(tx_hash).hex()} was {state} unconfirmed; replacing it with higher fees")
+        replacement = {**txn, **await FeeOracle.for_web3(web3).replacement_fees(txn)}
+        signed_txn = Account.sign_transaction(replacement, sent['job']['private_key'])
+        await self._record_sent(sent['job'], signed_txn)
+        try:
+            tx_hash = await ChainClient.for_web3(web3).call(
+                web3.eth.send_raw_transaction, signed_txn.raw_transaction
+            )
         except Exception as e:
-            error_msg = str(e)
-            await self.publish_status(agent_name, {
-                'status': 'error',
-                'source_address': source_address,
-                'error': error_msg
-            })
-            logger.error(f"❌ Transfer processing error for {agent_name}: {error_msg}")
+            reached = await self._reached_node(web3, signed_txn, e)
+            if not reached:
+                if reached is False and state == "dropped":
+                    await nonces.send_failed(source_address, txn['nonce'], e)
+                raise
+            tx_hash = signed_txn.hash
+        logger.info(f"🔁 Replacement sent: {tx_hash.hex()}")
+        sent = {**sent, 'tx_hash': tx_hash, 'txn': replacement}
+        return sent, await watcher.wait(tx_hash)
 
-    async def run(self):
-        """Main processing loop."""
-        await self.initialize()
-        logger.info("🚀 Transfer processor started")
+    async def _reached_node(self, web3: Web3, signed_txn: Any, error: Exception) -> Optional[bool]:
+        """
+        Find out whether a transaction whose send raised reached the node anyway.
         
-        while self.running:
+        Args:
+            web3 (Web3): Web3 instance the transaction was sent through
+            signed_txn (Any): Signed transaction
+            error (Exception): Error raised by send_raw_transaction
+
+        Returns:
+            Optional[bool]: True if the node holds the transaction, False
+                if it surely never took it, None if that is unknown
+        """
+        if already_known(error):
+            return True
+        if node_rejected(error):
+            return False
+        # A timeout or dropped connection may have come after the node took it
+        try:
+            await ChainClient.for_web3(web3).call(web3.eth.get_transaction, signed_txn.hash)
+        except TransactionNotFound:
+            return False
+        except Exception as e:
+            logger.warning(f"⚠️ Cannot tell whether 0x{bytes(signed_txn.hash).hex()} was sent: {str(e)}")
+            return None
+        logger.warning(f"⚠️ Node took 0x{bytes(signed_txn.hash).hex()} despite: {str(error)}")
+        return True
+
+    async def _record_sent(self, transfer_data: dict, signed_txn: Any) -> None:
+        """Store a signed transaction for the queue entries it covers before it is sent."""
+        queue_ids = [
+            job['queue_id'] for job in transfer_data.get('merged', [transfer_data])
+            if 'queue_id' in job
+        ]
+        if not queue_ids:
+            return
+        record = json.dumps({
+            'tx_hash': bytes(signed_txn.hash).hex(),
+            'raw_transaction': bytes(signed_txn.raw_transaction).hex()
+        })
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for queue_id in queue_ids:
+                pipe.set(sent_record_key(queue_id), record, ex=SENT_RECORD_TTL)
+            await pipe.execute()
+
+    async def _resend(self, transfer_data: dict, web3: Web3) -> Optional[Dict[str, Any]]:
+        """Rebroadcast the transaction stored for a redelivered job, if any."""
+        record = await self.redis.get(sent_record_key(transfer_data['queue_id']))
+        if not record:
+            return None
+        record = json.loads(record)
+        try:
+            await ChainClient.for_web3(web3).call(
+                web3.eth.send_raw_transaction, bytes.fromhex(record['raw_transaction'])
+            )
+        except Exception as e:
+            # Usually "already known" or "nonce too low": it is pending or mined
+            logger.debug(f"Rebroadcast of {record['tx_hash']} rejected: {str(e)}")
+        logger.info(f"🔁 Transfer job {transfer_data['queue_id']} was already sent as {record['tx_hash']}")
+        return {
+            'web3': web3,
+            'tx_hash': bytes.fromhex(record['tx_hash']),
+            'token_address': transfer_data['token_address'],
+            'job': transfer_data,
+            'agent_name': transfer_data['agent_name'],
+            'source_address': web3.to_checksum_address(transfer_data['source_address']),
+            'resent': True,
+        }
+
+    async def _keep_alive(self) -> None:
+        """Keep the jobs in flight from being reclaimed by other processors."""
+        intervals = [
+            queue.keep_alive_interval for queue in self.queue.partitions
+            if queue.keep_alive_interval
+        ]
+        if not intervals:
+            return
+        while True:
+            await asyncio.sleep(min(intervals))
+            for queue in self.queue.partitions:
+                try:
+                    await queue.keep_alive()
+                except Exception as e:
+                    logger.error(f"❌ Failed to keep transfer jobs alive: {str(e)}")
+
+    async def _publish_error(self, transfer_data: dict, source_address: str, error: Exception) -> None:
+        """Report a failed transfer to its agents."""
+        agent_name = transfer_data['agent_name']
+        error_msg = str(error)
+        await self._publish(transfer_data, {
+            'status': 'error',
+            'source_address': source_address,
+            'error': error_msg
+        })
+        logger.error(f"❌ Transfer processing error for {agent_name}: {error_msg}")
+
+    def _nonce_manager(self, provider_url: str, web3: Web3) -> NonceManager:
+        """Get the nonce manager for a provider URL, creating it once."""
+        nonces = self._nonces.get(provider_url)
+        if nonces is None:
+            nonces = self._nonces[provider_url] = NonceManager(
+                web3, self.redis if self.shared_nonces else None
+            )
+        return nonces
+
+    async def _run_transfer(self, transfer_data: dict, partition: int) -> None:
+        """Process a transfer, acknowledge its jobs and free its worker slot."""
+        queue = self.queue.partitions[partition]
+        jobs = transfer_data.get('merged', [transfer_data])
+        try:
+            await self.process_transfer(transfer_data)
+            for job in jobs:
+                await queue.ack(job)
+        except Exception as e:
+            logger.error(f"❌ Processor error: {str(e)}")
+            if not queue.redelivers:
+                # The job is gone, so this is the last chance to tell its agents
+                await self._publish_error(transfer_data, transfer_data['source_address'], e)
+            for job in jobs:
+                await queue.release(job)
+        finally:
+            self._in_flight[partition] -= 1
+            self._slots.release()
+
+    async def _collect(self, queue: TransferQueue, limit: int) -> List[dict]:
+        """Pop up to limit more jobs arriving within the coalescing window."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.coalesce_window
+        jobs = []
+        while len(jobs) < limit:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            popped = await queue.pop(limit - len(jobs), timeout=remaining)
+            if not popped:
+                break
+            jobs += popped
+        return jobs
+
+    def _owns(self, partition: int) -> bool:
+        """Check whether this processor may take jobs from a partition."""
+        return self.coordinator is None or self.coordinator.owns(partition)
+
+    async def _consume(self, partition: int) -> None:
+        """Take jobs from one partition while running and owning it."""
+        queue = self.queue.partitions[partition]
+        if self.coordinator is not None and not self._in_flight.get(partition):
+            # Another processor may have sent from these wallets while it owned the partition
+            for nonces in self._nonces.values():
+                nonces.forget(lambda address: partition_for(address, len(self.queue.partitions)) == partition)
+        while self.running and self._owns(partition):
+            # Only take a job once a worker is free to run it
+            await self._slots.acquire()
+            slots = 1
             try:
-                # Pop transfer request with timeout
-                result = await self.redis.brpop('crypto_transfers', timeout=1)
-                if result:
-                    _, transfer_data = result
-                    transfer_dict = json.loads(transfer_data)
-                    await self.process_transfer(transfer_dict)
+                jobs = await queue.pop(1, timeout=1)
+                if jobs:
+                    # Hand any other free workers the jobs already waiting
+                    while slots < self.read_batch and not self._slots.locked():
+                        await self._slots.acquire()
+                        slots += 1
+                    if slots > 1:
+                        jobs += await queue.pop(slots - 1, timeout=0)
+                if jobs and self.coalesce_window > 0:
+                    jobs += await self._collect(queue, self.coalesce_max - len(jobs))
+                    jobs = coalesce_transfers(jobs)
+                for job in jobs:
+                    if slots:
+                        slots -= 1
+                    else:
+                        await self._slots.acquire()
+                    self._in_flight[partition] = self._in_flight.get(partition, 0) + 1
+                    task = asyncio.create_task(self._run_transfer(job, partition))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
             except Exception as e:
                 logger.error(f"❌ Processor error: {str(e)}")
                 await asyncio.sleep(1)
+            finally:
+                for _ in range(slots):
+                    self._slots.release()
+
+    async def run(self):
+        """Main processing loop."""
+        await self.initialize()
+        if self.indexer:
+            self.indexer.start()
+        logger.info(f"🚀 Transfer processor started with {self.workers} worker(s)")
+        keep_alive = asyncio.create_task(self._keep_alive())
+        
+        if self.coordinator is None:
+            await self._consume(0)
+        else:
+            consumers: Dict[int, asyncio.Task] = {}
+            while self.running:
+                try:
+                    await self.coordinator.heartbeat()
+                except Exception as e:
+                    logger.error(f"❌ Partition heartbeat failed: {str(e)}")
+                for partition in self.coordinator.owned:
+                    if partition not in consumers or consumers[partition].done():
+                        consumers[partition] = asyncio.create_task(self._consume(partition))
+                await asyncio.sleep(self.coordinator.heartbeat_interval)
+            await asyncio.gather(*consumers.values(), return_exceptions=True)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        keep_alive.cancel()
+        if self.coordinator:
+            await self.coordinator.leave()
 
     async def shutdown(self):
         """Graceful shutdown."""
         logger.info("👋 Transfer processor shutting down...")
         self.running = False
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self.indexer:
+            await self.indexer.stop()
         if self.redis:
             await self.redis.close()
-        logger.info("✨ Transfer processor stopped")
\ No newline at end of file
+        self.providers.close()
+        logger.info("✨ Transfer processor stopped")
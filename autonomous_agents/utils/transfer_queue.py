@@ -0,0 +1,384 @@
+"""
+Queue backends for crypto transfer jobs.
+
+This module provides the queue that CryptoTransferHandler pushes
+transfer jobs to and TransferProcessor pops them from. The list backend
+is the original LPUSH/BRPOP queue. The stream backend keeps jobs in a
+Redis stream read through a consumer group, so a job stays pending
+until it is acknowledged, jobs of a crashed processor are reclaimed by
+the others, and several processors can share the queue.
+
+Either backend can be split into partitions by source wallet, so that
+processors can work on different wallets in parallel while each wallet's
+jobs stay in one ordered queue.
+"""
+
+import json
+import os
+import socket
+import zlib
+from typing import List, Optional, Set, Union
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+from ..config import TRANSFER_PARTITIONS, TRANSFER_QUEUE_BACKEND
+from ..utils.logger import logger
+
+TRANSFER_LIST = 'crypto_transfers'
+TRANSFER_STREAM = 'crypto_transfers_stream'
+DEAD_LETTER_STREAM = 'crypto_transfers_dead'
+
+class ListTransferQueue:
+    """Transfer queue on a Redis list; a popped job is gone from Redis."""
+
+    # Popped jobs cannot be claimed by anyone else, so need no keep-alive
+    keep_alive_interval: Optional[float] = None
+    # A released job is not delivered again
+    redelivers = False
+
+    def __init__(self, redis: Redis, key: str = TRANSFER_LIST) -> None:
+        """
+        Initialize the queue.
+        
+        Args:
+            redis (Redis): Client with decoded responses
+            key (str): List key
+        """
+        self.redis = redis
+        self.key = key
+
+    async def push(self, payloads: List[str]) -> None:
+        """
+        Append jobs in one round trip.
+        
+        Args:
+            payloads (List[str]): JSON-encoded jobs
+        """
+        # LPUSH with several values keeps BRPOP order identical to one push per job
+        await self.redis.lpush(self.key, *payloads)
+
+    async def pop(self, count: int, timeout: float) -> List[dict]:
+        """
+        Take the oldest jobs, waiting for one if the queue is empty.
+        
+        Jobs already waiting are drained with a single RPOP with a count
+        (Redis 6.2+) instead of one round trip per job.
+        
+        Args:
+            count (int): Most jobs wanted
+            timeout (float): Seconds to wait for a job; 0 or less
+                returns immediately
+
+        Returns:
+            List[dict]: Decoded jobs, empty on timeout
+        """
+        payloads = []
+        if timeout > 0:
+            result = await self.redis.brpop(self.key, timeout=timeout)
+            if not result:
+                return []
+            payloads.append(result[1])
+        if len(payloads) < count:
+            payloads += await self.redis.rpop(self.key, count - len(payloads)) or []
+        return [json.loads(payload) for payload in payloads]
+
+    async def ack(self, job: dict) -> None:
+        """
+        Mark a job as done; nothing to do for a list.
+        
+        Args:
+            job (dict): Job returned by pop()
+        """
+
+    async def release(self, job: dict) -> None:
+        """
+        Give up on a failed job; it is gone with a list.
+        
+        Args:
+            job (dict): Job returned by pop()
+        """
+
+    async def keep_alive(self) -> None:
+        """Keep popped jobs from being reclaimed; nothing to do for a list."""
+
+class StreamTransferQueue:
+    """
+    Transfer queue on a Redis stream with a consumer group.
+    
+    Delivery is at least once: a job popped by a processor that dies
+    before acknowledging it is claimed by another processor once it has
+    been idle for claim_idle_ms. A job delivered more than max_retries
+    times is moved to a dead-letter stream instead.
+    
+    keep_alive() must be called every keep_alive_interval seconds while
+    jobs are in flight; it claims them again for this consumer so they
+    never look idle, however long a transfer takes to confirm.
+    """
+
+    # A released job is delivered again once idle
+    redelivers = True
+    
+    def __init__(
+        self,
+        redis: Redis,
+        stream: str = TRANSFER_STREAM,
+        group: str = 'transfer-processors',
+        consumer: Optional[str] = None,
+        dead_letter: str = DEAD_LETTER_STREAM,
+        max_retries: int = 3,
+        claim_idle_ms: int = 60_000,
+        maxlen: Optional[int] = 1_000_000
+    ) -> None:
+        """
+        Initialize the queue.
+        
+        Args:
+            redis (Redis): Client with decoded responses
+            stream (str): Stream key
+            group (str): Consumer group shared by all processors
+            consumer (Optional[str]): Name of this processor in the
+                group, unique per process by default
+            dead_letter (str): Stream receiving jobs that kept failing
+            max_retries (int): Deliveries after which a job is dead-lettered
+            claim_idle_ms (int): Milliseconds a pending job may go
+                unacknowledged before another processor claims it
+            maxlen (Optional[int]): Approximate cap on the stream length
+        """
+        self.redis = redis
+        self.stream = stream
+        self.group = group
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self.dead_letter = dead_letter
+        self.max_retries = max_retries
+        self.claim_idle_ms = claim_idle_ms
+        self.maxlen = maxlen
+        self.keep_alive_interval = claim_idle_ms / 4000
+        self._in_flight: Set[str] = set()
+        self._claim_cursor = '0-0'
+        self._group_ready = False
+
+    async def push(self, payloads: List[str]) -> None:
+        """
+        Append jobs with one pipelined round trip.
+        
+        Args:
+            payloads (List[str]): JSON-encoded jobs
+        """
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for payload in payloads:
+                pipe.xadd(self.stream, {'job': payload}, maxlen=self.maxlen, approximate=True)
+            await pipe.execute()
+
+    async def pop(self, count: int, timeout: float) -> List[dict]:
+        """
+        Take up to count jobs, reclaiming stuck ones before reading new ones.
+        
+        Args:
+            count (int): Most jobs wanted
+            timeout (float): Seconds to wait for a job; 0 or less
+                returns immediately
+
+        Returns:
+            List[dict]: Decoded jobs, each with the 'queue_id' of its
+                stream entry and reclaimed ones marked 'redelivered',
+                empty on timeout
+        """
+        await self._ensure_group()
+        jobs = await self._reclaim(count)
+        if jobs:
+            self._in_flight.update(job['queue_id'] for job in jobs)
+            return jobs
+        response = await self.redis.xreadgroup(
+            self.group,
+            self.consumer,
+            {self.stream: '>'},
+            count=count,
+            block=int(timeout * 1000) if timeout > 0 else None
+        )
+        for _, entries in response or []:
+            for entry_id, fields in entries:
+                jobs.append(self._decode(entry_id, fields['job']))
+        self._in_flight.update(job['queue_id'] for job in jobs)
+        return jobs
+
+    async def ack(self, job: dict) -> None:
+        """
+        Mark a job as done so it is never delivered again.
+        
+        Args:
+            job (dict): Job returned by pop()
+        """
+        await self.redis.xack(self.stream, self.group, job['queue_id'])
+        self._in_flight.discard(job['queue_id'])
+
+    async def release(self, job: dict) -> None:
+        """
+        Give up on a failed job without acknowledging it.
+        
+        The job is no longer kept alive, so it is retried once it has
+        been idle for claim_idle_ms, or dead-lettered after max_retries.
+        
+        Args:
+            job (dict): Job returned by pop()
+        """
+        self._in_flight.discard(job['queue_id'])
+
+    async def keep_alive(self) -> None:
+        """Reset the idle time of every job in flight on this consumer."""
+        if not self._in_flight:
+            return
+        # JUSTID leaves the delivery count alone, so this is no retry
+        await self.redis.xclaim(
+            self.stream, self.group, self.consumer,
+            min_idle_time=0, message_ids=list(self._in_flight), justid=True
+        )
+
+    def _decode(self, entry_id: str, payload: str, redelivered: bool = False) -> dict:
+        """Decode a job and record the stream entry it came from."""
+        job = json.loads(payload)
+        job['queue_id'] = entry_id
+        if redelivered:
+            job['redelivered'] = True
+        return job
+
+    async def _ensure_group(self) -> None:
+        """Create the stream and consumer group if they do not exist yet."""
+        if self._group_ready:
+            return
+        try:
+            await self.redis.xgroup_create(self.stream, self.group, id='0', mkstream=True)
+        except ResponseError as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+        self._group_ready = True
+
+    async def _reclaim(self, count: int) -> List[dict]:
+        """Claim jobs other consumers left pending; dead-letter ones retried too often."""
+        # Resume where the last scan stopped, so entries behind a run of
+        # jobs that are not idle yet are reached too
+        response = await self.redis.xautoclaim(
+            self.stream, self.group, self.consumer,
+            min_idle_time=self.claim_idle_ms, start_id=self._claim_cursor, count=count
+        )
+        self._claim_cursor = response[0]
+        # Jobs still in flight here are only claimed when keep_alive() was late
+        claimed = [
+            (entry_id, fields) for entry_id, fields in response[1]
+            if fields and entry_id not in self._in_flight
+        ]
+        if not claimed:
+            return []
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for entry_id, _ in claimed:
+                pipe.xpending_range(self.stream, self.group, min=entry_id, max=entry_id, count=1)
+            pending = await pipe.execute()
+
+        jobs = []
+        for (entry_id, fields), entry in zip(claimed, pending):
+            deliveries = entry[0]['times_delivered'] if entry else 0
+            if deliveries > self.max_retries:
+                async with self.redis.pipeline(transaction=True) as pipe:
+                    pipe.xadd(self.dead_letter, {
+                        'job': fields['job'],
+                        'entry_id': entry_id,
+                        'deliveries': deliveries
+                    })
+                    pipe.xack(self.stream, self.group, entry_id)
+                    await pipe.execute()
+                logger.error(f"❌ Transfer job {entry_id} moved to {self.dead_letter} after {deliveries} deliveries")
+            else:
+                logger.warning(f"⚠️ Reclaimed transfer job {entry_id} (delivery {deliveries})")
+                jobs.append(self._decode(entry_id, fields['job'], redelivered=True))
+        return jobs
+
+TransferQueue = Union[ListTransferQueue, StreamTransferQueue]
+
+def partition_for(source_address: str, partitions: int) -> int:
+    """
+    Get the partition a source wallet's jobs go to.
+    
+    Args:
+        source_address (str): Source wallet address, in any case
+        partitions (int): Number of partitions
+
+    Returns:
+        int: Partition index, the same in every process
+    """
+    return zlib.crc32(source_address.lower().encode()) % partitions
+
+def transfer_queue(
+    redis: Redis,
+    backend: str = TRANSFER_QUEUE_BACKEND,
+    partition: Optional[int] = None
+) -> TransferQueue:
+    """
+    Create the configured transfer queue.
+    
+    Args:
+        redis (Redis): Client with decoded responses
+        backend (str): "list" or "stream"
+        partition (Optional[int]): Partition to address, None for the
+            unpartitioned queue
+
+    Returns:
+        TransferQueue: Queue for the backend
+
+    Raises:
+        ValueError: If the backend is unknown
+    """
+    suffix = '' if partition is None else f':{partition}'
+    if backend == 'list':
+        return ListTransferQueue(redis, TRANSFER_LIST + suffix)
+    if backend == 'stream':
+        return StreamTransferQueue(
+            redis,
+            TRANSFER_STREAM + suffix,
+            dead_letter=DEAD_LETTER_STREAM + suffix
+        )
+    raise ValueError(f"Unknown transfer queue backend: {backend}")
+
+class PartitionedTransferQueue:
+    """
+    Transfer queue split into partitions by source wallet.
+    
+    With a single partition this is the plain, unsuffixed queue, so
+    existing deployments keep their keys.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        partitions: int = TRANSFER_PARTITIONS,
+        backend: str = TRANSFER_QUEUE_BACKEND
+    ) -> None:
+        """
+        Initialize the queue.
+        
+        Args:
+            redis (Redis): Client with decoded responses
+            partitions (int): Number of partitions
+            backend (str): "list" or "stream"
+        """
+        if partitions == 1:
+            self.partitions = [transfer_queue(redis, backend)]
+        else:
+            self.partitions = [
+                transfer_queue(redis, backend, partition) for partition in range(partitions)
+            ]
+
+    async def push(self, payloads: List[str]) -> None:
+        """
+        Append jobs to the partitions of their source wallets.
+        
+        Args:
+            payloads (List[str]): JSON-encoded jobs
+        """
+        if len(self.partitions) == 1:
+            await self.partitions[0].push(payloads)
+            return
+        grouped: dict = {}
+        for payload in payloads:
+            partition = partition_for(json.loads(payload)['source_address'], len(self.partitions))
+            grouped.setdefault(partition, []).append(payload)
+        for partition, group in grouped.items():
+            await self.partitions[partition].push(group)
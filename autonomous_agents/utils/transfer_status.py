@@ -0,0 +1,156 @@
+"""
+Push delivery of transfer statuses to agents.
+
+The transfer processor appends every status to a per-agent Redis
+stream. A TransferStatusFeed runs one task per agent that blocks on
+XREAD and turns new entries into TRANSACTION messages in the agent's
+inbox, so statuses are never overwritten and arrive as soon as they
+are written.
+"""
+
+import asyncio
+import json
+from typing import Any, Dict, Optional
+from redis.asyncio import Redis
+from ..config import REDIS_URL
+from ..core.message import Message, MessageType
+from ..utils.logger import logger
+
+STATUS_FIELD = 'status'
+
+# Approximate cap on each agent's status stream
+STATUS_STREAM_MAXLEN = 10_000
+
+def status_stream(agent_name: str) -> str:
+    """
+    Get the name of the stream holding an agent's transfer statuses.
+    
+    Args:
+        agent_name (str): Name of the agent
+
+    Returns:
+        str: Stream key
+    """
+    return f"transfer_status:{agent_name}"
+
+class TransferStatusFeed:
+    """
+    Delivers transfer statuses from Redis to agent inboxes.
+    
+    Entries are deleted from the stream once they are in the inbox, so
+    a restarted agent gets the statuses written while it was down but
+    none twice. Entries that cannot be decoded are logged and deleted.
+    """
+
+    _shared: Optional['TransferStatusFeed'] = None
+
+    def __init__(
+        self,
+        redis: Optional[Redis] = None,
+        block_ms: int = 1000,
+        batch_size: int = 100
+    ) -> None:
+        """
+        Initialize the feed.
+        
+        Args:
+            redis (Optional[Redis]): Client with decoded responses; a
+                client for REDIS_URL is created if omitted
+            block_ms (int): Longest single blocking XREAD
+            batch_size (int): Most statuses read per XREAD
+        """
+        self.redis = redis
+        self._owns_client = redis is None
+        self.block_ms = block_ms
+        self.batch_size = batch_size
+        self.inboxes: Dict[str, Any] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    @classmethod
+    def shared(cls) -> 'TransferStatusFeed':
+        """
+        Get the feed shared by every agent in the process.
+
+        Returns:
+            TransferStatusFeed: Shared feed
+        """
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def watch(self, agent_name: str, inbox: Any) -> None:
+        """
+        Send an agent's transfer statuses to its inbox.
+        
+        A watch started inside a running event loop starts delivering
+        at once; otherwise delivery starts with start().
+        
+        Args:
+            agent_name (str): Name the processor publishes statuses under
+            inbox (Any): Message box receiving the statuses
+        """
+        self.inboxes[agent_name] = inbox
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self.start()
+
+    def start(self) -> None:
+        """Start a delivery task for every watched agent without one."""
+        for agent_name, inbox in self.inboxes.items():
+            task = self._tasks.get(agent_name)
+            if task is None or task.done():
+                self._tasks[agent_name] = asyncio.create_task(self._follow(agent_name, inbox))
+
+    async def stop(self) -> None:
+        """Stop delivering and close an owned client."""
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks.clear()
+        if self._owns_client and self.redis is not None:
+            await self.redis.close()
+            self.redis = None
+
+    async def _follow(self, agent_name: str, inbox: Any) -> None:
+        """Move statuses from an agent's stream into its inbox as they arrive."""
+        stream = status_stream(agent_name)
+        last_id = "0-0"
+        while True:
+            try:
+                response = await self._client().xread(
+                    {stream: last_id},
+                    count=self.batch_size,
+                    block=self.block_ms
+                )
+                for _, entries in response or ():
+                    delivered = []
+                    try:
+                        for entry_id, fields in entries:
+                            try:
+                                content = json.loads(fields[STATUS_FIELD])
+                            except (KeyError, TypeError, ValueError) as e:
+                                # Dropped, or it would be re-read forever and block later statuses
+                                logger.error(f"❌ Dropping malformed transfer status {entry_id} for {agent_name}: {str(e)}")
+                            else:
+                                await inbox.put(Message(
+                                    type=MessageType.TRANSACTION,
+                                    content=content,
+                                    sender="TransferProcessor"
+                                ))
+                            delivered.append(entry_id)
+                            last_id = entry_id
+                    finally:
+                        # Delete what reached the inbox even if a put failed or was cancelled
+                        if delivered:
+                            await self._client().xdel(stream, *delivered)
+            except Exception as e:
+                logger.error(f"❌ Failed to read transfer statuses for {agent_name}: {str(e)}")
+                await asyncio.sleep(1)
+
+    def _client(self) -> Redis:
+        """Get the Redis client, connecting on first use."""
+        if self.redis is None:
+            self.redis = Redis.from_url(REDIS_URL, decode_responses=True)
+        return self.redis
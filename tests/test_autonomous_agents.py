@@ -1,6 +1,8 @@
 from autonomous_agents.behaviors.random_message import RandomMessageBehavior
+from autonomous_agents.chain.providers import ProviderPool
 from autonomous_agents.core.agent import AutonomousAgent
 from autonomous_agents.core.message import Message, MessageType
+from autonomous_agents.handlers.base import MessageHandler
 from autonomous_agents.handlers.crypto import CryptoTransferHandler
 from autonomous_agents.handlers.hello import HelloMessageHandler
 import pytest
@@ -15,13 +17,22 @@ from dotenv import load_dotenv
 load_dotenv()
 # Test Configuration
 
-TEST_TOKEN_ADDRESS = os.getenv("TEST_TOKEN_ADDRESS")
-TEST_WALLET1_ADDRESS = os.getenv("TEST_WALLET1_ADDRESS")
-TEST_WALLET2_ADDRESS = os.getenv("TEST_WALLET2_ADDRESS")
-TEST_TARGET_ADDRESS = os.getenv("TEST_TARGET_ADDRESS")
-TEST_PRIVATE_KEY = os.getenv("TEST_PRIVATE_KEY")
+# Placeholders keep the unit tests runnable without a .env
+TEST_TOKEN_ADDRESS = os.getenv("TEST_TOKEN_ADDRESS", "0x" + "11" * 20)
+TEST_WALLET1_ADDRESS = os.getenv("TEST_WALLET1_ADDRESS", "0x" + "22" * 20)
+TEST_WALLET2_ADDRESS = os.getenv("TEST_WALLET2_ADDRESS", "0x" + "33" * 20)
+TEST_TARGET_ADDRESS = os.getenv("TEST_TARGET_ADDRESS", "0x" + "44" * 20)
+TEST_PRIVATE_KEY = os.getenv("TEST_PRIVATE_KEY", "0x" + "55" * 32)
 RPC_URL = os.getenv("RPC_URL")
 # Fixtures
+@pytest.fixture(autouse=True)
+def contract_registry(tmp_path, monkeypatch):
+    """Give every test a fresh contract registry with its own metadata file"""
+    from autonomous_agents.chain.contracts import ContractRegistry
+    registry = ContractRegistry(str(tmp_path / "token_metadata.json"))
+    monkeypatch.setattr(ContractRegistry, "_shared", registry)
+    return registry
+
 @pytest.fixture
 def web3_mock():
     with patch('web3.Web3') as mock:
@@ -47,6 +58,227 @@ def web3_mock():
         mock.eth.contract.return_value = contract_mock
         yield mock
 
+class FakePipeline:
+    """Pipeline that queues commands and runs them through a Redis stand-in's methods"""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self):
+        return [await getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+def pipelined(redis):
+    """Let a mocked Redis run pipelined commands through its own methods"""
+    redis.pipeline = Mock(side_effect=lambda transaction=False: FakePipeline(redis))
+    return redis
+
+class FakeRedis:
+    """In-process stand-in for the Redis commands used by inboxes, transfer queues and leases"""
+
+    def __init__(self, decode_responses=True):
+        self.decode_responses = decode_responses
+        self.streams = {}
+        self.groups = {}
+        self.hashes = {}
+        self.keys = {}
+        self.zsets = {}
+        self.lists = {}
+        self.now = 0  # Milliseconds of idle time seen by consumer groups
+        self.round_trips = 0
+        self.fail_writes = 0
+        self._sequence = {}
+
+    def _reply(self, value):
+        """Encode a value the way a client with or without decoded responses returns it"""
+        if self.decode_responses:
+            return value.decode() if isinstance(value, bytes) else str(value)
+        return value if isinstance(value, bytes) else str(value).encode()
+
+    def pipeline(self, transaction=False):
+        redis = self
+
+        class Pipeline(FakePipeline):
+            async def execute(self):
+                redis.round_trips += 1
+                if redis.fail_writes:
+                    redis.fail_writes -= 1
+                    raise ConnectionError("connection reset")
+                return await super().execute()
+
+        return Pipeline(self)
+
+    async def xadd(self, stream, fields, maxlen=None, approximate=True):
+        sequence = self._sequence[stream] = self._sequence.get(stream, 0) + 1
+        entry_id = self._reply(f"{sequence}-0")
+        self.streams.setdefault(stream, []).append(
+            (entry_id, {self._reply(key): self._reply(value) for key, value in fields.items()})
+        )
+        return entry_id
+
+    async def xread(self, streams, count=None, block=None):
+        self.round_trips += 1
+        (stream, last_id), = streams.items()
+        entries = [e for e in self.streams.get(stream, []) if _stream_id(e[0]) > _stream_id(last_id)]
+        if not entries:
+            await asyncio.sleep((block or 0) / 1000)
+        return [[self._reply(stream), entries[:count]]] if entries else []
+
+    async def xdel(self, stream, *ids):
+        entries = self.streams.get(stream, [])
+        self.streams[stream] = [e for e in entries if e[0] not in ids]
+        return len(entries) - len(self.streams[stream])
+
+    async def xgroup_create(self, stream, group, id='$', mkstream=False):
+        from redis.exceptions import ResponseError
+        if (stream, group) in self.groups:
+            raise ResponseError("BUSYGROUP Consumer Group name already exists")
+        self.streams.setdefault(stream, [])
+        self.groups[(stream, group)] = {'delivered': 0, 'pending': {}}
+
+    async def xreadgroup(self, group, consumer, streams, count=None, block=None):
+        (stream, _), = streams.items()
+        state = self.groups[(stream, group)]
+        entries = self.streams[stream][state['delivered']:state['delivered'] + count]
+        state['delivered'] += len(entries)
+        for entry_id, _ in entries:
+            state['pending'][entry_id] = {'time': self.now, 'times_delivered': 1}
+        return [[stream, entries]] if entries else []
+
+    async def xautoclaim(self, stream, group, consumer, min_idle_time, start_id='0-0', count=None):
+        state = self.groups[(stream, group)]
+        fields = dict(self.streams[stream])
+        scan = sorted(
+            (entry_id for entry_id in state['pending'] if _stream_id(entry_id) >= _stream_id(start_id)),
+            key=_stream_id
+        )
+        claimed = []
+        # Like Redis, look at no more than count * 10 pending entries per call
+        for position, entry_id in enumerate(scan[:count * 10]):
+            if len(claimed) == count:
+                return [entry_id, claimed, []]
+            pending = state['pending'][entry_id]
+            if self.now - pending['time'] >= min_idle_time:
+                pending['time'] = self.now
+                pending['times_delivered'] += 1
+                claimed.append((entry_id, fields[entry_id]))
+        cursor = scan[count * 10] if len(scan) > count * 10 else '0-0'
+        return [cursor, claimed, []]
+
+    async def xclaim(self, stream, group, consumer, min_idle_time, message_ids, justid=False):
+        pending = self.groups[(stream, group)]['pending']
+        for entry_id in message_ids:
+            if entry_id in pending:
+                pending[entry_id]['time'] = self.now
+        return message_ids
+
+    async def xpending_range(self, stream, group, min, max, count):
+        pending = self.groups[(stream, group)]['pending'].get(min)
+        return [{'message_id': min, 'times_delivered': pending['times_delivered']}] if pending else []
+
+    async def xack(self, stream, group, *ids):
+        pending = self.groups[(stream, group)]['pending']
+        return sum(pending.pop(entry_id, None) is not None for entry_id in ids)
+
+    async def hget(self, key, field):
+        return self.hashes.get(key, {}).get(field)
+
+    async def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[field] = self._reply(value)
+
+    async def set(self, key, value, nx=False, px=None, ex=None):
+        if nx and key in self.keys:
+            return None
+        self.keys[key] = value
+        return True
+
+    async def get(self, key):
+        return self.keys.get(key)
+
+    async def eval(self, script, numkeys, *keys_and_args):
+        from autonomous_agents.chain import nonce
+        keys, args = keys_and_args[:numkeys], keys_and_args[numkeys:]
+        if script == nonce._RESERVE_NONCE:
+            counter, gaps, lease = keys
+            await self.set(lease, 1, px=args[0])
+            gap = await self.zpopmin(gaps)
+            return int(gap[0][1]) if gap else await self.incr(counter) - 1
+        if script == nonce._SYNC_NONCE:
+            counter, gaps, lease = keys
+            stored, pending = self.keys.get(counter), int(args[0])
+            if stored is None or int(stored) < pending:
+                result = 1
+            elif int(stored) > pending and lease not in self.keys:
+                result = 2
+            else:
+                return 0
+            self.keys[counter] = pending
+            self.zsets.pop(gaps, None)
+            return result
+        key, member = keys[0], args[0]
+        if self.keys.get(key) != member:
+            return 0
+        if 'del' in script:
+            del self.keys[key]
+        return 1
+
+    async def incr(self, key):
+        self.keys[key] = int(self.keys.get(key, 0)) + 1
+        return self.keys[key]
+
+    async def exists(self, *keys):
+        return sum(key in self.keys for key in keys)
+
+    async def delete(self, *keys):
+        return sum(
+            store.pop(key, None) is not None
+            for key in keys for store in (self.keys, self.hashes, self.zsets, self.lists)
+        )
+
+    async def zpopmin(self, key):
+        zset = self.zsets.get(key)
+        if not zset:
+            return []
+        member = min(zset, key=zset.get)
+        return [(member, zset.pop(member))]
+
+    async def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    async def zremrangebyscore(self, key, low, high):
+        zset = self.zsets.setdefault(key, {})
+        for member in [m for m, score in zset.items() if score <= high]:
+            del zset[member]
+
+    async def zrange(self, key, start, end):
+        return sorted(self.zsets.get(key, {}), key=self.zsets[key].get)
+
+    async def zrem(self, key, member):
+        self.zsets.get(key, {}).pop(member, None)
+
+    async def lpush(self, key, *values):
+        self.lists.setdefault(key, []).extend(values)
+
+def _stream_id(entry_id):
+    """Sort key of a stream entry ID given as str or bytes"""
+    if isinstance(entry_id, bytes):
+        entry_id = entry_id.decode()
+    return tuple(map(int, entry_id.split("-")))
+
+@pytest.fixture
+def fake_redis():
+    """In-process Redis stand-in with decoded responses"""
+    return FakeRedis()
+
 @pytest.fixture
 def agent():
     return AutonomousAgent("TestAgent")
@@ -93,7 +325,7 @@ async def test_hello_message_handler():
     assert can_handle is False
 
 @pytest.mark.asyncio
-async def test_crypto_transfer_handler(web3_mock):
+async def test_crypto_transfer_handler(web3_mock, fake_redis):
     """Unit test for CryptoTransferHandler"""
     handler = CryptoTransferHandler(
         web3_mock,
@@ -103,6 +335,7 @@ async def test_crypto_transfer_handler(web3_mock):
         TEST_PRIVATE_KEY,
         "Agent1"
     )
+    handler.redis = fake_redis
     agent = AutonomousAgent("TestAgent")
 
     # Test with crypto message
@@ -119,6 +352,7 @@ async def test_crypto_transfer_handler(web3_mock):
         web3_mock.eth.wait_for_transaction_receipt.return_value = {'status': 1, 'gasUsed': 100000}
 
         await handler.handle(crypto_message, agent)
+    assert len(fake_redis.lists['crypto_transfers']) == 1
 
 
 def test_agent_initialization():
@@ -131,3 +365,1361 @@ def test_agent_initialization():
     assert agent.handler_registry is not None
     assert agent.behavior_registry is not None
     assert not agent.running
+
+@pytest.mark.asyncio
+async def test_agent_processes_messages_without_polling():
+    """Agent wakes on message arrival and drains its inbox"""
+    agent = AutonomousAgent("TestAgent")
+    received = []
+
+    class RecordingHandler(MessageHandler):
+        def supported_message_types(self):
+            return [MessageType.TEXT]
+
+        async def can_handle(self, message):
+            return True
+
+        async def handle(self, message, agent):
+            received.append(message.content)
+
+    agent.register_handler(RecordingHandler())
+    task = asyncio.create_task(agent.run())
+    await asyncio.sleep(0)
+
+    for i in range(3):
+        await agent.inbox.put(Message(type=MessageType.TEXT, content=f"hello {i}"))
+    await asyncio.sleep(0.01)
+    assert received == ["hello 0", "hello 1", "hello 2"]
+
+    # With no behaviors the agent blocks until stopped
+    agent.stop()
+    await asyncio.wait_for(task, timeout=1.0)
+
+@pytest.mark.asyncio
+async def test_message_box_capacity_and_batches():
+    """Bounded MessageBox fails fast or applies backpressure"""
+    from autonomous_agents.core.message import MessageBox, OverflowPolicy
+
+    strict = MessageBox(capacity=2, overflow=OverflowPolicy.FAIL)
+    await strict.put_many([Message(MessageType.TEXT, "a"), Message(MessageType.TEXT, "b")])
+    with pytest.raises(asyncio.QueueFull):
+        await strict.put(Message(MessageType.TEXT, "c"))
+    assert [m.content for m in await strict.get_many(5)] == ["a", "b"]
+    assert await strict.get() is None
+
+    box = MessageBox(capacity=1)
+    await box.put(Message(MessageType.TEXT, "first"))
+    blocked = asyncio.create_task(box.put(Message(MessageType.TEXT, "second")))
+    await asyncio.sleep(0)
+    assert not blocked.done()
+    assert (await box.get()).content == "first"
+    await asyncio.wait_for(blocked, timeout=1.0)
+    assert await box.wait(timeout=0.1) is True
+    assert (await box.get()).content == "second"
+    assert await box.wait(timeout=0.01) is False
+
+@pytest.mark.asyncio
+async def test_behavior_registry_wakes_only_due_behaviors():
+    """Scheduled behaviors are checked only when their due time passes"""
+    from autonomous_agents.behaviors.base import IntervalBehavior
+    from autonomous_agents.core.registry import BehaviorRegistry
+    import time
+
+    checks = []
+
+    class CountingBehavior(IntervalBehavior):
+        async def should_act(self):
+            checks.append(self)
+            return await super().should_act()
+
+        async def act(self, agent):
+            self.last_execution = time.time()
+
+    registry = BehaviorRegistry()
+    idle = [CountingBehavior(interval=60) for _ in range(1000)]
+    for behavior in idle:
+        behavior.last_execution = time.time()
+        registry.register_behavior(behavior)
+    due = CountingBehavior(interval=60)
+    registry.register_behavior(due)
+
+    await registry.run_behaviors(AutonomousAgent("TestAgent"))
+    assert checks == [due]
+    assert registry.next_due(poll_interval=0.1) > time.time() + 59
+
+@pytest.mark.asyncio
+async def test_concurrent_dispatch_isolates_slow_and_failing_handlers():
+    """Concurrent dispatch keeps slow or failing handlers from stalling others"""
+    from autonomous_agents.core.registry import DispatchMode, HandlerRegistry
+
+    handled = []
+
+    class SlowHandler(HelloMessageHandler):
+        timeout = 0.05
+
+        async def handle(self, message, agent):
+            await asyncio.sleep(10)
+
+    class FailingHandler(HelloMessageHandler):
+        async def handle(self, message, agent):
+            raise RuntimeError("boom")
+
+    class OrderedHandler(HelloMessageHandler):
+        max_concurrency = 2
+
+        async def handle(self, message, agent):
+            # Later messages finish faster, so ordering must come from the registry
+            await asyncio.sleep(0.01 if message.content == "hello 0" else 0)
+            handled.append(message.content)
+
+    registry = HandlerRegistry(DispatchMode.CONCURRENT)
+    for handler in (SlowHandler(), FailingHandler(), OrderedHandler()):
+        registry.register_handler(handler)
+
+    agent = AutonomousAgent("TestAgent")
+    for i in range(3):
+        await registry.process_message(
+            Message(MessageType.TEXT, f"hello {i}", sender="Peer"), agent
+        )
+    await asyncio.wait_for(registry.join(), timeout=1.0)
+    assert handled == ["hello 0", "hello 1", "hello 2"]
+
+@pytest.mark.asyncio
+async def test_concurrent_dispatch_pushes_back_on_saturated_handler():
+    """A handler at its concurrency limit holds up dispatch instead of piling up tasks"""
+    from autonomous_agents.core.registry import DispatchMode, HandlerRegistry
+
+    release = asyncio.Event()
+
+    class StuckHandler(HelloMessageHandler):
+        max_concurrency = 4
+
+        async def handle(self, message, agent):
+            await release.wait()
+
+    registry = HandlerRegistry(DispatchMode.CONCURRENT, preserve_sender_order=False)
+    registry.register_handler(StuckHandler())
+    agent = AutonomousAgent("TestAgent")
+    for i in range(4):
+        await registry.process_message(Message(MessageType.TEXT, f"hello {i}"), agent)
+
+    blocked = asyncio.create_task(
+        registry.process_message(Message(MessageType.TEXT, "hello 4"), agent)
+    )
+    await asyncio.sleep(0.05)
+    assert not blocked.done()
+    assert len(registry._tasks) == 4
+
+    release.set()
+    await asyncio.wait_for(blocked, timeout=1.0)
+    await asyncio.wait_for(registry.join(), timeout=1.0)
+
+@pytest.mark.asyncio
+async def test_concurrent_dispatch_scales_timeout_with_batch():
+    """A batch of fast messages is not cancelled for taking longer than one message may"""
+    from autonomous_agents.core.registry import DispatchMode, HandlerRegistry
+
+    handled = []
+
+    class SteadyHandler(HelloMessageHandler):
+        timeout = 0.05
+
+        async def handle(self, message, agent):
+            await asyncio.sleep(0.03)
+            handled.append(message.content)
+
+    registry = HandlerRegistry(DispatchMode.CONCURRENT)
+    registry.register_handler(SteadyHandler())
+    messages = [Message(MessageType.TEXT, f"hello {i}", sender="Peer") for i in range(3)]
+    await registry.process_batch(messages, AutonomousAgent("TestAgent"))
+    await asyncio.wait_for(registry.join(), timeout=1.0)
+    assert handled == ["hello 0", "hello 1", "hello 2"]
+
+@pytest.mark.asyncio
+async def test_concurrent_dispatch_frees_slots_of_cancelled_tasks():
+    """A handler task cancelled before it starts still gives back its slots"""
+    from autonomous_agents.core.registry import DispatchMode, HandlerRegistry
+
+    class LimitedHandler(HelloMessageHandler):
+        max_concurrency = 1
+
+    handler = LimitedHandler()
+    registry = HandlerRegistry(DispatchMode.CONCURRENT, max_in_flight=1)
+    registry.register_handler(handler)
+    agent = AutonomousAgent("TestAgent")
+    await registry.process_message(Message(MessageType.TEXT, "hello 0"), agent)
+    for task in registry._tasks:
+        task.cancel()
+    await asyncio.wait_for(registry.join(), timeout=1.0)
+
+    assert not registry._semaphores[handler].locked()
+    assert not registry._in_flight.locked()
+
+@pytest.mark.asyncio
+async def test_hello_handler_batch_uses_overridden_handle():
+    """A subclass overriding handle() sees every message of a batch"""
+    handled = []
+
+    class RecordingHandler(HelloMessageHandler):
+        async def handle(self, message, agent):
+            handled.append(message.content)
+
+    messages = [Message(MessageType.TEXT, f"hello {i}") for i in range(3)]
+    await RecordingHandler().handle_batch(messages, AutonomousAgent("TestAgent"))
+    assert handled == ["hello 0", "hello 1", "hello 2"]
+
+@pytest.mark.asyncio
+async def test_crypto_transfer_handler_batches_redis_push(web3_mock):
+    """A batch of crypto messages is queued with a single LPUSH"""
+    from unittest.mock import AsyncMock
+
+    handler = CryptoTransferHandler(
+        web3_mock,
+        "0x" + "11" * 20,
+        "0x" + "22" * 20,
+        "0x" + "33" * 20,
+        "0x" + "44" * 32,
+        "Agent1"
+    )
+    handler.redis = AsyncMock()
+    handler.redis.get.return_value = None
+    messages = [Message(MessageType.TEXT, f"crypto {i}") for i in range(5)]
+
+    await handler.handle_batch(messages, AutonomousAgent("TestAgent"))
+
+    handler.redis.lpush.assert_awaited_once()
+    key, *payloads = handler.redis.lpush.await_args.args
+    assert key == 'crypto_transfers'
+    assert len(payloads) == 5
+
+def test_content_matcher_finds_all_declared_handlers():
+    """Compiled matcher reports every handler whose predicates match"""
+    from autonomous_agents.core.matcher import ContentMatcher
+
+    def make_handler(**predicates):
+        return type("KeywordHandler", (HelloMessageHandler,), predicates)()
+
+    hello = HelloMessageHandler()
+    hell = make_handler(match_keywords=("hell",))
+    ocean = make_handler(match_keywords=("ocean", "sea"))
+    greeting = make_handler(match_keywords=(), match_prefixes=("hi", "hey"))
+    numbers = make_handler(match_keywords=(), match_patterns=(r"\d{3}",))
+    plain = make_handler(match_keywords=())
+
+    matcher = ContentMatcher([hello, hell, ocean, greeting, numbers, plain])
+    assert plain not in matcher.handlers
+    assert matcher.match("Hello Ocean") == {hello, hell, ocean}
+    assert matcher.match("hey 123") == {greeting, numbers}
+    assert matcher.match("moon sky") == frozenset()
+    assert matcher.match(42) == frozenset()
+    matcher.match("Hello Ocean")
+    assert matcher._cached_scan.cache_info().hits == 1
+
+def test_message_is_slotted_and_round_trips_through_bytes():
+    """Messages have no __dict__ and survive the binary codec"""
+    message = Message(MessageType.TEXT, "hello moon", sender="Agent1", correlation_id="abc")
+    assert not hasattr(message, "__dict__")
+    assert abs(message.timestamp - message.timestamp_ns / 1e9) < 1e-6
+
+    decoded = Message.from_bytes(memoryview(message.to_bytes()))
+    assert decoded == message
+    assert decoded.type is MessageType.TEXT
+
+    # Callers from before timestamp_ns pass float seconds
+    legacy = Message(MessageType.TEXT, "hi", 1700000000.5, "Agent1")
+    assert legacy.timestamp_ns == 1_700_000_000_500_000_000 and legacy.sender == "Agent1"
+    assert Message(MessageType.TEXT, "hi", timestamp=1.25).timestamp == 1.25
+
+    payload = Message(MessageType.BALANCE_CHECK, {"balance": 5})
+    assert Message.from_bytes(payload.to_bytes()) == payload
+
+def _configure_nothing(agent):
+    """Picklable no-op agent configuration for topology tests"""
+
+@pytest.mark.asyncio
+async def test_router_delivers_between_topology_agents():
+    """Agents built from a topology reach their peers through the router"""
+    from autonomous_agents.core.runtime import AgentSpec, Router, build_agents, validate_topology
+
+    specs = [
+        AgentSpec("A", _configure_nothing, peers=["B", "C"]),
+        AgentSpec("B", _configure_nothing),
+        AgentSpec("C", _configure_nothing),
+    ]
+    agents = {agent.name: agent for agent in build_agents(specs, Router())}
+
+    sent = Message(MessageType.TEXT, "hello peers")
+    await agents["A"].outbox.put(sent)
+    received = [await agents[name].inbox.get() for name in ("B", "C")]
+    for message in received:
+        assert message.content == "hello peers"
+        assert message.sender == "A"
+        assert message.timestamp_ns == sent.timestamp_ns
+    # Each peer gets its own copy and the caller's message is left alone
+    assert received[0] is not received[1] and all(m is not sent for m in received)
+    assert sent.sender is None
+
+    with pytest.raises(ValueError):
+        validate_topology([AgentSpec("A", _configure_nothing, peers=["Z"])])
+
+@pytest.mark.asyncio
+async def test_shared_memory_box_wraps_and_signals():
+    """Shared-memory ring keeps frames intact across wrap-around"""
+    from autonomous_agents.core.message import OverflowPolicy
+    from autonomous_agents.core.shm_box import SharedMemoryMessageBox
+
+    box = SharedMemoryMessageBox(capacity=128, overflow=OverflowPolicy.FAIL)
+    try:
+        assert await box.wait(timeout=0.01) is False
+        for i in range(20):
+            await box.put(Message(MessageType.TEXT, f"hello {i}", sender="A"))
+            received = await box.get()
+            assert received.content == f"hello {i}"
+            assert received.sender == "A"
+        assert await box.get() is None
+
+        with pytest.raises(asyncio.QueueFull):
+            for i in range(10):
+                await box.put(Message(MessageType.TEXT, "x" * 20))
+        assert [m.content for m in await box.get_many(10)] == ["x" * 20] * i
+
+        waiter = asyncio.create_task(box.wait(timeout=1.0))
+        await asyncio.sleep(0.01)
+        await box.put(Message(MessageType.TEXT, "wake"))
+        assert await waiter is True
+    finally:
+        box.close()
+
+@pytest.mark.asyncio
+async def test_shared_memory_box_takes_large_frame_after_wrap():
+    """An empty ring accepts a frame that only fits after wrapping to its start"""
+    from autonomous_agents.core.message import OverflowPolicy
+    from autonomous_agents.core.shm_box import SharedMemoryMessageBox
+
+    box = SharedMemoryMessageBox(capacity=256, overflow=OverflowPolicy.FAIL)
+    try:
+        await box.put(Message(MessageType.TEXT, "s" * 40))
+        assert (await box.get()).content == "s" * 40
+        await box.put(Message(MessageType.TEXT, "l" * 180))
+        assert (await box.get()).content == "l" * 180
+        await box.put(Message(MessageType.TEXT, "after"))
+        assert (await box.get()).content == "after"
+        assert await box.get() is None
+    finally:
+        box.close()
+
+@pytest.mark.asyncio
+async def test_redis_stream_box_batches_and_resumes_from_offset(fake_redis):
+    """Redis stream inbox writes in batches and resumes after a restart"""
+    from autonomous_agents.core.redis_box import RedisStreamMessageBox
+
+    redis = fake_redis
+    # Inboxes carry binary frames, so their client does not decode replies
+    redis.decode_responses = False
+    sender = RedisStreamMessageBox("agent_inbox:B", redis=redis)
+    await sender.put_many([Message(MessageType.TEXT, f"hello {i}") for i in range(3)])
+    assert redis.round_trips == 1
+
+    inbox = RedisStreamMessageBox("agent_inbox:B", consumer="B", redis=redis)
+    assert await inbox.wait(timeout=0.1) is True
+    assert [m.content for m in await inbox.get_many(10)] == ["hello 0", "hello 1", "hello 2"]
+    # Handed out but not yet committed as processed: a restart gets them again
+    crashed = RedisStreamMessageBox("agent_inbox:B", consumer="B", redis=redis)
+    assert len(await crashed.get_many(10)) == 3
+    await inbox.commit()
+
+    await sender.put(Message(MessageType.TEXT, "after restart"))
+    await sender.flush()
+    restarted = RedisStreamMessageBox("agent_inbox:B", consumer="B", redis=redis)
+    assert [m.content for m in await restarted.get_many(10)] == ["after restart"]
+
+    # A failed background write keeps its batch, ahead of newer messages
+    redis.fail_writes = 1
+    await sender.put(Message(MessageType.TEXT, "retried"))
+    await asyncio.sleep(0.05)
+    await sender.put_many([Message(MessageType.TEXT, "newer")])
+    assert [m.content for m in await restarted.get_many(10)] == ["retried", "newer"]
+
+    # An agent commits its inbox offset once it has dispatched a batch
+    agent = AutonomousAgent("B")
+    agent.inbox = RedisStreamMessageBox("agent_inbox:B", consumer="B", redis=redis)
+    assert await agent.drain_inbox() == 3
+    assert redis.hashes["agent_inbox:B:offsets"]["B"] == redis.streams["agent_inbox:B"][-1][0]
+
+@pytest.mark.asyncio
+async def test_balance_checks_are_batched_off_the_event_loop(web3_mock):
+    """Balance checks share one Multicall3 call run on the chain client's pool"""
+    import time
+    from autonomous_agents.behaviors.token_balance import TokenBalanceCheckBehavior
+
+    def slow_aggregate(block_identifier):
+        time.sleep(0.2)
+        calls = contract.functions.aggregate3.call_args.args[0]
+        return [(True, (7 * 10 ** 18).to_bytes(32, "big")) for _ in calls]
+
+    contract = web3_mock.eth.contract.return_value
+    contract.functions.aggregate3.return_value.call.side_effect = slow_aggregate
+    behaviors = [
+        TokenBalanceCheckBehavior(web3_mock, "0x" + "11" * 20, "0x" + f"{i:02x}" * 20)
+        for i in range(5)
+    ]
+    # No RPC happens while constructing behaviors
+    contract.functions.decimals.return_value.call.assert_not_called()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(b.act(AutonomousAgent("TestAgent")) for b in behaviors))
+    assert time.perf_counter() - started < 0.6
+    assert contract.functions.aggregate3.return_value.call.call_count == 1
+    assert len(contract.functions.aggregate3.call_args.args[0]) == 5
+    contract.functions.balanceOf.assert_not_called()
+    assert all(b.decimals == 18 and b.last_execution > 0 for b in behaviors)
+
+@pytest.mark.asyncio
+async def test_balance_oracle_notifies_only_on_change(web3_mock):
+    """Watched balances refresh once per new block and notify on change"""
+    from autonomous_agents.chain.balance_oracle import BalanceOracle
+    from autonomous_agents.core.message import MessageBox
+
+    heads = [100, 100, 101, 102]
+    balances = {100: 5, 101: 5, 102: 9}
+    type(web3_mock.eth).block_number = property(
+        lambda self: heads.pop(0) if len(heads) > 1 else heads[0]
+    )
+    contract = web3_mock.eth.contract.return_value
+    contract.functions.aggregate3.return_value.call.side_effect = (
+        lambda block_identifier: [(True, balances[block_identifier].to_bytes(32, "big"))]
+    )
+
+    oracle = BalanceOracle(web3_mock, poll_interval=0.01)
+    inbox = MessageBox()
+    oracle.watch("0x" + "11" * 20, "0x" + "22" * 20, inbox)
+    await asyncio.sleep(0.1)
+    await oracle.stop()
+
+    # Heads 100, 101 and 102 are read once each; 100 repeats without a call
+    assert contract.functions.aggregate3.return_value.call.call_count == 3
+    notifications = await inbox.get_many(10)
+    assert [m.content['balance'] for m in notifications] == [5, 9]
+    assert notifications[1].content['previous_balance'] == 5
+    assert notifications[1].content['block_number'] == 102
+    assert all(m.type == MessageType.BALANCE_CHECK for m in notifications)
+    assert await oracle.balance_of("0x" + "11" * 20, "0x" + "22" * 20) == 9
+
+@pytest.mark.asyncio
+async def test_balance_oracle_retries_block_after_failed_refresh(web3_mock):
+    """A block whose balances could not be fetched is refreshed again on the next poll"""
+    from autonomous_agents.chain.balance_oracle import BalanceOracle
+    from autonomous_agents.core.message import MessageBox
+
+    web3_mock.eth.block_number = 100
+    aggregate = web3_mock.eth.contract.return_value.functions.aggregate3.return_value.call
+    aggregate.side_effect = [
+        TimeoutError("read timed out"),
+        [(True, (5).to_bytes(32, "big"))],
+    ] + [[(True, (5).to_bytes(32, "big"))]] * 10
+
+    oracle = BalanceOracle(web3_mock, poll_interval=0.01)
+    inbox = MessageBox()
+    oracle.watch("0x" + "11" * 20, "0x" + "22" * 20, inbox)
+    await asyncio.sleep(0.1)
+    await oracle.stop()
+
+    assert aggregate.call_count == 2
+    assert oracle.head == 100
+    assert [m.content['balance'] for m in await inbox.get_many(10)] == [5]
+
+def test_balance_oracle_keeps_multicall_after_transient_errors(web3_mock):
+    """Only a missing or reverting Multicall3 switches the oracle to single balance calls"""
+    from web3.exceptions import BadFunctionCallOutput
+    from autonomous_agents.chain.balance_oracle import BalanceOracle
+
+    contract = web3_mock.eth.contract.return_value
+    aggregate = contract.functions.aggregate3.return_value.call
+    contract.functions.balanceOf.return_value.call.return_value = 4
+    oracle = BalanceOracle(web3_mock)
+    keys = [("0x" + "11" * 20, "0x" + "22" * 20)]
+
+    aggregate.side_effect = TimeoutError("read timed out")
+    assert oracle._fetch(keys, "latest") == [None]
+    assert oracle._multicall_available
+    contract.functions.balanceOf.assert_not_called()
+
+    aggregate.side_effect = BadFunctionCallOutput("no code at address")
+    assert oracle._fetch(keys, "latest") == [4]
+    assert not oracle._multicall_available
+
+# Transfer logs for token 0x11..11 as returned by eth_getLogs
+TRANSFER_LOG_FIXTURE = [
+    {
+        'blockNumber': 101,
+        'topics': [
+            "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef",
+            "0x000000000000000000000000" + "22" * 20,
+            "0x000000000000000000000000" + "33" * 20,
+        ],
+        'data': "0x" + (3 * 10 ** 18).to_bytes(32, "big").hex(),
+    },
+    {
+        'blockNumber': 104,
+        'topics': [
+            "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef",
+            "0x000000000000000000000000" + "44" * 20,
+            "0x000000000000000000000000" + "22" * 20,
+        ],
+        'data': "0x" + (1 * 10 ** 18).to_bytes(32, "big").hex(),
+    },
+]
+
+@pytest.mark.asyncio
+async def test_transfer_indexer_follows_logs_and_resumes(web3_mock, tmp_path):
+    """The indexer applies recorded Transfer logs and resumes from its saved block"""
+    from autonomous_agents.chain.indexer import TransferIndexer
+
+    head = [102]
+    type(web3_mock.eth).block_number = property(lambda self: head[0])
+    contract = web3_mock.eth.contract.return_value
+    contract.functions.balanceOf.return_value.call.return_value = 10 * 10 ** 18
+    ranges = []
+
+    def get_logs(params):
+        if params['toBlock'] - params['fromBlock'] >= 4:
+            raise ValueError("query returned more than 10000 results")
+        ranges.append((params['fromBlock'], params['toBlock']))
+        return [
+            log for log in TRANSFER_LOG_FIXTURE
+            if params['fromBlock'] <= log['blockNumber'] <= params['toBlock']
+        ]
+
+    web3_mock.eth.get_logs.side_effect = get_logs
+    state_path = str(tmp_path / "index.json")
+    wallet, other = "0x" + "22" * 20, "0x" + "33" * 20
+
+    indexer = TransferIndexer(web3_mock, "0x" + "11" * 20, state_path=state_path, confirmations=2)
+    indexer.watch([wallet])
+    await indexer.sync()
+    # Seeded at the confirmed block without scanning history
+    assert indexer.last_block == 100 and ranges == []
+    assert contract.functions.balanceOf.return_value.call.call_args.kwargs == {'block_identifier': 100}
+
+    head[0] = 107
+    assert await indexer.sync() == 2
+    assert indexer.balance_of(wallet) == 8 * 10 ** 18
+    assert indexer.covers("0x" + "11" * 20, wallet)
+    assert not indexer.covers("0x" + "11" * 20, other)
+    # The provider rejected the 5-block range, so it was split
+    assert ranges == [(101, 102), (103, 104), (105, 105)]
+
+    restarted = TransferIndexer(web3_mock, "0x" + "11" * 20, state_path=state_path, confirmations=2)
+    restarted.watch([wallet])
+    ranges.clear()
+    await restarted.sync()
+    assert restarted.last_block == 105 and ranges == []
+    assert restarted.balance_of(wallet) == 8 * 10 ** 18
+
+    # An address watched while behind is seeded where the sync stopped,
+    # so the logs before that are not applied on top; removed logs are skipped
+    contract.functions.balanceOf.return_value.call.return_value = 1 * 10 ** 18
+    web3_mock.eth.get_logs.side_effect = lambda params: [
+        dict(TRANSFER_LOG_FIXTURE[0], blockNumber=106),
+        dict(TRANSFER_LOG_FIXTURE[1], blockNumber=107, removed=True),
+    ]
+    restarted.watch([other])
+    head[0] = 109
+    assert await restarted.sync() == 1
+    assert contract.functions.balanceOf.return_value.call.call_args.kwargs == {'block_identifier': 107}
+    assert restarted.balance_of(other) == 1 * 10 ** 18
+    assert restarted.balance_of(wallet) == 5 * 10 ** 18
+
+@pytest.mark.asyncio
+async def test_contract_registry_caches_metadata_on_disk(web3_mock, contract_registry):
+    """Contracts are built once and token metadata survives a restart"""
+    import json
+    from autonomous_agents.behaviors.token_balance import TokenBalanceCheckBehavior
+    from autonomous_agents.chain.contracts import ContractRegistry
+
+    web3_mock.provider.endpoint_uri = "https://rpc.example"
+    contract = web3_mock.eth.contract.return_value
+    contract.functions.symbol.return_value.call.return_value = "TKN"
+    token = "0x" + "11" * 20
+
+    behaviors = [
+        TokenBalanceCheckBehavior(web3_mock, token, "0x" + f"{i:02x}" * 20)
+        for i in range(3)
+    ]
+    assert web3_mock.eth.contract.call_count == 2  # Multicall3 and the token
+    metadata = await asyncio.gather(*(
+        contract_registry.metadata(web3_mock, token) for _ in behaviors
+    ))
+    assert metadata[0].decimals == 18 and metadata[0].symbol == "TKN"
+    assert contract.functions.decimals.return_value.call.call_count == 1
+
+    # A new provider URL for the same chain still hits the cache, and no URL is stored
+    web3_mock.provider.endpoint_uri = "https://rpc.example/v3/secret-key"
+    restarted = ContractRegistry(contract_registry.cache_path)
+    assert await restarted.decimals(web3_mock, token) == 18
+    assert contract.functions.decimals.return_value.call.call_count == 1
+    with open(contract_registry.cache_path) as f:
+        assert list(json.load(f)) == [f"1:{token}"]
+
+@pytest.mark.asyncio
+async def test_contract_registry_saves_concurrent_tokens(web3_mock, contract_registry, tmp_path):
+    """Tokens saved at the same time all reach the file, and a failed write is not fatal"""
+    import json
+    from autonomous_agents.chain.contracts import ContractRegistry
+
+    tokens = ["0x" + f"{i:02x}" * 20 for i in range(1, 9)]
+    await asyncio.gather(*(contract_registry.metadata(web3_mock, token) for token in tokens))
+    with open(contract_registry.cache_path) as f:
+        assert sorted(json.load(f)) == sorted(f"1:{token}" for token in tokens)
+    assert [p.name for p in tmp_path.iterdir()] == ["token_metadata.json"]
+
+    # The cache path is a directory, so every write fails
+    unwritable = ContractRegistry(str(tmp_path))
+    assert await unwritable.decimals(web3_mock, tokens[0]) == 18
+
+@pytest.mark.asyncio
+async def test_transfer_processor_pipelines_per_wallet(web3_mock, monkeypatch):
+    """Transfers overlap across workers while each wallet sends in queue order"""
+    import gc
+    import time
+    from unittest.mock import AsyncMock
+    from autonomous_agents.chain.receipts import ReceiptWatcher
+    from autonomous_agents.utils.transfer_prcessor import TransferProcessor
+
+    sent = []
+    head = [6]
+
+    def send_raw_transaction(raw):
+        sent.append(raw)
+        return bytes([raw[1]]) * 32
+
+    def block_number(self):
+        head[0] += 1  # A new block on every check
+        return head[0]
+
+    def get_block_receipts(number):
+        time.sleep(0.2)  # Confirmation takes a while
+        return [
+            {'transactionHash': bytes([job]) * 32, 'status': 1, 'blockNumber': number,
+             'from': source, 'gasUsed': 21000}
+            for source, job, nonce in sent
+        ]
+
+    web3_mock.eth.get_transaction_count.return_value = 0
+    web3_mock.eth.send_raw_transaction.side_effect = send_raw_transaction
+    type(web3_mock.eth).block_number = property(block_number)
+    web3_mock.eth.get_block_receipts.side_effect = get_block_receipts
+    web3_mock.eth.get_block.return_value = {'timestamp': 0}
+    ReceiptWatcher.for_web3(web3_mock).poll_interval = 0.01
+    web3_mock.eth.fee_history.return_value = {'baseFeePerGas': [10, 12], 'reward': [[2]]}
+    contract = web3_mock.eth.contract.return_value
+    contract.functions.transfer.return_value.build_transaction.side_effect = lambda txn: txn
+    contract.functions.transfer.return_value.estimate_gas.return_value = 50000
+
+    processor = TransferProcessor(workers=6)
+    processor.redis = pipelined(AsyncMock())
+    monkeypatch.setattr(processor.providers, "get", lambda url: web3_mock)
+    wallets = ["0x" + "22" * 20, "0x" + "33" * 20]
+    jobs = [
+        {
+            'token_address': "0x" + "11" * 20,
+            'source_address': wallets[job % 2],
+            'target_address': "0x" + "44" * 20,
+            'private_key': "key",
+            'amount': 1,
+            'web3_provider': "http://node",
+            'agent_name': f"Agent{job % 2 + 1}",
+            'job': job,
+        }
+        for job in range(6)
+    ]
+
+    def sign(txn, key):
+        job = next(j for j in jobs if j['source_address'] == txn['from'] and 'signed' not in j)
+        job['signed'] = True
+        return Mock(raw_transaction=(txn['from'], job['job'], txn['nonce']))
+
+    with patch('autonomous_agents.utils.transfer_prcessor.Account') as account:
+        account.sign_transaction.side_effect = sign
+        started = time.perf_counter()
+        await asyncio.gather(*(processor.process_transfer(job) for job in jobs))
+        elapsed = time.perf_counter() - started
+
+    # Confirmations are batched per block instead of waited for one by one
+    assert elapsed < 0.8
+    assert web3_mock.eth.get_block_receipts.call_count <= 3
+    web3_mock.eth.get_transaction_receipt.assert_not_called()
+    for wallet in wallets:
+        assert [(job, nonce) for source, job, nonce in sent if source == wallet] == [
+            (job['job'], index) for index, job in enumerate(j for j in jobs if j['source_address'] == wallet)
+        ]
+    assert processor.redis.xadd.await_count == 6
+    # Statuses finished together share a pipeline round trip
+    assert processor.redis.pipeline.call_count < 6
+    # Per-wallet locks are dropped once no transfer uses them
+    gc.collect()
+    assert len(processor._lanes) == 0
+
+@pytest.mark.asyncio
+async def test_nonce_manager_reserves_locally(web3_mock):
+    """Nonces come from one pending-count read, reuse released gaps and resync on nonce errors"""
+    from autonomous_agents.chain.nonce import NonceManager
+
+    web3_mock.eth.get_transaction_count.return_value = 5
+    nonces = NonceManager(web3_mock)
+    wallet = "0x" + "22" * 20
+
+    assert await asyncio.gather(*(nonces.reserve(wallet) for _ in range(30))) == list(range(5, 35))
+    assert web3_mock.eth.get_transaction_count.call_count == 1
+
+    # A send that never reached the node leaves a gap that is filled first
+    await nonces.send_failed(wallet, 7, ConnectionError("connection reset"))
+    assert await nonces.reserve(wallet) == 7
+    assert await nonces.reserve(wallet) == 35
+
+    # The node rejecting a nonce means the local view is wrong
+    web3_mock.eth.get_transaction_count.return_value = 40
+    await nonces.send_failed(wallet, 35, ValueError("nonce too low"))
+    assert await nonces.reserve(wallet) == 40
+    assert web3_mock.eth.get_transaction_count.call_count == 2
+
+@pytest.mark.asyncio
+async def test_receipt_watcher_only_falls_back_when_block_receipts_are_unsupported(web3_mock):
+    """A rate limit is retried; only a missing eth_getBlockReceipts switches to per-hash polling"""
+    from web3.exceptions import Web3RPCError
+    from autonomous_agents.chain.receipts import ReceiptWatcher
+
+    watcher = ReceiptWatcher(web3_mock)
+    web3_mock.eth.get_block_receipts.side_effect = Web3RPCError(
+        "429", rpc_response={'error': {'code': -32005, 'message': "rate limit exceeded"}}
+    )
+    with pytest.raises(Web3RPCError):
+        await watcher._confirm_blocks(10, 11)
+    assert watcher._block_receipts_supported
+
+    web3_mock.eth.get_block_receipts.side_effect = Web3RPCError(
+        "missing", rpc_response={'error': {'code': -32601, 'message': "method not found"}}
+    )
+    await watcher._confirm_blocks(10, 11)
+    assert not watcher._block_receipts_supported
+
+@pytest.mark.asyncio
+async def test_receipt_watcher_retries_header_of_mined_transaction(web3_mock):
+    """A failed header fetch keeps a mined transaction pending instead of failing it"""
+    from autonomous_agents.chain.receipts import ReceiptWatcher
+
+    tx_hash = b"\x01" * 32
+    receipt = {'transactionHash': tx_hash, 'blockNumber': 11, 'status': 1}
+    web3_mock.eth.block_number = 11
+    web3_mock.eth.get_block_receipts.return_value = [receipt]
+    web3_mock.eth.get_block.side_effect = [ConnectionError("reset"), {'timestamp': 1700000000}]
+
+    watcher = ReceiptWatcher(web3_mock, poll_interval=0.01)
+    watcher.last_block = 10
+    assert await asyncio.wait_for(watcher.wait(tx_hash), timeout=1.0) == (
+        receipt, {'timestamp': 1700000000}
+    )
+    assert web3_mock.eth.get_block_receipts.call_count == 1
+    assert not watcher._pending and not watcher._mined
+
+def test_provider_pool_shares_keep_alive_sessions():
+    """One Web3 instance and session per endpoint, with idle connections dropped"""
+    pool = ProviderPool(pool_maxsize=8, idle_timeout=0.0)
+    web3 = pool.get("http://node-a")
+    assert pool.get("http://node-a") is web3
+    assert pool.get("http://node-b") is not web3
+
+    adapter = pool._sessions["http://node-a"].get_adapter("http://node-a")
+    assert adapter._pool_maxsize == 8
+    with patch.object(adapter.poolmanager, "clear") as clear, \
+            patch("requests.adapters.HTTPAdapter.send", return_value=Mock()):
+        adapter.send(Mock())
+    clear.assert_called_once()
+
+    pool.close()
+    assert pool.get("http://node-a") is not web3
+
+@pytest.mark.asyncio
+async def test_fee_oracle_caches_per_block(web3_mock):
+    """Chain ID is read once, fees once per block, and gas limits follow receipts"""
+    from autonomous_agents.chain.fees import FeeOracle
+    from web3.exceptions import Web3RPCError
+
+    web3_mock.eth.fee_history.return_value = {
+        'baseFeePerGas': [100, 110, 120],
+        'reward': [[3], [5]],
+    }
+    oracle = FeeOracle(web3_mock)
+    assert await asyncio.gather(*(oracle.fee_params() for _ in range(10))) == [
+        {'maxPriorityFeePerGas': 4, 'maxFeePerGas': 244}
+    ] * 10
+    assert web3_mock.eth.fee_history.call_count == 1
+    assert await oracle.chain_id() == 1 and await oracle.chain_id() == 1
+
+    transfer = Mock()
+    transfer.estimate_gas.return_value = 40000
+    assert await oracle.gas_limit("0x" + "11" * 20, "transfer", transfer, "0x" + "22" * 20) == 48000
+    oracle.record_gas_used("0x" + "11" * 20, "transfer", 35000)
+    oracle.record_gas_used("0x" + "11" * 20, "transfer", 51000)
+    # Headroom covers a first-time recipient costing more than any sample
+    assert await oracle.gas_limit("0x" + "11" * 20, "transfer", transfer, "0x" + "22" * 20) == 81200
+    assert transfer.estimate_gas.call_count == 1
+
+    # A rate limit falls back for one refresh; a missing method for good
+    legacy = FeeOracle(web3_mock)
+    web3_mock.eth.fee_history.side_effect = Web3RPCError("429 Too Many Requests")
+    assert await legacy.fee_params() == {'gasPrice': 22000000000}
+    assert legacy._eip1559
+
+    # Chains without fee history use the legacy gas price
+    legacy = FeeOracle(web3_mock)
+    web3_mock.eth.fee_history.side_effect = Web3RPCError("the method eth_feeHistory does not exist")
+    assert await legacy.fee_params() == {'gasPrice': 22000000000}
+    assert not legacy._eip1559
+
+@pytest.mark.asyncio
+async def test_coalesced_transfers_share_one_transaction(web3_mock, monkeypatch):
+    """Jobs to the same target merge into one send and each job gets a status"""
+    from unittest.mock import AsyncMock
+    from autonomous_agents.chain.receipts import ReceiptWatcher
+    from autonomous_agents.utils.transfer_prcessor import TransferProcessor, coalesce_transfers
+
+    def job(agent, target, amount):
+        return {
+            'token_address': "0x" + "11" * 20,
+            'source_address': "0x" + "22" * 20,
+            'target_address': target,
+            'private_key': "key",
+            'amount': amount,
+            'web3_provider': "http://node",
+            'agent_name': agent,
+        }
+
+    jobs = [
+        job("Agent1", "0x" + "44" * 20, 1),
+        job("Agent2", "0x" + "55" * 20, 1),
+        job("Agent3", "0x" + "44" * 20, 2),
+    ]
+    merged = coalesce_transfers(jobs)
+    assert [j['amount'] for j in merged] == [3, 1]
+    assert merged[0]['merged'] == [jobs[0], jobs[2]] and merged[1] is jobs[1]
+
+    contract = web3_mock.eth.contract.return_value
+    contract.functions.transfer.return_value.build_transaction.side_effect = lambda txn: txn
+    contract.functions.transfer.return_value.estimate_gas.return_value = 50000
+    web3_mock.eth.fee_history.return_value = {'baseFeePerGas': [10, 12], 'reward': [[2]]}
+    web3_mock.eth.send_raw_transaction.return_value = b"\x01" * 32
+    type(web3_mock.eth).block_number = property(lambda self: 8)
+    web3_mock.eth.get_block_receipts.return_value = [
+        {'transactionHash': b"\x01" * 32, 'status': 1, 'blockNumber': 8,
+         'from': "0x" + "22" * 20, 'gasUsed': 34000}
+    ]
+    web3_mock.eth.get_block.return_value = {'timestamp': 0}
+    ReceiptWatcher.for_web3(web3_mock).poll_interval = 0.01
+
+    processor = TransferProcessor()
+    processor.redis = pipelined(AsyncMock())
+    monkeypatch.setattr(processor.providers, "get", lambda url: web3_mock)
+    with patch('autonomous_agents.utils.transfer_prcessor.Account') as account:
+        account.sign_transaction.return_value = Mock(raw_transaction=b"signed")
+        await processor.process_transfer(merged[0])
+
+    contract.functions.transfer.assert_called_with("0x" + "44" * 20, 3)
+    assert web3_mock.eth.send_raw_transaction.call_count == 1
+    published = [call.args[0] for call in processor.redis.xadd.await_args_list]
+    assert published == ["transfer_status:Agent1", "transfer_status:Agent3"]
+
+@pytest.mark.asyncio
+async def test_stream_transfer_queue_reclaims_and_dead_letters(fake_redis):
+    """Unacknowledged jobs are reclaimed by other consumers and dead-lettered after retries"""
+    import json
+    from autonomous_agents.utils.transfer_queue import StreamTransferQueue
+
+    redis = fake_redis
+    crashed = StreamTransferQueue(redis, consumer="a", max_retries=2, claim_idle_ms=1000)
+    await crashed.push([json.dumps({'job': i}) for i in range(3)])
+
+    jobs = await crashed.pop(2, timeout=0.1)
+    assert [job['job'] for job in jobs] == [0, 1]
+    await crashed.ack(jobs[0])
+    # Consumer "a" dies holding job 1
+
+    survivor = StreamTransferQueue(redis, consumer="b", max_retries=2, claim_idle_ms=1000)
+    fresh = await survivor.pop(10, timeout=0.1)
+    assert [job['job'] for job in fresh] == [2]
+    await survivor.ack(fresh[0])
+    redis.now = 1000
+    reclaimed = await survivor.pop(10, timeout=0.1)
+    assert [job['job'] for job in reclaimed] == [1]
+
+    # Job 1 keeps failing: the next reclaim exceeds max_retries
+    await survivor.release(reclaimed[0])
+    redis.now = 2000
+    assert await survivor.pop(10, timeout=0.1) == []
+    dead = redis.streams['crypto_transfers_dead']
+    assert [json.loads(fields['job'])['job'] for _, fields in dead] == [1]
+    assert redis.groups[('crypto_transfers_stream', 'transfer-processors')]['pending'] == {}
+
+    # A slow transfer kept alive is reclaimed by no one, itself included
+    await survivor.push([json.dumps({'job': 3})])
+    slow = await survivor.pop(10, timeout=0.1)
+    redis.now = 2800
+    await survivor.keep_alive()
+    redis.now = 3500
+    assert await crashed.pop(10, timeout=0.1) == []
+    redis.now = 5000
+    assert await survivor.pop(10, timeout=0.1) == []
+    await survivor.ack(slow[0])
+
+@pytest.mark.asyncio
+async def test_stream_transfer_queue_reclaim_scans_past_busy_entries(fake_redis):
+    """A stuck job behind many kept-alive ones is still reclaimed"""
+    import json
+    from autonomous_agents.utils.transfer_queue import StreamTransferQueue
+
+    redis = fake_redis
+    busy = StreamTransferQueue(redis, consumer="a", claim_idle_ms=1000)
+    await busy.push([json.dumps({'job': i}) for i in range(30)])
+    assert len(await busy.pop(30, timeout=0.1)) == 30
+    crashed = StreamTransferQueue(redis, consumer="b", claim_idle_ms=1000)
+    await crashed.push([json.dumps({'job': 30})])
+    assert len(await crashed.pop(1, timeout=0.1)) == 1
+    # Consumer "b" dies; "a" keeps its jobs alive
+    redis.now = 1000
+    await busy.keep_alive()
+
+    survivor = StreamTransferQueue(redis, consumer="c", claim_idle_ms=1000)
+    reclaimed = []
+    for _ in range(5):
+        reclaimed += await survivor.pop(1, timeout=0)
+    assert [job['job'] for job in reclaimed] == [30]
+
+@pytest.mark.asyncio
+async def test_partitioned_transfer_queue_rebalances_after_draining(fake_redis):
+    """Jobs are routed by source wallet and partitions move only once drained"""
+    import json
+    from autonomous_agents.utils.partitions import PartitionCoordinator
+    from autonomous_agents.utils.transfer_queue import PartitionedTransferQueue, partition_for
+
+    redis = fake_redis
+    queue = PartitionedTransferQueue(redis, partitions=4)
+    sources = ["0xAbC1", "0x1234", "0xABC1"]
+    await queue.push([json.dumps({'source_address': source}) for source in sources])
+    home = f"crypto_transfers:{partition_for('0xabc1', 4)}"
+    assert [json.loads(job)['source_address'] for job in redis.lists[home]] == ["0xAbC1", "0xABC1"]
+
+    in_flight = {1}
+    a = PartitionCoordinator(redis, 4, member="a", busy=lambda p: p in in_flight)
+    b = PartitionCoordinator(redis, 4, member="b")
+    await a.heartbeat()
+    assert a.owned == {0, 1, 2, 3}
+
+    # b joins: a hands over its idle partition but keeps the busy one leased
+    await b.heartbeat()
+    assert b.owned == set()
+    await a.heartbeat()
+    assert a.owned == {0, 2}
+    await b.heartbeat()
+    assert b.owned == {3}
+
+    in_flight.clear()
+    await a.heartbeat()
+    await b.heartbeat()
+    assert b.owned == {1, 3}
+
+    await b.leave()
+    await a.heartbeat()
+    assert a.owned == {0, 1, 2, 3}
+
+    # Without a successful heartbeat for lease_ms, a serves nothing until it renews
+    a.lease_ms = 50
+    await asyncio.sleep(0.06)
+    assert not a.owns(0) and a.owned == set()
+    await a.heartbeat()
+    assert a.owns(0)
+
+@pytest.mark.asyncio
+async def test_taking_a_partition_rereads_its_wallet_nonces(web3_mock, fake_redis):
+    """Local nonces of a partition's wallets are read from the chain again after a takeover"""
+    from autonomous_agents.utils.transfer_prcessor import TransferProcessor
+    from autonomous_agents.utils.transfer_queue import PartitionedTransferQueue, partition_for
+
+    processor = TransferProcessor()
+    processor.redis = fake_redis
+    processor.queue = PartitionedTransferQueue(fake_redis, partitions=4)
+    processor.coordinator = Mock(owns=Mock(return_value=False))
+    wallets = ["0x" + f"{i:02x}" * 20 for i in range(1, 9)]
+    moved = partition_for(wallets[0], 4)
+
+    web3_mock.eth.get_transaction_count.return_value = 3
+    nonces = processor._nonce_manager("http://node", web3_mock)
+    for wallet in wallets:
+        assert await nonces.reserve(wallet) == 3
+    # Another processor sent from the wallets while it owned the partition
+    web3_mock.eth.get_transaction_count.return_value = 7
+    await processor._consume(moved)
+
+    for wallet in wallets:
+        expected = 7 if partition_for(wallet, 4) == moved else 4
+        assert await nonces.reserve(wallet) == expected
+
+@pytest.mark.asyncio
+async def test_list_transfer_queue_drains_in_bulk():
+    """Jobs waiting behind a blocking pop are taken with one counted RPOP"""
+    import json
+    from unittest.mock import AsyncMock
+    from autonomous_agents.utils.transfer_queue import ListTransferQueue
+
+    waiting = [json.dumps({'job': i}) for i in range(5)]
+    redis = AsyncMock()
+    redis.brpop.return_value = ("crypto_transfers", waiting[0])
+    redis.rpop.side_effect = lambda key, count: [waiting.pop(1) for _ in range(min(count, len(waiting) - 1))] or None
+    queue = ListTransferQueue(redis)
+
+    jobs = await queue.pop(3, timeout=1)
+    assert [job['job'] for job in jobs] == [0, 1, 2]
+    redis.rpop.assert_awaited_once_with("crypto_transfers", 2)
+
+    jobs = await queue.pop(10, timeout=0)
+    assert [job['job'] for job in jobs] == [3, 4]
+    assert await queue.pop(10, timeout=0) == []
+    assert redis.brpop.await_count == 1
+
+@pytest.mark.asyncio
+async def test_transfer_status_feed_pushes_statuses_to_inbox(fake_redis):
+    """Every published status reaches the agent's inbox once, without polling a key"""
+    import json
+    from autonomous_agents.core.message import MessageBox, OverflowPolicy
+    from autonomous_agents.handlers.transfer_status import TransferStatusHandler
+    from autonomous_agents.utils.transfer_prcessor import TransferProcessor
+    from autonomous_agents.utils.transfer_status import TransferStatusFeed
+
+    redis = fake_redis
+    processor = TransferProcessor(status_batch_window=0)
+    processor.redis = redis
+    # Both statuses survive: neither overwrites the other
+    await processor._publish(
+        {'merged': [{'agent_name': "Agent1"}, {'agent_name': "Agent2"}]},
+        {'status': 'error', 'error': "first"}
+    )
+    await processor.publish_status("Agent1", {'status': 'error', 'error': "second"})
+
+    inbox = MessageBox()
+    feed = TransferStatusFeed(redis, block_ms=10)
+    feed.watch("Agent1", inbox)
+    try:
+        received = []
+        while len(received) < 2:
+            await asyncio.wait_for(inbox.wait(), timeout=1)
+            received += await inbox.get_many(10)
+    finally:
+        await feed.stop()
+
+    assert [m.type for m in received] == [MessageType.TRANSACTION] * 2
+    assert [m.content['error'] for m in received] == ["first", "second"]
+    assert await TransferStatusHandler(None, "0x" + "11" * 20).can_handle(received[0])
+    # Delivered statuses are removed; the other agent's one is kept for it
+    assert redis.streams["transfer_status:Agent1"] == []
+    assert [json.loads(f['status'])['error'] for _, f in redis.streams["transfer_status:Agent2"]] == ["first"]
+
+    # A full inbox stops a batch midway; what it took is still deleted
+    await processor.publish_status("Agent2", {'status': 'error', 'error': "third"})
+    full = MessageBox(capacity=1, overflow=OverflowPolicy.FAIL)
+    feed.watch("Agent2", full)
+    try:
+        await asyncio.wait_for(full.wait(), timeout=1)
+        await asyncio.sleep(0.05)
+    finally:
+        await feed.stop()
+    assert [m.content['error'] for m in await full.get_many(10)] == ["first"]
+    assert [json.loads(f['status'])['error'] for _, f in redis.streams["transfer_status:Agent2"]] == ["third"]
+
+@pytest.mark.asyncio
+async def test_transfer_status_feed_drops_malformed_entries(fake_redis):
+    """A status that cannot be decoded is deleted and later statuses still arrive"""
+    import json
+    from autonomous_agents.core.message import MessageBox
+    from autonomous_agents.utils.transfer_status import TransferStatusFeed, status_stream
+
+    redis = fake_redis
+    await redis.xadd(status_stream("Agent1"), {'status': "{not json"})
+    await redis.xadd(status_stream("Agent1"), {'status': json.dumps({'status': 'success'})})
+
+    inbox = MessageBox()
+    feed = TransferStatusFeed(redis, block_ms=10)
+    feed.watch("Agent1", inbox)
+    try:
+        await asyncio.wait_for(inbox.wait(), timeout=1)
+        received = await inbox.get_many(10)
+    finally:
+        await feed.stop()
+
+    assert [m.content for m in received] == [{'status': 'success'}]
+    assert redis.streams[status_stream("Agent1")] == []
+
+@pytest.mark.asyncio
+async def test_transient_send_failure_leaves_job_for_retry(web3_mock, monkeypatch, fake_redis):
+    """A connection error while sending releases the job instead of acknowledging it"""
+    import json
+    from web3.exceptions import TransactionNotFound
+    from autonomous_agents.utils.transfer_prcessor import TransferProcessor
+    from autonomous_agents.utils.transfer_queue import PartitionedTransferQueue
+
+    contract = web3_mock.eth.contract.return_value
+    contract.functions.transfer.return_value.build_transaction.side_effect = lambda txn: txn
+    contract.functions.transfer.return_value.estimate_gas.return_value = 50000
+    web3_mock.eth.fee_history.return_value = {'baseFeePerGas': [10, 12], 'reward': [[2]]}
+    web3_mock.eth.send_raw_transaction.side_effect = ConnectionError("connection reset by peer")
+    web3_mock.eth.get_transaction.side_effect = TransactionNotFound("unknown")
+
+    processor = TransferProcessor()
+    processor.redis = fake_redis
+    processor.queue = PartitionedTransferQueue(fake_redis, partitions=1, backend='stream')
+    monkeypatch.setattr(processor.providers, "get", lambda url: web3_mock)
+    queue = processor.queue.partitions[0]
+    await queue.push([json.dumps({
+        'token_address': "0x" + "11" * 20,
+        'source_address': "0x" + "22" * 20,
+        'target_address': "0x" + "44" * 20,
+        'private_key': "key",
+        'amount': 1,
+        'web3_provider': "http://node",
+        'agent_name': "Agent1",
+    })])
+    job, = await queue.pop(1, timeout=0.1)
+
+    await processor._slots.acquire()
+    processor._in_flight[0] = 1
+    with patch('autonomous_agents.utils.transfer_prcessor.Account') as account:
+        account.sign_transaction.return_value = Mock(hash=b"\x07" * 32, raw_transaction=b"signed")
+        await processor._run_transfer(job, 0)
+
+    # Still pending for a retry, no longer kept alive, and no error status sent
+    assert job['queue_id'] in fake_redis.groups[(queue.stream, queue.group)]['pending']
+    assert queue._in_flight == set()
+    assert "transfer_status:Agent1" not in fake_redis.streams
+
+def transfer_job(**overrides):
+    """Queued transfer job from wallet 0x22..22 to 0x44..44"""
+    return {
+        'token_address': "0x" + "11" * 20,
+        'source_address': "0x" + "22" * 20,
+        'target_address': "0x" + "44" * 20,
+        'private_key': "key",
+        'amount': 1,
+        'web3_provider': "http://node",
+        'agent_name': "Agent1",
+        **overrides,
+    }
+
+@pytest.mark.asyncio
+async def test_short_indexed_balance_is_checked_on_chain(web3_mock, monkeypatch, fake_redis):
+    """An index lagging behind a funding transfer does not reject the job"""
+    from autonomous_agents.utils.transfer_prcessor import TransferProcessor
+
+    contract = web3_mock.eth.contract.return_value
+    contract.functions.transfer.return_value.build_transaction.side_effect = lambda txn: txn
+    contract.functions.transfer.return_value.estimate_gas.return_value = 50000
+    web3_mock.eth.fee_history.return_value = {'baseFeePerGas': [10, 12], 'reward': [[2]]}
+    web3_mock.eth.send_raw_transaction.return_value = b"\x07" * 32
+    balance_call = contract.functions.balanceOf.return_value.call
+
+    indexer = Mock()
+    indexer.covers.return_value = True
+    indexer.balance_of.return_value = 0
+    processor = TransferProcessor(indexer)
+    processor.redis = fake_redis
+    monkeypatch.setattr(processor.providers, "get", lambda url: web3_mock)
+    with patch('autonomous_agents.utils.transfer_prcessor.Account') as account:
+        account.sign_transaction.return_value = Mock(hash=b"\x07" * 32, raw_transaction=b"signed")
+        assert await processor.send_transfer(transfer_job()) is not None
+        assert balance_call.call_count == 1
+        assert "transfer_status:Agent1" not in fake_redis.streams
+
+        # An index showing enough is trusted without a call
+        indexer.balance_of.return_value = 5
+        assert await processor.send_transfer(transfer_job()) is not None
+        assert balance_call.call_count == 1
+
+@pytest.mark.asyncio
+async def test_already_known_send_counts_as_sent(web3_mock, monkeypatch, fake_redis):
+    """A node that already holds the signed transaction has accepted it"""
+    from web3.exceptions import Web3RPCError
+    from autonomous_agents.utils.transfer_prcessor import TransferProcessor
+
+    contract = web3_mock.eth.contract.return_value
+    contract.functions.transfer.return_value.build_transaction.side_effect = lambda txn: txn
+    contract.functions.transfer.return_value.estimate_gas.return_value = 50000
+    web3_mock.eth.fee_history.return_value = {'baseFeePerGas': [10, 12], 'reward': [[2]]}
+    web3_mock.eth.get_transaction_count.return_value = 3
+    web3_mock.eth.send_raw_transaction.side_effect = Web3RPCError("already known")
+
+    processor = TransferProcessor()
+    processor.redis = fake_redis
+    monkeypatch.setattr(processor.providers, "get", lambda url: web3_mock)
+    with patch('autonomous_agents.utils.transfer_prcessor.Account') as account:
+        account.sign_transaction.return_value = Mock(hash=b"\x07" * 32, raw_transaction=b"signed")
+        sent = await processor.send_transfer(transfer_job())
+
+    assert sent['tx_hash'] == b"\x07" * 32 and sent['txn']['nonce'] == 3
+    # Nonce 3 stays used: no resync, no reuse
+    nonces = processor._nonce_manager("http://node", web3_mock)
+    assert await nonces.reserve("0x" + "22" * 20) == 4
+    assert web3_mock.eth.get_transaction_count.call_count == 1
+
+@pytest.mark.asyncio
+async def test_ambiguous_send_errors_keep_the_nonce_until_resolved(web3_mock, monkeypatch, fake_redis):
+    """A nonce is only reused when the node surely never took the transaction"""
+    from web3.exceptions import TransactionNotFound, Web3RPCError
+    from autonomous_agents.utils.transfer_prcessor import TransferProcessor
+
+    contract = web3_mock.eth.contract.return_value
+    contract.functions.transfer.return_value.build_transaction.side_effect = lambda txn: txn
+    contract.functions.transfer.return_value.estimate_gas.return_value = 50000
+    web3_mock.eth.fee_history.return_value = {'baseFeePerGas': [10, 12], 'reward': [[2]]}
+    web3_mock.eth.get_transaction_count.return_value = 3
+    web3_mock.eth.send_raw_transaction.side_effect = TimeoutError("read timed out")
+
+    processor = TransferProcessor()
+    processor.redis = fake_redis
+    monkeypatch.setattr(processor.providers, "get", lambda url: web3_mock)
+    nonces = processor._nonce_manager("http://node", web3_mock)
+    sent_nonces = []
+
+    async def send(lookup):
+        web3_mock.eth.get_transaction.side_effect = lookup
+        with patch('autonomous_agents.utils.transfer_prcessor.Account') as account:
+            account.sign_transaction.side_effect = lambda txn, key: (
+                sent_nonces.append(txn['nonce']) or Mock(hash=b"\x07" * 32, raw_transaction=b"signed")
+            )
+            return await processor.send_transfer(transfer_job())
+
+    # The timeout came after the node took it: the transfer was sent
+    sent = await send(lambda tx_hash: {'hash': tx_hash})
+    assert sent['tx_hash'] == b"\x07" * 32
+    # The node is unreachable: unknown, so nonce 4 stays reserved
+    with pytest.raises(TimeoutError):
+        await send(ConnectionError("connection refused"))
+    # The node does not have it: nonce 5 is free again
+    with pytest.raises(TimeoutError):
+        await send(TransactionNotFound("unknown"))
+    # The node answered with an error: it did not take it either
+    web3_mock.eth.send_raw_transaction.side_effect = Web3RPCError("insufficient funds for gas")
+    with pytest.raises(Web3RPCError):
+        await send(AssertionError("no lookup needed"))
+    assert sent_nonces == [3, 4, 5, 5]
+    assert await nonces.reserve("0x" + "22" * 20) == 5
+
+@pytest.mark.asyncio
+async def test_shared_nonces_recover_from_a_stale_counter(web3_mock, fake_redis):
+    """A counter left ahead of the chain is reset, and a nonce gap is filled instead of replaced"""
+    from web3.exceptions import TransactionNotFound
+    from autonomous_agents.chain.nonce import NonceManager
+    from autonomous_agents.utils.transfer_prcessor import TransferProcessor
+
+    wallet = "0x" + "22" * 20
+    web3_mock.eth.get_transaction_count.return_value = 5
+    # A crashed run reserved nonces 5 to 8 and never sent them
+    fake_redis.keys[f"nonce:{wallet}"] = 9
+    assert await NonceManager(web3_mock, fake_redis).reserve(wallet) == 5
+    # Another instance joining now keeps the counter that is in use
+    assert await NonceManager(web3_mock, fake_redis).reserve(wallet) == 6
+
+    # Nonce 6 was sent but 5 never reached the node: 6 is stuck behind a gap
+    web3_mock.eth.get_transaction_receipt.side_effect = TransactionNotFound("unknown")
+    processor = TransferProcessor(shared_nonces=True)
+    processor.redis = fake_redis
+    with patch('autonomous_agents.utils.transfer_prcessor.Account') as account, \
+            pytest.raises(TimeoutError, match="1 missing nonces"):
+        await processor._recover_unconfirmed({
+            'web3': web3_mock, 'tx_hash': b"\x06" * 32, 'source_address': wallet,
+            'txn': {'from': wallet, 'nonce': 6, 'maxFeePerGas': 100, 'maxPriorityFeePerGas': 10},
+            'job': transfer_job(),
+        })
+    account.sign_transaction.assert_not_called()
+    nonces = processor._nonce_manager("http://node", web3_mock)
+    assert await nonces.reserve(wallet) == 5
+    assert await nonces.reserve(wallet) == 7
+
+@pytest.mark.asyncio
+async def test_redelivered_transfer_is_rebroadcast_not_resent(web3_mock, monkeypatch, fake_redis):
+    """A reclaimed job reuses the transaction signed for it instead of signing a second one"""
+    from autonomous_agents.utils.transfer_prcessor import TransferProcessor, coalesce_transfers
+
+    jobs = [{
+        'token_address': "0x" + "11" * 20,
+        'source_address': "0x" + "22" * 20,
+        'target_address': "0x" + "44" * 20,
+        'private_key': "key",
+        'amount': 1,
+        'web3_provider': "http://node",
+        'agent_name': "Agent1",
+        'queue_id': f"{i}-0",
+    } for i in (1, 2)]
+    merged = coalesce_transfers(jobs)
+    assert len(merged) == 1
+
+    processor = TransferProcessor()
+    processor.redis = fake_redis
+    monkeypatch.setattr(processor.providers, "get", lambda url: web3_mock)
+    await processor._record_sent(merged[0], Mock(hash=b"\x07" * 32, raw_transaction=b"signed"))
+
+    redelivered = [{**job, 'redelivered': True} for job in jobs]
+    assert coalesce_transfers(redelivered) == redelivered
+    with patch('autonomous_agents.utils.transfer_prcessor.Account') as account:
+        sent = await processor.send_transfer(redelivered[1])
+    account.sign_transaction.assert_not_called()
+    web3_mock.eth.send_raw_transaction.assert_called_once_with(b"signed")
+    assert sent['tx_hash'] == b"\x07" * 32
+
+@pytest.mark.asyncio
+async def test_dropped_transaction_is_replaced_with_higher_fees(web3_mock, monkeypatch):
+    """A transfer the node accepted and then dropped is resent with the same nonce and bumped fees"""
+    import json
+    from unittest.mock import AsyncMock
+    from web3.exceptions import TransactionNotFound
+    from autonomous_agents.chain.nonce import NonceManager
+    from autonomous_agents.chain.receipts import ReceiptWatcher
+    from autonomous_agents.utils.transfer_prcessor import TransferProcessor
+
+    source = "0x" + "22" * 20
+    # Nonce 5 is neither mined nor pending any more
+    web3_mock.eth.get_transaction_count.side_effect = lambda address, block: 5
+    assert await NonceManager(web3_mock).check_unconfirmed(source, 5) == "dropped"
+    assert await NonceManager(web3_mock).check_unconfirmed(source, 4) == "mined"
+
+    replaced = b"\x09" * 32
+    mined = []
+    type(web3_mock.eth).block_number = property(lambda self: 20 + len(mined))
+    web3_mock.eth.get_block_receipts.side_effect = lambda number: [
+        {'transactionHash': tx, 'status': 1, 'blockNumber': number, 'from': source, 'gasUsed': 34000}
+        for tx in mined
+    ]
+    web3_mock.eth.get_transaction_receipt.side_effect = TransactionNotFound("unknown")
+    web3_mock.eth.get_block.return_value = {'timestamp': 0}
+    web3_mock.eth.fee_history.return_value = {'baseFeePerGas': [10, 10], 'reward': [[2]]}
+
+    def send_raw_transaction(raw):
+        mined.append(replaced)
+        return replaced
+
+    web3_mock.eth.send_raw_transaction.side_effect = send_raw_transaction
+    watcher = ReceiptWatcher.for_web3(web3_mock)
+    watcher.poll_interval, watcher.timeout = 0.01, 0.05
+
+    processor = TransferProcessor()
+    processor.redis = pipelined(AsyncMock())
+    txn = {'from': source, 'nonce': 5, 'gas': 60000, 'maxFeePerGas': 100, 'maxPriorityFeePerGas': 10}
+    job = {'agent_name': "Agent1", 'web3_provider': "http://node", 'private_key': "key"}
+    with patch('autonomous_agents.utils.transfer_prcessor.Account') as account:
+        account.sign_transaction.return_value = Mock(hash=replaced, raw_transaction=b"replacement")
+        await processor.confirm_transfer({
+            'web3': web3_mock, 'tx_hash': b"\x08" * 32, 'txn': txn, 'token_address': "0x" + "11" * 20,
+            'job': job, 'agent_name': "Agent1", 'source_address': source,
+        })
+
+    replacement = account.sign_transaction.call_args.args[0]
+    assert replacement['nonce'] == 5
+    assert replacement['maxFeePerGas'] >= 113 and replacement['maxPriorityFeePerGas'] >= 12
+    status = json.loads(processor.redis.xadd.await_args.args[1]['status'])
+    assert status['status'] == 'success' and status['tx_hash'] == replaced.hex()